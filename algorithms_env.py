@@ -1,97 +1,164 @@
 # Global Imports
+import functools
 import gymnasium as gym
 import numpy as np
 from red_object import RedObject
 from blue_object import BlueObject
 import trajectoy_pradiction as tp
+import metrics
+from world_state import WorldState, ObjectList
+from assignment import assign_targets
+from tracking import IMMTracker
 
 
 class AlgorithmsEnv(gym.Env):
-    def __init__(self, red_object_list: list[RedObject], blue_object_list: list[BlueObject]):
+    def __init__(self, red_object_list: list[RedObject], blue_object_list: list[BlueObject], dt: float = 1):
         super(AlgorithmsEnv, self).__init__()
 
+        self.dt = dt  # time advanced by one step
+        self._state: WorldState | None = None
         self.red_object_list: list[RedObject] = red_object_list
         self.blue_object_list: list[BlueObject] = blue_object_list
 
-    def reset(self, **kwargs):
-        # reset red object
-        for red_object in self.red_object_list:
-            red_object.reset()
-
-        # reset blue object
-        for blue_object in self.blue_object_list:
-            blue_object.reset()
+    @property
+    def red_object_list(self) -> list[RedObject]:
+        return self._red_object_list
+
+    @red_object_list.setter
+    def red_object_list(self, red_object_list: list[RedObject]):
+        self._red_object_list = ObjectList(red_object_list, on_change=functools.partial(self._objects_changed, 'red'))
+        self._invalidate_state()
+
+    @property
+    def blue_object_list(self) -> list[BlueObject]:
+        return self._blue_object_list
+
+    @blue_object_list.setter
+    def blue_object_list(self, blue_object_list: list[BlueObject]):
+        self._blue_object_list = ObjectList(blue_object_list, on_change=functools.partial(self._objects_changed, 'blue'))
+        self._invalidate_state()
+
+    def _invalidate_state(self):
+        self._state = None
+
+    def _objects_changed(self, team: str, object_list: ObjectList, added=None, removed=None, index: int = -1):
+        # appends and removals by id are applied to the world state in place, in O(1), so the rows stay in list
+        # order. Any other change rebuilds the state the next time it is needed.
+        state = self._state
+        if state is None:
+            return
+        if added is not None and added._state is not state:
+            added.bind(state, state.append_row(team, added._state, added._slot))
+        elif removed is not None:
+            # the removed object keeps its values in a row of its own
+            removed.bind(state.remove_row(team, index), 0)
+            if index < len(object_list):
+                object_list[index].bind(state, index)
+        else:
+            self._invalidate_state()
+
+    @property
+    def state(self) -> WorldState:
+        # the world state is rebuilt lazily, only after objects were added, removed or replaced
+        if self._state is None:
+            self._state = WorldState.from_objects(self._red_object_list, self._blue_object_list)
+        return self._state
 
+    def reset(self, **kwargs):
+        # reset red and blue objects
+        self.state.reset()
 
     def step(self, action):
+        state = self.state
+
         # red object step
-        for red_object in self.red_object_list:
-            red_object.step()
+        with metrics.phase('red_step'):
+            state.step_red(self.dt)
 
         # blue object step
-        for idx, blue_object in enumerate(self.blue_object_list):
-            blue_object.step(action[idx])
+        with metrics.phase('blue_step'):
+            state.step_blue(action, self.dt)
 
         # check if there is objects alive
-        done = True
-        for red_object in self.red_object_list:
-            if red_object.i_am_alive:
-                done = False
-                break
+        done = not state.red_alive.any()
 
-        return np.concatenate((self.blue_object_list[0].position, self.red_object_list[0].position)), 0, done, {}, {}
+        return np.concatenate((state.blue_position[0], state.red_position[0])), 0, done, {}, {}
 
+    @metrics.timed('take_action')
     def take_action(self):
-        actions = []
-        red_object_list, blue_object_list = reorder_objects_by_distance(self.red_object_list, self.blue_object_list)
-
-        num_objects = min(len(red_object_list), len(blue_object_list))
-
-        for i in range(num_objects):
-            # Predict red trajectory position and time
-            red_positions, red_times = tp.trajectory_prediction_position_velocity(
-                red_object_list[i].position,
-                red_object_list[i].velocity
-            )
-
-            # Find the closest red trajectory point based on blue object speed and position
-            blue_position = blue_object_list[i].position
-            blue_max_speed = blue_object_list[i].max_speed
-
-            closest_index = 0
-            closest_distance = tp.trajectory_prediction_to_target(
-                blue_position, blue_max_speed, red_positions[0]
-            )
-
-            for j, red_pos in enumerate(red_positions[1:], start=1):
-                blue_prediction_time = tp.trajectory_prediction_to_target(
-                    blue_position, blue_max_speed, red_pos
-                )
-                distance = abs(blue_prediction_time - red_times[j])
-
-                if distance < closest_distance:
-                    closest_distance = distance
-                    closest_index = j
-
-            # Calculate the direction vector and append to actions
-            action_direction = (red_positions[closest_index] - blue_position).astype(np.float64)
-            actions.append(action_direction)
-
-        # Fill remaining actions with zero vectors if blue_object_list is longer
-        actions.extend([np.zeros(3, dtype=np.float64)] * (len(blue_object_list) - num_objects))
-
-        return actions
+        return self.plan_action()[0]
+
+    def plan_action(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # the action of take_action together with the assigned blue and red indices and their intercept times
+        state = self.state
+        actions = np.zeros((state.num_blue, 3), dtype=np.float64)
+        blue_indices, red_indices = self.assigned_pairs()
+
+        # Solve the intercept point of every pair at once
+        blue_position = state.blue_position[blue_indices]
+        aim_point, intercept_time, _ = tp.intercept_prediction(
+            blue_position,
+            state.blue_max_speed[blue_indices],
+            state.red_position[red_indices],
+            state.red_velocity[red_indices]
+        )
+
+        # Fly at full speed towards the aim point, unassigned blue objects keep zero actions.
+        # A target reached within the step is flown through at its intercept time instead of waited for,
+        # which the swept kill check of the simulation manager detects.
+        direction = aim_point - blue_position
+        distance = np.linalg.norm(direction, axis=1)
+        speed = np.divide(state.blue_max_speed[blue_indices] * self.dt, distance, out=np.zeros_like(distance), where=distance > 0)
+        actions[blue_indices] = direction * speed[:, None]
+
+        return actions, blue_indices, red_indices, intercept_time
+
+    def assigned_pairs(self, blue_position: np.ndarray | None = None, red_position: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        # assign every alive blue object to a different alive red object, return the blue and red indices of the pairs.
+        # With other positions than the current ones it is the assignment the objects would get there.
+        state = self.state
+        blue_position = state.blue_position if blue_position is None else blue_position
+        red_position = state.red_position if red_position is None else red_position
+
+        alive_blue = np.flatnonzero(state.blue_alive)
+        alive_red = np.flatnonzero(state.red_alive)
+        red_of_blue = assign_targets(blue_position[alive_blue], state.blue_max_speed[alive_blue],
+                                     red_position[alive_red], state.red_velocity[alive_red])
+
+        assigned = red_of_blue >= 0
+        return alive_blue[assigned], alive_red[red_of_blue[assigned]]
+
+
+    def predict_red_trajectories(self, steps: int = 30, out: np.ndarray | None = None, tracker: IMMTracker | None = None) -> np.ndarray:
+        # (R, steps, 3) predicted trajectories of all red objects, index k is the position k steps of dt ahead,
+        # out is reused when given. With a tracker the alive red objects it tracks, matched by object id, are
+        # predicted from its estimates instead of their true velocities.
+        state = self.state
+        out = tp.trajectory_prediction(state.red_position, state.red_velocity * self.dt, steps=steps, out=out)
+        if tracker is None or tracker.num_tracks == 0:
+            return out
+        if tracker.ids is None:
+            raise ValueError("The tracker has no object ids to match its tracks with the red objects")
+
+        alive = np.flatnonzero(state.red_alive)
+        order = np.argsort(tracker.ids)
+        track = order[np.minimum(np.searchsorted(tracker.ids, state.red_id[alive], sorter=order), len(order) - 1)]
+        tracked = tracker.ids[track] == state.red_id[alive]
+        out[alive[tracked]] = tracker.predict_trajectory(steps, tracks=track[tracked], dt=self.dt)
+        return out
 
 
 def reorder_objects_by_distance(red_object_list: list[RedObject], blue_object_list: list[BlueObject]) -> tuple[list[RedObject], list[BlueObject]]:
-    # Calculate the distance between each red object and blue object
-    distances = np.zeros((len(red_object_list), len(blue_object_list)), dtype=np.float64)
-    for i, red_object in enumerate(red_object_list):
-        for j, blue_object in enumerate(blue_object_list):
-            distances[i, j] = np.linalg.norm(red_object.position - blue_object.position)
+    # Pair red and blue objects one to one by time to intercept, the returned lists are aligned pair by pair
+    red_positions = np.array([red_object.position for red_object in red_object_list], dtype=np.float64).reshape(-1, 3)
+    red_velocities = np.array([red_object.velocity for red_object in red_object_list], dtype=np.float64).reshape(-1, 3)
+    blue_positions = np.array([blue_object.position for blue_object in blue_object_list], dtype=np.float64).reshape(-1, 3)
+    blue_max_speeds = np.array([blue_object.max_speed for blue_object in blue_object_list], dtype=np.float64)
+
+    red_of_blue = assign_targets(blue_positions, blue_max_speeds, red_positions, red_velocities)
+    blue_indices = np.flatnonzero(red_of_blue >= 0)
 
-    # Find the closest red object to each blue object
-    red_object_indices = np.argmin(distances, axis=0)
-    red_objects = [red_object_list[i] for i in red_object_indices]
+    red_objects = [red_object_list[red_of_blue[i]] for i in blue_indices]
+    blue_objects = [blue_object_list[i] for i in blue_indices]
 
-    return red_objects, blue_object_list
+    return red_objects, blue_objects
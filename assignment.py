@@ -0,0 +1,173 @@
+import numpy as np
+import kernels
+import trajectoy_pradiction as tp
+from collision import find_k_nearest
+
+# Problems up to this size (larger side) are solved optimally, larger ones with gated greedy matching
+HUNGARIAN_MAX_SIZE = 300
+
+# How many of the nearest red objects each blue object considers first in the gated solver
+GATE_CANDIDATES = 16
+
+# Cost offset for targets that cannot be reached, so any reachable target is preferred
+UNREACHABLE_COST = 1e9
+
+
+def intercept_cost(blue_positions: np.ndarray, blue_max_speeds: np.ndarray, red_positions: np.ndarray, red_velocities: np.ndarray) -> np.ndarray:
+    # time to intercept of matching blue/red rows, arguments broadcast like tp.intercept_prediction
+    if kernels.enabled() and np.ndim(blue_positions) == 2 and np.shape(blue_positions) == np.shape(red_positions):
+        rows = np.arange(len(blue_positions))
+        return kernels.intercept_costs(*_float_arrays(blue_positions, blue_max_speeds, red_positions, red_velocities), rows, rows, UNREACHABLE_COST)
+
+    _, intercept_time, reachable = tp.intercept_prediction(blue_positions, blue_max_speeds, red_positions, red_velocities)
+
+    # unreachable targets are still ranked, by the time to reach their current position
+    distance = np.linalg.norm(np.asarray(red_positions) - np.asarray(blue_positions), axis=-1)
+    with np.errstate(divide='ignore'):
+        chase_time = distance / np.asarray(blue_max_speeds, dtype=np.float64)
+
+    return np.where(reachable, intercept_time, UNREACHABLE_COST + np.minimum(chase_time, UNREACHABLE_COST))
+
+
+def intercept_cost_matrix(blue_positions: np.ndarray, blue_max_speeds: np.ndarray, red_positions: np.ndarray, red_velocities: np.ndarray) -> np.ndarray:
+    # (B, R) time to intercept of every blue/red pair
+    if kernels.enabled():
+        num_blue, num_red = len(blue_positions), len(red_positions)
+        blue_idx, red_idx = np.divmod(np.arange(num_blue * num_red), num_red)
+        cost = kernels.intercept_costs(*_float_arrays(blue_positions, blue_max_speeds, red_positions, red_velocities), blue_idx, red_idx, UNREACHABLE_COST)
+        return cost.reshape(num_blue, num_red)
+    return intercept_cost(blue_positions[:, None, :], blue_max_speeds[:, None], red_positions[None, :, :], red_velocities[None, :, :])
+
+
+def _float_arrays(*arrays) -> list[np.ndarray]:
+    return [np.ascontiguousarray(array, dtype=np.float64) for array in arrays]
+
+
+def assign_targets(blue_positions: np.ndarray, blue_max_speeds: np.ndarray, red_positions: np.ndarray, red_velocities: np.ndarray) -> np.ndarray:
+    # One to one weapon-target assignment minimizing the time to intercept.
+    # return the red index assigned to each blue object, -1 for blue objects left without a target
+    blue_positions = np.asarray(blue_positions, dtype=np.float64).reshape(-1, 3)
+    blue_max_speeds = np.asarray(blue_max_speeds, dtype=np.float64).reshape(-1)
+    red_positions = np.asarray(red_positions, dtype=np.float64).reshape(-1, 3)
+    red_velocities = np.asarray(red_velocities, dtype=np.float64).reshape(-1, 3)
+
+    num_blue, num_red = len(blue_positions), len(red_positions)
+    if num_blue == 0 or num_red == 0:
+        return np.full(num_blue, -1, dtype=np.intp)
+
+    if max(num_blue, num_red) <= HUNGARIAN_MAX_SIZE:
+        cost = intercept_cost_matrix(blue_positions, blue_max_speeds, red_positions, red_velocities)
+        return hungarian(cost)
+
+    return gated_greedy_assignment(blue_positions, blue_max_speeds, red_positions, red_velocities)
+
+
+def hungarian(cost: np.ndarray) -> np.ndarray:
+    # Optimal assignment of a finite (N, M) cost matrix (shortest augmenting path Hungarian algorithm).
+    # return the column assigned to each row, -1 for rows left unassigned when N > M
+    cost = np.asarray(cost, dtype=np.float64)
+    num_rows, num_cols = cost.shape
+    if num_rows > num_cols:
+        col_of_row = hungarian(cost.T)
+        row_of_col = np.full(num_rows, -1, dtype=np.intp)
+        row_of_col[col_of_row] = np.arange(num_cols)
+        return row_of_col
+
+    # potentials and matching use 1-based indices, column 0 is the virtual start column
+    u = np.zeros(num_rows + 1)
+    v = np.zeros(num_cols + 1)
+    row_of = np.zeros(num_cols + 1, dtype=np.intp)
+    way = np.zeros(num_cols + 1, dtype=np.intp)
+
+    for row in range(1, num_rows + 1):
+        row_of[0] = row
+        col = 0
+        min_reduced = np.full(num_cols + 1, np.inf)
+        used = np.zeros(num_cols + 1, dtype=bool)
+
+        # grow the alternating tree until a free column is reached
+        while True:
+            used[col] = True
+            current_row = row_of[col]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+
+            free = ~used[1:]
+            improve = free & (reduced < min_reduced[1:])
+            min_reduced[1:][improve] = reduced[improve]
+            way[1:][improve] = col
+
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_col = int(np.argmin(candidates)) + 1
+            delta = candidates[next_col - 1]
+
+            u[row_of[used]] += delta
+            v[used] -= delta
+            min_reduced[1:][free] -= delta
+
+            col = next_col
+            if row_of[col] == 0:
+                break
+
+        # flip the augmenting path
+        while col:
+            previous_col = way[col]
+            row_of[col] = row_of[previous_col]
+            col = previous_col
+
+    col_of_row = np.full(num_rows, -1, dtype=np.intp)
+    assigned = row_of[1:] > 0
+    col_of_row[row_of[1:][assigned] - 1] = np.flatnonzero(assigned)
+    return col_of_row
+
+
+def gated_greedy_assignment(blue_positions: np.ndarray, blue_max_speeds: np.ndarray, red_positions: np.ndarray, red_velocities: np.ndarray) -> np.ndarray:
+    # Greedy assignment over sparse candidate pairs, only the GATE_CANDIDATES nearest reds of every blue are costed.
+    # The blues left without a free candidate try again with the reds still free. From the second round on they also
+    # get GATE_CANDIDATES random free reds, so blues that all share the same nearest reds, e.g. launched from one
+    # site, still find a target each round instead of a few of them per round.
+    num_blue, num_red = len(blue_positions), len(red_positions)
+    red_of_blue = np.full(num_blue, -1, dtype=np.intp)
+    assigned_red = np.zeros(num_red, dtype=bool)
+    rng = np.random.default_rng(0)  # the same objects always get the same assignment
+
+    first_round = True
+    while True:
+        free_blue = np.flatnonzero(red_of_blue < 0)
+        free_red = np.flatnonzero(~assigned_red)
+        if len(free_blue) == 0 or len(free_red) == 0:
+            break
+
+        blue_idx, red_idx = find_k_nearest(blue_positions[free_blue], red_positions[free_red], GATE_CANDIDATES)
+        if not first_round:
+            blue_idx = np.concatenate((blue_idx, np.repeat(np.arange(len(free_blue)), GATE_CANDIDATES)))
+            red_idx = np.concatenate((red_idx, rng.integers(0, len(free_red), len(free_blue) * GATE_CANDIDATES)))
+        blue_idx, red_idx = free_blue[blue_idx], free_red[red_idx]
+        cost = intercept_cost(blue_positions[blue_idx], blue_max_speeds[blue_idx], red_positions[red_idx], red_velocities[red_idx])
+
+        blue_match, red_match = greedy_matching(blue_idx, red_idx, cost, num_blue, num_red)
+        red_of_blue[blue_match] = red_match
+        assigned_red[red_match] = True
+
+        # once every free red was a candidate of every free blue the greedy matching is complete
+        if GATE_CANDIDATES >= len(free_red):
+            break
+        first_round = False
+
+    return red_of_blue
+
+
+def greedy_matching(blue_idx: np.ndarray, red_idx: np.ndarray, cost: np.ndarray, num_blue: int, num_red: int) -> tuple[np.ndarray, np.ndarray]:
+    # Greedy one to one matching of sparse (blue, red, cost) pairs. The pairs are sorted by cost once and
+    # taken cheapest first whenever both of their objects are still free.
+    order = np.argsort(cost, kind='stable')
+    blue_free = np.ones(num_blue, dtype=bool).tolist()
+    red_free = np.ones(num_red, dtype=bool).tolist()
+    blue_match, red_match = [], []
+
+    for blue, red in zip(blue_idx[order].tolist(), red_idx[order].tolist()):
+        if blue_free[blue] and red_free[red]:
+            blue_free[blue] = red_free[red] = False
+            blue_match.append(blue)
+            red_match.append(red)
+
+    return np.array(blue_match, dtype=np.intp), np.array(red_match, dtype=np.intp)
@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import kernels
+from assignment import intercept_cost, intercept_cost_matrix
+from scenario import create_objects
+from simulation_manager import SimulationManager
+
+# (num_red, num_blue, dt, steps), from the dense paths to the spatial grid and the gated assignment
+SCENARIOS = [
+    (8, 6, 1, 60),
+    (60, 60, 2.5, 40),
+    (120, 100, 1, 30),
+    (400, 350, 1, 8),
+]
+
+
+def create_scenario(num_red: int, num_blue: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        'red_position': rng.uniform([-100, -100, 0], [100, 100, 100], (num_red, 3)),
+        'red_velocity': rng.uniform(-2, 2, (num_red, 3)),
+        'blue_launch_site_position': rng.uniform([-20, -20, 0], [20, 20, 0], (num_blue, 3)),
+        'blue_max_speed': rng.uniform(1, 4, num_blue),
+    }
+
+
+def run(scenario: dict, backend: str, dt: float, steps: int) -> list[dict]:
+    # every tick of the scenario on one backend
+    kernels._set_backend_unchecked(backend)
+    simulation_manager = SimulationManager(*create_objects(scenario), dt)
+    ticks = []
+    for _ in range(steps):
+        simulation_manager.step(simulation_manager.env.take_action())
+        ticks.append({name: array.copy() for name, array in simulation_manager.state.arrays().items()})
+    return ticks
+
+
+def check_trajectories(seed: int) -> list[str]:
+    errors = []
+    for num_red, num_blue, dt, steps in SCENARIOS:
+        scenario = create_scenario(num_red, num_blue, seed)
+        expected = run(scenario, 'numpy', dt, steps)
+        actual = run(scenario, 'numba', dt, steps)
+        for tick, (expected_arrays, actual_arrays) in enumerate(zip(expected, actual)):
+            for name, array in expected_arrays.items():
+                if not np.array_equal(array, actual_arrays[name]):
+                    errors.append(f'{num_red} red, {num_blue} blue: {name} differs at tick {tick}')
+            if errors:
+                break
+        print(f'{num_red:>4} red {num_blue:>4} blue  dt {dt:<4} {steps:>3} ticks  '
+              f'{"ok" if not errors else "DIFFERENT"}', file=sys.stderr)
+    return errors
+
+
+def check_intercept_edge_cases() -> list[str]:
+    # equal speeds, blue objects on top of their target, idle targets and blue objects that cannot move
+    blue_positions = np.array([[0, 0, 0], [0, 0, 0], [5, 5, 5], [0, 0, 0], [1, 2, 3]], dtype=np.float64)
+    blue_max_speeds = np.array([3, 3, 3, 0, 1], dtype=np.float64)
+    red_positions = np.array([[10, 0, 0], [-10, 0, 0], [5, 5, 5], [10, 0, 0], [1, 2, 3.5]], dtype=np.float64)
+    red_velocities = np.array([[-3, 0, 0], [-3, 0, 0], [1, 0, 0], [0, 0, 0], [0, 5, 0]], dtype=np.float64)
+
+    results = {}
+    for backend in kernels.BACKENDS:
+        kernels._set_backend_unchecked(backend)
+        results[backend] = (intercept_cost(blue_positions, blue_max_speeds, red_positions, red_velocities),
+                            intercept_cost_matrix(blue_positions, blue_max_speeds, red_positions, red_velocities))
+
+    errors = []
+    for name, expected, actual in zip(('intercept_cost', 'intercept_cost_matrix'), results['numpy'], results['numba']):
+        if not np.array_equal(expected, actual):
+            errors.append(f'{name} differs on the edge cases')
+    return errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Check that the kernels give the same trajectories as the NumPy code')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if not kernels.NUMBA_AVAILABLE:
+        print('Numba is not installed, the kernels are checked as plain Python', file=sys.stderr)
+
+    backend = kernels.get_backend()
+    try:
+        with np.errstate(all='ignore'):
+            errors = check_intercept_edge_cases() + check_trajectories(args.seed)
+    finally:
+        kernels._set_backend_unchecked(backend)
+
+    for error in errors:
+        print(f'MISMATCH: {error}', file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
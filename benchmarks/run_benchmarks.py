@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from red_object import RedObject
+from blue_object import BlueObject
+from simulation_manager import SimulationManager
+from algorithms_env import reorder_objects_by_distance
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def create_simulation_manager(num_objects: int, seed: int = 0) -> SimulationManager:
+    # num_objects red and num_objects blue objects spread over the arena
+    rng = np.random.default_rng(seed)
+    low, high = np.array([-100, -100, 0]), np.array([100, 100, 100])
+    red_object_list = [RedObject(position, velocity) for position, velocity in
+                       zip(rng.uniform(low, high, (num_objects, 3)), rng.uniform(-1, 1, (num_objects, 3)))]
+    blue_object_list = [BlueObject(position, 3.0) for position in rng.uniform(low, high, (num_objects, 3))]
+    return SimulationManager(red_object_list, blue_object_list)
+
+
+def create_clustered_simulation_manager(num_objects: int, seed: int = 0) -> SimulationManager:
+    # num_objects blue objects launched from one site and num_objects red objects coming from 800 to 1000 units
+    # away, every blue object has about the same nearest red objects
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0, 2 * np.pi, num_objects)
+    distance = rng.uniform(800, 1000, num_objects)
+    red_positions = np.column_stack((distance * np.cos(angle), distance * np.sin(angle), rng.uniform(0, 100, num_objects)))
+    red_object_list = [RedObject(position, velocity) for position, velocity in
+                       zip(red_positions, rng.uniform(-1, 1, (num_objects, 3)))]
+    blue_positions = np.column_stack((rng.uniform(-20, 20, (num_objects, 2)), np.zeros(num_objects)))
+    blue_object_list = [BlueObject(position, 3.0) for position in blue_positions]
+    return SimulationManager(red_object_list, blue_object_list)
+
+
+LAYOUTS = {
+    'uniform': create_simulation_manager,
+    'clustered': create_clustered_simulation_manager,
+}
+
+
+def bench_step(simulation_manager: SimulationManager):
+    action = simulation_manager.env.take_action()
+    return lambda: simulation_manager.env.step(action)
+
+
+def bench_take_action(simulation_manager: SimulationManager):
+    return simulation_manager.env.take_action
+
+
+def bench_reorder_objects_by_distance(simulation_manager: SimulationManager):
+    env = simulation_manager.env
+    return lambda: reorder_objects_by_distance(env.red_object_list, env.blue_object_list)
+
+
+def bench_kill_manager(simulation_manager: SimulationManager):
+    return simulation_manager.kill_manager
+
+
+def bench_create_graph(simulation_manager: SimulationManager):
+    from visualization.dash_utils import create_graph
+    return lambda: create_graph(simulation_manager)
+
+
+def bench_create_leaflet_map(simulation_manager: SimulationManager):
+    from visualization.dash_utils import create_leaflet_map
+    return lambda: create_leaflet_map(simulation_manager)
+
+
+# name -> (benchmark, layout of the objects)
+BENCHMARKS = {
+    'step': (bench_step, 'uniform'),
+    'take_action': (bench_take_action, 'uniform'),
+    'take_action_clustered': (bench_take_action, 'clustered'),
+    'reorder_objects_by_distance': (bench_reorder_objects_by_distance, 'uniform'),
+    'kill_manager': (bench_kill_manager, 'uniform'),
+    'kill_manager_clustered': (bench_kill_manager, 'clustered'),
+    'create_graph': (bench_create_graph, 'uniform'),
+    'create_leaflet_map': (bench_create_leaflet_map, 'uniform'),
+}
+
+
+def time_call(function, repeat: int, min_time: float) -> list[float]:
+    # time single calls until both `repeat` calls and `min_time` seconds are done
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - start < min_time:
+        call_start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - call_start)
+    return timings
+
+
+def run_benchmarks(names: list[str], sizes: list[int], repeat: int, min_time: float, max_call_time: float) -> dict:
+    results = {}
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            benchmark, layout = BENCHMARKS[name]
+            function = benchmark(LAYOUTS[layout](size))
+
+            # a single call decides whether this size is still affordable
+            first_call = time_call(function, 1, 0)[0]
+            if first_call > max_call_time:
+                print(f'{name:<28} {size:>6}  {first_call:10.4f}s  too slow, larger sizes skipped', file=sys.stderr)
+                results[name][str(size)] = {'median': first_call, 'min': first_call, 'calls': 1}
+                break
+
+            timings = time_call(function, repeat, min_time)
+            results[name][str(size)] = {'median': statistics.median(timings), 'min': min(timings), 'calls': len(timings)}
+            print(f'{name:<28} {size:>6}  {statistics.median(timings):10.6f}s', file=sys.stderr)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # return a message for every benchmark that got slower than the baseline by more than the tolerance
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference is None:
+                continue
+            ratio = result['median'] / reference['median']
+            print(f'{name:<28} {size:>6}  {ratio:6.2f}x baseline', file=sys.stderr)
+            if ratio > 1 + tolerance:
+                regressions.append(f'{name} with {size} objects: {result["median"]:.6f}s vs {reference["median"]:.6f}s ({ratio:.2f}x)')
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the simulation hot paths as the object count grows')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--max-call-time', type=float, default=30.0, help='stop growing a benchmark once one call takes longer')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.min_time, args.max_call_time)
+    report = {
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=4)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline to create it', file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
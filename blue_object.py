@@ -1,22 +1,86 @@
 import numpy as np
-import plotly.graph_objs as go
+from world_state import WorldState
 
 
 class BlueObjectBase:
-    _id_counter = 1  # Class-level variable to track the unique ID
     def __init__(self,
                  launch_site_position: np.ndarray = np.array([0, 0, 0], dtype=np.float64),
                  max_speed: float = 3):
-        self.id = BlueObjectBase._id_counter
-        self.launch_site_position = launch_site_position.copy()
-        self.position = launch_site_position.copy()
+        # a standalone object owns a single row world state until an environment binds it to its own
+        self.bind(WorldState(num_blue=1), 0)
+        self.id = 0  # the object list of the environment gives it an id
+        self.launch_site_position = launch_site_position
+        self.position = launch_site_position
         self.current_velocity = np.array([0, 0, 0], dtype=np.float64)
         self.max_speed = max_speed
         self.i_am_alive = True
 
-        BlueObjectBase._id_counter += 1 # Increment the ID counter
+    @classmethod
+    def from_state(cls, state: WorldState) -> list:
+        # one object per blue row of the state, bound in order so the arrays are used without a copy
+        state.blue_id[:] = np.arange(1, state.num_blue + 1)
 
-    def step(self, action):
+        objects = []
+        for slot in range(state.num_blue):
+            blue_object = cls.__new__(cls)
+            blue_object.bind(state, slot)
+            objects.append(blue_object)
+        return objects
+
+    def bind(self, state: WorldState, slot: int):
+        self._state = state
+        self._slot = slot
+
+    # The attributes below are views onto this object's row in the world state
+    @property
+    def id(self) -> int:
+        return int(self._state.blue_id[self._slot])
+
+    @id.setter
+    def id(self, value: int):
+        self._state.blue_id[self._slot] = value
+
+    @property
+    def launch_site_position(self) -> np.ndarray:
+        return self._state.blue_launch_site_position[self._slot]
+
+    @launch_site_position.setter
+    def launch_site_position(self, value):
+        self._state.blue_launch_site_position[self._slot] = value
+
+    @property
+    def position(self) -> np.ndarray:
+        return self._state.blue_position[self._slot]
+
+    @position.setter
+    def position(self, value):
+        self._state.blue_position[self._slot] = value
+
+    @property
+    def current_velocity(self) -> np.ndarray:
+        return self._state.blue_velocity[self._slot]
+
+    @current_velocity.setter
+    def current_velocity(self, value):
+        self._state.blue_velocity[self._slot] = value
+
+    @property
+    def max_speed(self) -> float:
+        return float(self._state.blue_max_speed[self._slot])
+
+    @max_speed.setter
+    def max_speed(self, value: float):
+        self._state.blue_max_speed[self._slot] = value
+
+    @property
+    def i_am_alive(self) -> bool:
+        return bool(self._state.blue_alive[self._slot])
+
+    @i_am_alive.setter
+    def i_am_alive(self, value: bool):
+        self._state.blue_alive[self._slot] = value
+
+    def step(self, action, dt: float = 1):
         if self.i_am_alive:
             # Calculate the direction vector from the interceptor to the target
             action = action.astype(np.float64)
@@ -26,15 +90,15 @@ class BlueObjectBase:
             if distance == 0:
                 return self.position
 
-            # Scale the action to move a maximum of 3 units in each direction
-            action = (action / distance) * min(self.max_speed, distance)
+            # Scale the action to move a maximum of max_speed * dt units
+            action = (action / distance) * min(self.max_speed * dt, distance)
 
             self.position += action
-            self.current_velocity = action
+            self.current_velocity = action / dt
         return self.position
 
     def reset(self):
-        self.position = self.launch_site_position.copy()
+        self.position = self.launch_site_position
         self.i_am_alive = True
 
         return self.position
@@ -43,67 +107,20 @@ class BlueObjectBase:
         return self.position
 
     def plot_object_3d(self):
-        if not self.i_am_alive:
-            return go.Scatter3d()
-        marker_trace = go.Scatter3d(x=[self.position[0]], y=[self.position[1]], z=[self.position[2]],
-                            mode='markers',
-                            marker=dict(size=10, color='blue'),
-                            text=f'Blue Object:\n id: {self.id} \n position: {self.position} \n max_speed: {self.max_speed}',
-                            showlegend=False,
-                            )
-
-        # Text trace for the plane symbol positioned above the marker
-        text_trace = go.Scatter3d(
-            x=[self.position[0]],
-            y=[self.position[1]],
-            z=[self.position[2]],  # Offset text above the marker
-            mode='text',
-            text='✈',  # Plane symbol
-            textfont=dict(size=18, color='blue'),
-            showlegend=False,
-        )
-
-        # Return both traces in a list
-        return [marker_trace, text_trace]
+        from visualization.object_traces import blue_object_traces_3d
+        return blue_object_traces_3d(self)
 
     def plot_object_2d(self):
-        if not self.i_am_alive:
-            return go.Scatter()
-        return go.Scatter(x=[self.position[0]], y=[self.position[1]],
-                          mode='markers',
-                          marker=dict(size=10, color='blue'),
-                          text=f'Blue Object:\n id: {self.id} \n position: {self.position} \n max_speed: {self.max_speed}',
-                          showlegend=False)
-
+        from visualization.object_traces import blue_object_trace_2d
+        return blue_object_trace_2d(self)
 
     def plot_launch_site_3d(self):
-        # make green square for the launch site
-        return go.Scatter3d(
-            x=[self.launch_site_position[0]],
-            y=[self.launch_site_position[1]],
-            z=[self.launch_site_position[2]],
-            mode='markers',
-            marker=dict(size=10, color='green', symbol='square'),  # Use square markers
-            text=f'Launch Site: id: {self.id} position: {self.launch_site_position}',
-            showlegend=False
-        )
+        from visualization.object_traces import launch_site_trace_3d
+        return launch_site_trace_3d(self)
 
     def plot_launch_site_2d(self):
-        # make green square for the launch site
-        return go.Scatter(
-            x=[self.launch_site_position[0]],
-            y=[self.launch_site_position[1]],
-            mode='markers',
-            marker=dict(size=10, color='green', symbol='square'),  # Use square markers
-            text=f'Launch Site: id: {self.id} position: {self.launch_site_position}',
-            showlegend=False
-        )
-
-    def to_dict(self):
-        return {
-            "position": self.position.tolist(),
-            "max_speed": self.max_speed,
-        }
+        from visualization.object_traces import launch_site_trace_2d
+        return launch_site_trace_2d(self)
 
 
 class BlueObject(BlueObjectBase):
@@ -112,9 +129,9 @@ class BlueObject(BlueObjectBase):
                  max_speed: float = 3):
         super().__init__(launch_site_position, max_speed)
 
-    def step(self, action):
+    def step(self, action, dt: float = 1):
         # TODO: Implement the logic to calculate the next position of the blue object
-        super().step(action)
+        super().step(action, dt)
 
     def reset(self):
         # TODO: Implement the logic to reset the blue object
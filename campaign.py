@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator
+
+import numpy as np
+from simulation_manager import SimulationManager
+from scenario import load_scenario_arrays, create_objects
+
+# Scenario arrays of the current worker process, shipped once by the pool initializer
+_worker_scenario: dict | None = None
+
+
+def run_episode(scenario: dict, seed: int, position_noise: float = 0.0, velocity_noise: float = 0.0, max_steps: int = 1000, dt: float = 1,
+                event_driven: bool = False) -> dict:
+    # run one perturbed episode of the scenario, the seed makes the perturbation reproducible
+    rng = np.random.default_rng(seed)
+    red_position = scenario["red_position"] + rng.normal(0, position_noise, scenario["red_position"].shape)
+    red_velocity = scenario["red_velocity"] + rng.normal(0, velocity_noise, scenario["red_velocity"].shape)
+
+    red_object_list, blue_object_list = create_objects(dict(scenario, red_position=red_position, red_velocity=red_velocity))
+
+    outcome = SimulationManager(red_object_list, blue_object_list, dt).run_simulation(max_steps, event_driven)
+    outcome["seed"] = seed
+    return outcome
+
+
+def _init_worker(scenario: dict):
+    global _worker_scenario
+    _worker_scenario = scenario
+
+
+def _run_worker_episode(seed: int, position_noise: float, velocity_noise: float, max_steps: int, dt: float, event_driven: bool) -> dict:
+    return run_episode(_worker_scenario, seed, position_noise, velocity_noise, max_steps, dt, event_driven)
+
+
+def run_campaign(scenario: dict,
+                 seeds: Iterable[int],
+                 position_noise: float = 0.0,
+                 velocity_noise: float = 0.0,
+                 max_steps: int = 1000,
+                 dt: float = 1,
+                 workers: int | None = None,
+                 event_driven: bool = False) -> Iterator[dict]:
+    # run one episode per seed on a process pool and yield each outcome as soon as it completes
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(scenario,)) as executor:
+        futures = [executor.submit(_run_worker_episode, seed, position_noise, velocity_noise, max_steps, dt, event_driven)
+                   for seed in seeds]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+class CampaignStatistics:
+    # running aggregate of episode outcomes
+    def __init__(self):
+        self.episodes = 0
+        self.intercepts = 0
+        self.leakers = 0
+        self.blue_lost = 0
+        self.episodes_with_leakers = 0
+        self.time_to_kill: list[float] = []
+
+    def add(self, outcome: dict):
+        self.episodes += 1
+        self.intercepts += outcome["intercepts"]
+        self.leakers += outcome["leakers"]
+        self.blue_lost += outcome["blue_lost"]
+        self.episodes_with_leakers += outcome["leakers"] > 0
+        self.time_to_kill.extend(outcome["time_to_kill"])
+
+    def summary(self) -> dict:
+        episodes = max(self.episodes, 1)
+        time_to_kill = np.array(self.time_to_kill, dtype=np.float64)
+        return {
+            "episodes": self.episodes,
+            "mean_intercepts": self.intercepts / episodes,
+            "mean_leakers": self.leakers / episodes,
+            "mean_blue_lost": self.blue_lost / episodes,
+            "leak_probability": self.episodes_with_leakers / episodes,
+            "time_to_kill_mean": float(time_to_kill.mean()) if len(time_to_kill) else None,
+            "time_to_kill_p50": float(np.percentile(time_to_kill, 50)) if len(time_to_kill) else None,
+            "time_to_kill_p95": float(np.percentile(time_to_kill, 95)) if len(time_to_kill) else None,
+        }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Run a Monte Carlo campaign of a scenario on all cores")
+    parser.add_argument("scenario", help="scenario file saved from the app")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--position-noise", type=float, default=0.0)
+    parser.add_argument("--velocity-noise", type=float, default=0.0)
+    parser.add_argument("--max-steps", type=int, default=1000, help="simulated time limit of an episode")
+    parser.add_argument("--dt", type=float, default=1.0, help="simulated time of one step")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--event-driven", action="store_true", help="skip the ticks between kills when the engagement is deterministic")
+    parser.add_argument("--output", help="write every episode outcome to this JSON lines file")
+    args = parser.parse_args(argv)
+
+    scenario = load_scenario_arrays(args.scenario)
+    seeds = range(args.first_seed, args.first_seed + args.episodes)
+    statistics = CampaignStatistics()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for outcome in run_campaign(scenario, seeds, args.position_noise, args.velocity_noise, args.max_steps, args.dt, args.workers,
+                                    args.event_driven):
+            statistics.add(outcome)
+            output.write(json.dumps(outcome) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(statistics.summary(), indent=4), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
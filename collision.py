@@ -0,0 +1,320 @@
+import functools
+import numpy as np
+import kernels
+
+# Below this number of candidate pairs a dense distance matrix is cheaper than building the grid
+BRUTE_FORCE_MAX_PAIRS = 4096
+
+# Cell coordinates are packed into one int64 key, so every axis gets at most 2 ** 20 cells
+MAX_CELLS_PER_AXIS = 2 ** 20
+
+# Rings of cells a k nearest query searches around its own cell, the queries left after them are brute forced
+NEAREST_MAX_RING = 2
+
+# Queries whose searched cells hold more than this many points per neighbor wanted are brute forced
+NEAREST_MAX_CANDIDATES = 32
+
+# Distances computed at once by a brute force k nearest query, bounds its memory
+BRUTE_FORCE_CHUNK = 1 << 20
+
+# The 27 cells around (and including) a cell
+_NEIGHBOR_OFFSETS = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij'), axis=-1).reshape(-1, 3)
+
+# The cells of a box at most one cell wide, counted from its lowest cell, and the axes each one steps along as bits
+_BOX_OFFSETS = np.stack(np.meshgrid([0, 1], [0, 1], [0, 1], indexing='ij'), axis=-1).reshape(-1, 3)
+_BOX_AXES = _BOX_OFFSETS @ np.array([4, 2, 1])
+
+
+def find_pairs_within_radius(positions_a: np.ndarray, positions_b: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+    # return the indices (i, j) of every pair with |positions_a[i] - positions_b[j]| <= radius
+    positions_a = np.asarray(positions_a, dtype=np.float64).reshape(-1, 3)
+    positions_b = np.asarray(positions_b, dtype=np.float64).reshape(-1, 3)
+
+    if len(positions_a) == 0 or len(positions_b) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    if len(positions_a) * len(positions_b) <= BRUTE_FORCE_MAX_PAIRS:
+        distances = np.linalg.norm(positions_a[:, None, :] - positions_b[None, :, :], axis=2)
+        return np.nonzero(distances <= radius)
+
+    a_idx, b_idx = _grid_candidates(positions_a, positions_b, radius)
+
+    # narrowphase: exact distance check on the candidate pairs only
+    distances = np.linalg.norm(positions_a[a_idx] - positions_b[b_idx], axis=1)
+    hit = distances <= radius
+    return a_idx[hit], b_idx[hit]
+
+
+def find_k_nearest(queries: np.ndarray, points: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    # return the indices (i, j) of the k points nearest to every query i, every point when there are fewer.
+    # The points are hashed into a grid of cells about as wide as the k nearest distance and every query searches
+    # the rings of cells around its cell until no cell outside them can hold a point nearer than its k-th candidate.
+    # Queries in sparse or crowded regions, e.g. far from every point, are brute forced in chunks instead.
+    queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    k = min(k, len(points))
+    if len(queries) == 0 or k == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    if len(queries) * len(points) <= BRUTE_FORCE_MAX_PAIRS:
+        return _brute_force_k_nearest(queries, points, k, np.arange(len(queries)))
+
+    # cells of the volume spanned by the points, the flat axes of planar or linear layouts do not count
+    origin = points.min(axis=0)
+    extent = points.max(axis=0) - origin
+    spread = extent > extent.max() * 1e-9
+    cell_size = 0.7 * (np.prod(extent[spread]) * k / len(points)) ** (1 / max(np.count_nonzero(spread), 1))
+    cell_size = max(float(cell_size), float(extent.max()) / (MAX_CELLS_PER_AXIS - 1), np.finfo(np.float64).tiny)
+
+    dims = np.floor(extent / cell_size).astype(np.int64) + 1
+    keys = _cell_keys(np.minimum(np.floor((points - origin) / cell_size).astype(np.int64), dims - 1), dims)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # queries outside the grid start from the nearest cell of the grid
+    query_cells = np.clip(np.floor((queries - origin) / cell_size), 0, dims - 1).astype(np.int64)
+
+    # (Q, k) nearest candidates of every query so far
+    nearest_point = np.full((len(queries), k), -1, dtype=np.intp)
+    nearest_distance = np.full((len(queries), k), np.inf)
+    active = np.arange(len(queries))
+    brute_force = [np.empty(0, dtype=np.intp)]
+    for ring in range(1, NEAREST_MAX_RING + 1):
+        # points in the cells at Chebyshev distance `ring` (up to 1 in the first ring) from the cell of every active query
+        neighbor_cells = query_cells[active][:, None, :] + _ring_offsets(ring)[None, :, :]
+        rows, columns = np.nonzero(np.all((neighbor_cells >= 0) & (neighbor_cells < dims), axis=2))
+        neighbor_keys = _cell_keys(neighbor_cells[rows, columns], dims)
+        lo = np.searchsorted(sorted_keys, neighbor_keys, side='left')
+        counts = np.searchsorted(sorted_keys, neighbor_keys, side='right') - lo
+
+        # queries with too many candidates are cheaper to brute force
+        row_counts = np.bincount(rows, weights=counts, minlength=len(active)).astype(np.intp)
+        crowded = row_counts > NEAREST_MAX_CANDIDATES * k
+        brute_force.append(active[crowded])
+        kept_cells = ~crowded[rows]
+        rows, lo, counts = rows[kept_cells], lo[kept_cells], counts[kept_cells]
+        row_counts[crowded] = 0
+
+        # candidates of every row side by side with its nearest ones so far, padded with inf
+        total = int(counts.sum())
+        pair_row = np.repeat(rows, counts)
+        pair_point = order[np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(total)]
+        pair_column = k + np.arange(total) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+        candidate_point = np.full((len(active), k + int(row_counts.max(initial=0))), -1, dtype=np.intp)
+        candidate_distance = np.full(candidate_point.shape, np.inf)
+        candidate_point[:, :k], candidate_distance[:, :k] = nearest_point[active], nearest_distance[active]
+        candidate_point[pair_row, pair_column] = pair_point
+        candidate_distance[pair_row, pair_column] = np.linalg.norm(queries[active[pair_row]] - points[pair_point], axis=1)
+
+        selected = np.argpartition(candidate_distance, k - 1, axis=1)[:, :k]
+        nearest_point[active] = np.take_along_axis(candidate_point, selected, axis=1)
+        nearest_distance[active] = np.take_along_axis(candidate_distance, selected, axis=1)
+
+        # a query is done when its k-th candidate is nearer than any point outside the searched cells
+        outside = _distance_outside_block(queries[active], query_cells[active], ring, origin, cell_size, dims)
+        done = crowded | (nearest_distance[active].max(axis=1) <= outside) | np.isinf(outside)
+        active = active[~done]
+        if len(active) == 0:
+            break
+
+    brute_force = np.concatenate(brute_force + [active])
+    searched = np.ones(len(queries), dtype=bool)
+    searched[brute_force] = False
+    brute_query, brute_point = _brute_force_k_nearest(queries, points, k, brute_force)
+    query_idx = np.concatenate((np.repeat(np.flatnonzero(searched), k), brute_query))
+    point_idx = np.concatenate((nearest_point[searched].ravel(), brute_point))
+    return query_idx, point_idx
+
+
+def _brute_force_k_nearest(queries: np.ndarray, points: np.ndarray, k: int, query_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # k nearest points of the given queries from all their distances, BRUTE_FORCE_CHUNK distances at a time
+    if k == len(points):
+        return np.repeat(query_ids, k), np.tile(np.arange(len(points)), len(query_ids))
+
+    # |q - p|^2 = |q|^2 - 2 q.p + |p|^2, and |q|^2 does not change the order of the points of a query
+    chunk = max(BRUTE_FORCE_CHUNK // len(points), 1)
+    points_squared = np.einsum('ij,ij->i', points, points)
+    nearest = [np.empty((0, k), dtype=np.intp)]
+    for start in range(0, len(query_ids), chunk):
+        distances = points_squared - 2 * (queries[query_ids[start:start + chunk]] @ points.T)
+        nearest.append(np.argpartition(distances, k - 1, axis=1)[:, :k])
+    return np.repeat(query_ids, k), np.concatenate(nearest).ravel()
+
+
+def _distance_outside_block(queries: np.ndarray, query_cells: np.ndarray, ring: int, origin: np.ndarray,
+                            cell_size: float, dims: np.ndarray) -> np.ndarray:
+    # smallest distance from every query to the grid outside the block of cells within `ring` of its cell,
+    # inf when the block covers the whole grid
+    grid_low, grid_high = origin, origin + dims * cell_size
+    block_low = np.maximum(query_cells - ring, 0)
+    block_high = np.minimum(query_cells + ring, dims - 1)
+
+    distance = np.full(len(queries), np.inf)
+    for axis in range(3):
+        # the slabs of the grid below and above the block along the axis
+        for exists, low, high in ((block_low[:, axis] > 0, grid_low[axis], origin[axis] + block_low[:, axis] * cell_size),
+                                  (block_high[:, axis] < dims[axis] - 1, origin[axis] + (block_high[:, axis] + 1) * cell_size, grid_high[axis])):
+            slab_low = np.broadcast_to(grid_low, queries.shape).copy()
+            slab_high = np.broadcast_to(grid_high, queries.shape).copy()
+            slab_low[:, axis], slab_high[:, axis] = low, high
+            gap = np.maximum(np.maximum(slab_low - queries, queries - slab_high), 0)
+            distance = np.where(exists, np.minimum(distance, np.linalg.norm(gap, axis=1)), distance)
+    return distance
+
+
+@functools.lru_cache(maxsize=None)
+def _ring_offsets(ring: int) -> np.ndarray:
+    # the cells at Chebyshev distance `ring` from a cell, the first ring includes the cell itself
+    axis = np.arange(-ring, ring + 1)
+    offsets = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+    return offsets[np.abs(offsets).max(axis=1) == ring] if ring > 1 else offsets
+
+
+def find_swept_pairs(start_a: np.ndarray, end_a: np.ndarray, start_b: np.ndarray, end_b: np.ndarray,
+                     radius: float) -> tuple[np.ndarray, np.ndarray]:
+    # return the indices (i, j) of every pair that comes within radius at any moment of a tick in which every
+    # object moves in a straight line from its start to its end position, so fast objects cannot pass
+    # through each other between two ticks
+    start_a = np.asarray(start_a, dtype=np.float64).reshape(-1, 3)
+    end_a = np.asarray(end_a, dtype=np.float64).reshape(-1, 3)
+    start_b = np.asarray(start_b, dtype=np.float64).reshape(-1, 3)
+    end_b = np.asarray(end_b, dtype=np.float64).reshape(-1, 3)
+
+    if len(start_a) == 0 or len(start_b) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    if len(start_a) * len(start_b) <= BRUTE_FORCE_MAX_PAIRS:
+        if kernels.enabled():
+            a_idx, b_idx = np.divmod(np.arange(len(start_a) * len(start_b)), len(start_b))
+            hit = kernels.swept_hits(start_a, end_a, start_b, end_b, a_idx, b_idx, radius)
+            return a_idx[hit], b_idx[hit]
+        distances = closest_approach(start_a[:, None, :] - start_b[None, :, :], end_a[:, None, :] - end_b[None, :, :])
+        return np.nonzero(distances <= radius)
+
+    a_idx, b_idx = _swept_candidates(start_a, end_a, start_b, end_b, radius)
+
+    # narrowphase: exact closest approach of the candidate pairs only
+    if kernels.enabled():
+        hit = kernels.swept_hits(start_a, end_a, start_b, end_b, a_idx, b_idx, radius)
+    else:
+        hit = closest_approach(start_a[a_idx] - start_b[b_idx], end_a[a_idx] - end_b[b_idx]) <= radius
+    return a_idx[hit], b_idx[hit]
+
+
+def _swept_candidates(start_a: np.ndarray, end_a: np.ndarray, start_b: np.ndarray, end_b: np.ndarray,
+                      radius: float) -> tuple[np.ndarray, np.ndarray]:
+    # broadphase of find_swept_pairs: every segment is cut into pieces no longer than half a cell and the box
+    # around each piece, padded by half the radius, is hashed into every cell it covers. Two segments that come
+    # within radius have pieces whose boxes share a cell. Cells are twice as wide as the mean segment, so a few
+    # long segments only add pieces instead of widening the cells of every object.
+    lengths_a = np.linalg.norm(end_a - start_a, axis=1)
+    lengths_b = np.linalg.norm(end_b - start_b, axis=1)
+    all_points = np.concatenate((start_a, end_a, start_b, end_b))
+    origin = all_points.min(axis=0) - radius
+    extent = all_points.max(axis=0) + radius - origin
+    cell_size = max(2 * max(float(radius), float(np.concatenate((lengths_a, lengths_b)).mean())),
+                    float(extent.max()) / (MAX_CELLS_PER_AXIS - 3), np.finfo(np.float64).tiny)
+    dims = np.floor(extent / cell_size).astype(np.int64) + 1
+
+    piece_a, keys_a = _piece_keys(start_a, end_a, lengths_a, radius, origin, cell_size, dims)
+    piece_b, keys_b = _piece_keys(start_b, end_b, lengths_b, radius, origin, cell_size, dims)
+
+    order_b = np.argsort(keys_b, kind='stable')
+    sorted_keys_b = keys_b[order_b]
+
+    # expand the cells of the a pieces into explicit (a, b) pairs of objects, once per pair
+    lo = np.searchsorted(sorted_keys_b, keys_a, side='left')
+    counts = np.searchsorted(sorted_keys_b, keys_a, side='right') - lo
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    pair_a = np.repeat(piece_a, counts)
+    pair_b = piece_b[order_b[np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(total)]]
+
+    pairs = np.unique(pair_a.astype(np.int64) * len(start_b) + pair_b)
+    return (pairs // len(start_b)).astype(np.intp), (pairs % len(start_b)).astype(np.intp)
+
+
+def _piece_keys(start: np.ndarray, end: np.ndarray, lengths: np.ndarray, radius: float, origin: np.ndarray,
+                cell_size: float, dims: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # cut the segments into pieces no longer than half a cell, return the segment and the cell key of every
+    # (piece, cell)
+    num_pieces = np.maximum(np.ceil(2 * lengths / cell_size), 1).astype(np.intp)
+    if num_pieces.max(initial=1) == 1:
+        # short segments are their own single piece
+        segment, piece_start, piece_end = np.arange(len(start)), start, end
+    else:
+        segment = np.repeat(np.arange(len(start)), num_pieces)
+        piece = np.arange(len(segment)) - np.repeat(np.cumsum(num_pieces) - num_pieces, num_pieces)
+        motion = (end - start)[segment] / num_pieces[segment][:, None]
+        piece_start = start[segment] + motion * piece[:, None]
+        piece_end = piece_start + motion
+
+    # a padded piece is at most one cell wide, so it covers up to two cells along every axis. The cells of its box
+    # are the lowest one plus the offsets that only step along the axes the box spans.
+    low = np.floor((np.minimum(piece_start, piece_end) - radius / 2 - origin) / cell_size).astype(np.int64)
+    high = np.floor((np.maximum(piece_start, piece_end) + radius / 2 - origin) / cell_size).astype(np.int64)
+    low, high = np.minimum(np.maximum(low, 0), dims - 1), np.minimum(np.maximum(high, 0), dims - 1)
+    spanned_axes = (high > low) @ np.array([4, 2, 1])
+    rows, columns = np.nonzero((_BOX_AXES[None, :] & ~spanned_axes[:, None]) == 0)
+    return segment[rows], _cell_keys(low, dims)[rows] + _cell_keys(_BOX_OFFSETS, dims)[columns]
+
+
+def closest_approach(start_offset: np.ndarray, end_offset: np.ndarray) -> np.ndarray:
+    # smallest distance during the tick of pairs whose offset (a - b) moves linearly from start to end
+    motion = end_offset - start_offset
+    motion_squared = np.einsum('...i,...i->...', motion, motion)
+    s = np.divide(-np.einsum('...i,...i->...', start_offset, motion), motion_squared,
+                  out=np.zeros_like(motion_squared), where=motion_squared > 0)
+    s = np.clip(s, 0, 1)
+    return np.linalg.norm(start_offset + motion * s[..., None], axis=-1)
+
+
+def first_contact_time(offset: np.ndarray, relative_velocity: np.ndarray, radius: float) -> np.ndarray:
+    # earliest time t >= 0 at which pairs whose offset (a - b) moves as offset + relative_velocity * t come within
+    # radius, inf for pairs that never do
+    a = np.einsum('...i,...i->...', relative_velocity, relative_velocity)
+    b = 2 * np.einsum('...i,...i->...', offset, relative_velocity)
+    c = np.einsum('...i,...i->...', offset, offset) - radius ** 2
+
+    # pairs still outside the radius meet only while closing in, at the smaller root c / q
+    discriminant = b * b - 4 * a * c
+    closing = (b < 0) & (discriminant >= 0)
+    q = -0.5 * (b - np.sqrt(np.maximum(discriminant, 0)))
+    time = np.divide(c, q, out=np.full_like(c, np.inf), where=closing)
+    return np.where(c <= 0, 0.0, time)
+
+
+def _grid_candidates(positions_a: np.ndarray, positions_b: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+    # broadphase: hash both sets into a uniform grid of cells at least `radius` wide and pair every
+    # object of a with the objects of b in its own and in the 26 neighboring cells
+    origin = np.minimum(positions_a.min(axis=0), positions_b.min(axis=0))
+    extent = np.maximum(positions_a.max(axis=0), positions_b.max(axis=0)) - origin
+    cell_size = max(float(radius), float(extent.max()) / (MAX_CELLS_PER_AXIS - 3), np.finfo(np.float64).tiny)
+
+    # cells are shifted by one so that neighbor offsets never go below zero
+    dims = np.floor(extent / cell_size).astype(np.int64) + 3
+    cells_a = np.floor((positions_a - origin) / cell_size).astype(np.int64) + 1
+    cells_b = np.floor((positions_b - origin) / cell_size).astype(np.int64) + 1
+
+    keys_b = _cell_keys(cells_b, dims)
+    order_b = np.argsort(keys_b, kind='stable')
+    sorted_keys_b = keys_b[order_b]
+
+    # look up the range of b objects in each neighbor cell of every a object
+    neighbor_keys = _cell_keys(cells_a[:, None, :] + _NEIGHBOR_OFFSETS[None, :, :], dims).ravel()
+    lo = np.searchsorted(sorted_keys_b, neighbor_keys, side='left')
+    hi = np.searchsorted(sorted_keys_b, neighbor_keys, side='right')
+    counts = hi - lo
+
+    # expand the ranges into explicit candidate pairs
+    total = int(counts.sum())
+    a_idx = np.repeat(np.arange(len(positions_a)).repeat(len(_NEIGHBOR_OFFSETS)), counts)
+    starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    b_idx = order_b[starts + np.arange(total)]
+
+    return a_idx, b_idx
+
+
+def _cell_keys(cells: np.ndarray, dims: np.ndarray) -> np.ndarray:
+    return (cells[..., 0] * dims[1] + cells[..., 1]) * dims[2] + cells[..., 2]
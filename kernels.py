@@ -0,0 +1,145 @@
+import functools
+import importlib.util
+import os
+import warnings
+import numpy as np
+
+# Fused loop kernels of the simulation hot paths, compiled with Numba when it is installed.
+# The 'numba' backend runs them, the 'numpy' backend the vectorized code. Both give the same results bit for bit,
+# benchmarks/kernel_parity.py checks it. By default the kernels are used when Numba is installed.
+BACKENDS = ('numpy', 'numba')
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+
+def _resolve(backend: str) -> str:
+    # without Numba the kernels would run as plain Python loops, the vectorized NumPy code is used instead
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend {backend!r}, expected one of {BACKENDS}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        warnings.warn("Numba is not installed, falling back to the 'numpy' backend", RuntimeWarning, stacklevel=3)
+        return 'numpy'
+    return backend
+
+
+_backend = _resolve(os.environ.get('GMOP_BACKEND', 'numba' if NUMBA_AVAILABLE else 'numpy'))
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(backend: str):
+    global _backend
+    _backend = _resolve(backend)
+
+
+def _set_backend_unchecked(backend: str):
+    # runs the kernels even without Numba, as plain Python, only for benchmarks/kernel_parity.py
+    global _backend
+    _backend = backend
+
+
+def enabled() -> bool:
+    return _backend == 'numba'
+
+
+def _kernel(function):
+    # compiled the first time it runs, so importing this module does not import Numba
+    compiled = []
+
+    @functools.wraps(function)
+    def run(*args):
+        if not compiled:
+            if NUMBA_AVAILABLE:
+                import numba
+                compiled.append(numba.njit(cache=True, error_model='numpy')(function))
+            else:
+                compiled.append(function)
+        return compiled[0](*args)
+    return run
+
+
+@_kernel
+def step_blue(position, velocity, alive, max_speed, action, dt):
+    # WorldState.step_blue for one blue object at a time, position and velocity are updated in place
+    for i in range(len(position)):
+        if not alive[i]:
+            continue
+        action_x, action_y, action_z = action[i, 0], action[i, 1], action[i, 2]
+        distance = np.sqrt(action_x * action_x + action_y * action_y + action_z * action_z)
+        if distance > 0:
+            scale = min(max_speed[i] * dt, distance) / distance
+            action_x, action_y, action_z = action_x * scale, action_y * scale, action_z * scale
+            position[i, 0] += action_x
+            position[i, 1] += action_y
+            position[i, 2] += action_z
+            velocity[i, 0] = action_x / dt
+            velocity[i, 1] = action_y / dt
+            velocity[i, 2] = action_z / dt
+
+
+@_kernel
+def swept_hits(start_a, end_a, start_b, end_b, a_idx, b_idx, radius):
+    # collision.closest_approach of the pairs (a_idx[k], b_idx[k]) compared with radius, without temporaries
+    hit = np.zeros(len(a_idx), dtype=np.bool_)
+    for k in range(len(a_idx)):
+        i, j = a_idx[k], b_idx[k]
+        start_x = start_a[i, 0] - start_b[j, 0]
+        start_y = start_a[i, 1] - start_b[j, 1]
+        start_z = start_a[i, 2] - start_b[j, 2]
+        motion_x = (end_a[i, 0] - end_b[j, 0]) - start_x
+        motion_y = (end_a[i, 1] - end_b[j, 1]) - start_y
+        motion_z = (end_a[i, 2] - end_b[j, 2]) - start_z
+
+        motion_squared = motion_x * motion_x + motion_y * motion_y + motion_z * motion_z
+        s = 0.0
+        if motion_squared > 0:
+            s = -(start_x * motion_x + start_y * motion_y + start_z * motion_z) / motion_squared
+        s = min(max(s, 0.0), 1.0)
+
+        x, y, z = start_x + motion_x * s, start_y + motion_y * s, start_z + motion_z * s
+        hit[k] = np.sqrt(x * x + y * y + z * z) <= radius
+    return hit
+
+
+@_kernel
+def intercept_costs(blue_positions, blue_max_speeds, red_positions, red_velocities, blue_idx, red_idx, unreachable_cost):
+    # assignment.intercept_cost of the pairs (blue_idx[k], red_idx[k]), the closed form intercept of
+    # trajectoy_pradiction.intercept_prediction solved one pair at a time
+    cost = np.empty(len(blue_idx), dtype=np.float64)
+    for k in range(len(blue_idx)):
+        i, j = blue_idx[k], red_idx[k]
+        relative_x = red_positions[j, 0] - blue_positions[i, 0]
+        relative_y = red_positions[j, 1] - blue_positions[i, 1]
+        relative_z = red_positions[j, 2] - blue_positions[i, 2]
+        velocity_x, velocity_y, velocity_z = red_velocities[j, 0], red_velocities[j, 1], red_velocities[j, 2]
+        speed = blue_max_speeds[i]
+
+        red_speed_squared = velocity_x * velocity_x + velocity_y * velocity_y + velocity_z * velocity_z
+        a = red_speed_squared - speed ** 2
+        b = 2 * (relative_x * velocity_x + relative_y * velocity_y + relative_z * velocity_z)
+        c = relative_x * relative_x + relative_y * relative_y + relative_z * relative_z
+
+        if c == 0:
+            intercept_time = 0.0
+        elif abs(a) <= 1e-8:
+            # red speed equals blue speed, the equation degenerates to b * t + c = 0
+            intercept_time = -c / b
+            if not (np.isfinite(intercept_time) and intercept_time >= 0):
+                intercept_time = np.inf
+        else:
+            discriminant = b * b - 4 * a * c
+            intercept_time = np.inf
+            if discriminant >= 0:
+                q = -0.5 * (b + np.copysign(np.sqrt(discriminant), b))
+                for root in (q / a, c / q):
+                    if np.isfinite(root) and root >= 0:
+                        intercept_time = min(intercept_time, root)
+
+        if np.isfinite(intercept_time):
+            cost[k] = intercept_time
+        else:
+            # unreachable targets are still ranked, by the time to reach their current position
+            chase_time = np.sqrt(c) / speed
+            cost[k] = unreachable_cost + min(chase_time, unreachable_cost)
+    return cost
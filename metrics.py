@@ -0,0 +1,120 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Timing is off unless enabled here or with the GMOP_METRICS environment variable
+_enabled = os.environ.get('GMOP_METRICS', '0') not in ('', '0', 'false', 'False')
+_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label: str):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._series: dict[str, list] = {}  # label value -> [bucket counts, sum, count]
+
+    def observe(self, label_value: str, seconds: float):
+        with _lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(BUCKETS), 0.0, 0]
+            index = bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with _lock:
+            for label_value, (bucket_counts, total, count) in sorted(self._series.items()):
+                labels = f'{self.label}="{label_value}"'
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total}')
+                lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+    def clear(self):
+        with _lock:
+            self._series.clear()
+
+
+PHASE_SECONDS = Histogram('gmop_phase_seconds', 'Time spent in each phase of a simulation tick.', 'phase')
+CALLBACK_SECONDS = Histogram('gmop_dash_callback_seconds', 'Time spent in each Dash callback.', 'callback')
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label_value', 'start')
+
+    def __init__(self, histogram: Histogram, label_value: str):
+        self.histogram = histogram
+        self.label_value = label_value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(self.label_value, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable(enabled: bool = True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def phase(name: str, histogram: Histogram = PHASE_SECONDS):
+    # context manager timing a block, a shared no-op when metrics are disabled
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(histogram, name)
+
+
+def timed(name: str, histogram: Histogram = PHASE_SECONDS):
+    # decorator timing every call of the function
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Timer(histogram, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_callback(function):
+    # decorator timing a Dash callback under its function name
+    return timed(function.__name__, CALLBACK_SECONDS)(function)
+
+
+def render_prometheus() -> str:
+    return '\n'.join(PHASE_SECONDS.render() + CALLBACK_SECONDS.render()) + '\n'
@@ -0,0 +1,59 @@
+import base64
+import copy
+import uuid
+import numpy as np
+from simulation_manager import SimulationManager
+
+
+def record_engagement(simulation_manager: SimulationManager, max_steps: int = 1000, in_place: bool = False) -> dict:
+    # Run a copy of the scenario headless to completion and keep every frame as (frames, N, ...) arrays.
+    # The given simulation manager is not modified unless in_place is set (for callers that already hold a copy),
+    # a team without objects gives (frames, 0, ...) arrays.
+    if not in_place:
+        simulation_manager = copy.deepcopy(simulation_manager)
+    state = simulation_manager.state
+
+    time, red_position, red_alive, blue_position, blue_alive = [], [], [], [], []
+
+    def keep_frame():
+        time.append(simulation_manager.time)
+        red_position.append(state.red_position.copy())
+        red_alive.append(state.red_alive.copy())
+        blue_position.append(state.blue_position.copy())
+        blue_alive.append(state.blue_alive.copy())
+
+    keep_frame()
+    done = state.num_red < 1 or state.num_blue < 1
+    while not done and simulation_manager.time < max_steps:
+        _, _, done, _ = simulation_manager.step(simulation_manager.env.take_action())
+        done = done or not state.red_alive.any()
+        keep_frame()
+
+    return {
+        'time': np.array(time, dtype=np.float64),
+        'red_id': state.red_id.copy(),
+        'red_velocity': state.red_velocity.copy(),
+        'red_position': np.array(red_position, dtype=np.float64).reshape(len(time), state.num_red, 3),
+        'red_alive': np.array(red_alive, dtype=bool).reshape(len(time), state.num_red),
+        'blue_id': state.blue_id.copy(),
+        'blue_max_speed': state.blue_max_speed.copy(),
+        'blue_position': np.array(blue_position, dtype=np.float64).reshape(len(time), state.num_blue, 3),
+        'blue_alive': np.array(blue_alive, dtype=bool).reshape(len(time), state.num_blue),
+    }
+
+
+def encode_array(array: np.ndarray) -> dict:
+    # compact typed array for the browser: float32 or uint8 bytes in base64
+    dtype = 'uint8' if array.dtype == bool else 'float32'
+    data = np.ascontiguousarray(array, dtype=dtype).tobytes()
+    return {'dtype': dtype, 'shape': list(array.shape), 'data': base64.b64encode(data).decode('ascii')}
+
+
+def encode_recording(recording: dict) -> dict:
+    # JSON ready recording, the key lets the browser decode each recording only once
+    encoded = {name: encode_array(value) if isinstance(value, np.ndarray) else value for name, value in recording.items()}
+    encoded['key'] = uuid.uuid4().hex
+    encoded['num_frames'] = len(recording['red_position'])
+    encoded['num_red'] = recording['red_position'].shape[1]
+    encoded['num_blue'] = recording['blue_position'].shape[1]
+    return encoded
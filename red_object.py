@@ -1,28 +1,83 @@
 import numpy as np
-import plotly.graph_objs as go
+from world_state import WorldState
 
 
 class RedObjectBase:
-    _id_counter = 1  # Class-level variable to track the unique ID
-
     def __init__(self,
                  initial_position: np.ndarray = np.array([-50, -50, 50]),
                  velocity: np.ndarray = np.array([1, 0, 0])):
-        self.id = RedObjectBase._id_counter
-        self.initial_position = initial_position.copy()
-        self.position = initial_position.copy()
+        # a standalone object owns a single row world state until an environment binds it to its own
+        self.bind(WorldState(num_red=1), 0)
+        self.id = 0  # the object list of the environment gives it an id
+        self.initial_position = initial_position
+        self.position = initial_position
         self.velocity = velocity
         self.i_am_alive = True
 
-        RedObjectBase._id_counter += 1 # Increment the ID counter
+    @classmethod
+    def from_state(cls, state: WorldState) -> list:
+        # one object per red row of the state, bound in order so the arrays are used without a copy
+        state.red_id[:] = np.arange(1, state.num_red + 1)
+
+        objects = []
+        for slot in range(state.num_red):
+            red_object = cls.__new__(cls)
+            red_object.bind(state, slot)
+            objects.append(red_object)
+        return objects
+
+    def bind(self, state: WorldState, slot: int):
+        self._state = state
+        self._slot = slot
+
+    # The attributes below are views onto this object's row in the world state
+    @property
+    def id(self) -> int:
+        return int(self._state.red_id[self._slot])
+
+    @id.setter
+    def id(self, value: int):
+        self._state.red_id[self._slot] = value
+
+    @property
+    def initial_position(self) -> np.ndarray:
+        return self._state.red_initial_position[self._slot]
+
+    @initial_position.setter
+    def initial_position(self, value):
+        self._state.red_initial_position[self._slot] = value
 
-    def step(self):
+    @property
+    def position(self) -> np.ndarray:
+        return self._state.red_position[self._slot]
+
+    @position.setter
+    def position(self, value):
+        self._state.red_position[self._slot] = value
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._state.red_velocity[self._slot]
+
+    @velocity.setter
+    def velocity(self, value):
+        self._state.red_velocity[self._slot] = value
+
+    @property
+    def i_am_alive(self) -> bool:
+        return bool(self._state.red_alive[self._slot])
+
+    @i_am_alive.setter
+    def i_am_alive(self, value: bool):
+        self._state.red_alive[self._slot] = value
+
+    def step(self, dt: float = 1):
         if self.i_am_alive:
-            self.position += self.velocity
+            self.position += self.velocity * dt
         return self.position
 
     def reset(self):
-        self.position = self.initial_position.copy()
+        self.position = self.initial_position
         self.i_am_alive = True
         return self.position
 
@@ -30,84 +85,12 @@ class RedObjectBase:
         return self.position
 
     def plot_object_3d(self):
-        marker_symbol = 'circle' if self.i_am_alive else 'x'
-        marker_size = 10 if self.i_am_alive else 5
-        marker_trace = go.Scatter3d(
-            x=[self.position[0]],
-            y=[self.position[1]],
-            z=[self.position[2]],
-            mode='markers',
-            marker=dict(size=marker_size, symbol=marker_symbol, color='red'),
-            text=f'Object:\n id: {self.id} \n position: {self.position} \n velocity: {self.velocity}',
-            showlegend=False
-        )
-        if not self.i_am_alive:
-            return [marker_trace]
-
-        # Text trace for the plane symbol positioned above the marker
-        text_trace = go.Scatter3d(
-            x=[self.position[0]],
-            y=[self.position[1]],
-            z=[self.position[2] + 2],  # Offset text above the marker
-            mode='text',
-            text='✈',  # Plane symbol
-            textfont=dict(size=18, color='red'),
-            showlegend=False,
-        )
-
-        # Arrow trace for velocity direction
-        # Calculate the end point of the arrow based on the velocity vector
-        end_position = [
-            self.position[0] + 20 * self.velocity[0],
-            self.position[1] + 20 * self.velocity[1],
-            self.position[2] + 20 * self.velocity[2],
-        ]
-
-        arrow_trace = go.Scatter3d(
-            x=[self.position[0], end_position[0]],
-            y=[self.position[1], end_position[1]],
-            z=[self.position[2], end_position[2]],
-            mode='lines',
-            line=dict(color='red', width=5),
-            marker=dict(size=12, color='red'),  # Small marker at the arrow tip
-            showlegend=False
-        )
-
-        # add cone to the arrow
-        cone_trace = go.Cone(
-            x=[end_position[0]],
-            y=[end_position[1]],
-            z=[end_position[2]],
-            u=[self.velocity[0]],
-            v=[self.velocity[1]],
-            w=[self.velocity[2]],
-            colorscale='Reds',
-            sizemode='scaled',
-            sizeref=20,
-            showscale=False,
-            anchor='tail',
-            showlegend=False
-        )
-
-        return [marker_trace, text_trace, arrow_trace, cone_trace]
-
+        from visualization.object_traces import red_object_traces_3d
+        return red_object_traces_3d(self)
 
     def plot_object_2d(self):
-        marker_symbol = 'circle' if self.i_am_alive else 'x'
-        return go.Scatter(
-            x=[self.position[0]],
-            y=[self.position[1]],
-            mode='markers',
-            marker=dict(size=10, symbol=marker_symbol, color='red'),
-            text=f'Object:\n id: {self.id} \n position: {self.position} \n velocity: {self.velocity}',
-            showlegend=False
-        )
-
-    def to_dict(self):
-        return {
-            'position': self.position.tolist(),
-            'velocity': self.velocity.tolist(),
-        }
+        from visualization.object_traces import red_object_trace_2d
+        return red_object_trace_2d(self)
 
 
 class RedObject(RedObjectBase):
@@ -116,9 +99,9 @@ class RedObject(RedObjectBase):
                  velocity: np.ndarray = np.array([1, 0, 0])):
         super().__init__(initial_position, velocity)
 
-    def step(self):
+    def step(self, dt: float = 1):
         # TODO: Implement the logic to calculate the next position of the red object
-        super().step()
+        super().step(dt)
 
     def reset(self):
         # TODO: Implement the logic to reset the red object
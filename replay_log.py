@@ -0,0 +1,146 @@
+import json
+import os
+import numpy as np
+from numpy.lib.format import open_memmap
+from simulation_manager import Snapshot
+from world_state import WorldState
+
+META_FILE = 'replay.json'
+
+# Columns written once, they do not change during an engagement
+STATIC_COLUMNS = ('red_id', 'red_initial_position', 'blue_id', 'blue_launch_site_position', 'blue_max_speed')
+
+
+def _tick_columns(num_red: int, num_blue: int) -> dict:
+    # column name -> (shape of one tick, dtype)
+    return {
+        'time': ((), np.float64),
+        'red_position': ((num_red, 3), np.float64),
+        'red_velocity': ((num_red, 3), np.float64),
+        'red_alive': ((num_red,), bool),
+        'blue_position': ((num_blue, 3), np.float64),
+        'blue_velocity': ((num_blue, 3), np.float64),
+        'blue_alive': ((num_blue,), bool),
+        'action': ((num_blue, 3), np.float64),
+    }
+
+
+def _chunk_path(directory: str, chunk: int, name: str) -> str:
+    return os.path.join(directory, f'chunk_{chunk:06d}', f'{name}.npy')
+
+
+class ReplayLogWriter:
+    # Appends every tick of an engagement to a columnar binary log on disk. Each column is stored in chunks of
+    # chunk_ticks preallocated, memory-mapped .npy files, so a long run never keeps its history in memory.
+    def __init__(self, directory: str, state: WorldState, chunk_ticks: int = 1024):
+        self.directory = directory
+        self.chunk_ticks = chunk_ticks
+        self.num_red = state.num_red
+        self.num_blue = state.num_blue
+        self.num_ticks = 0
+        self._columns = _tick_columns(self.num_red, self.num_blue)
+        self._chunk: dict[str, np.memmap] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        for name in STATIC_COLUMNS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(state, name))
+        self._write_meta()
+
+    def append(self, time: float, state: WorldState, action=None):
+        if state.num_red != self.num_red or state.num_blue != self.num_blue:
+            raise ValueError('The number of objects changed while recording, start a new replay log')
+
+        row = self.num_ticks % self.chunk_ticks
+        if row == 0:
+            self._open_chunk(self.num_ticks // self.chunk_ticks)
+
+        chunk = self._chunk
+        chunk['time'][row] = time
+        chunk['red_position'][row] = state.red_position
+        chunk['red_velocity'][row] = state.red_velocity
+        chunk['red_alive'][row] = state.red_alive
+        chunk['blue_position'][row] = state.blue_position
+        chunk['blue_velocity'][row] = state.blue_velocity
+        chunk['blue_alive'][row] = state.blue_alive
+        chunk['action'][row] = 0 if action is None else np.asarray(action, dtype=np.float64).reshape(self.num_blue, 3)
+        self.num_ticks += 1
+
+    def _open_chunk(self, chunk: int):
+        self.flush()
+        os.makedirs(os.path.dirname(_chunk_path(self.directory, chunk, 'time')), exist_ok=True)
+        self._chunk = {name: open_memmap(_chunk_path(self.directory, chunk, name), mode='w+', dtype=dtype,
+                                         shape=(self.chunk_ticks,) + shape)
+                       for name, (shape, dtype) in self._columns.items()}
+
+    def _write_meta(self):
+        meta = {'num_red': self.num_red, 'num_blue': self.num_blue,
+                'chunk_ticks': self.chunk_ticks, 'num_ticks': self.num_ticks}
+        with open(os.path.join(self.directory, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+    def flush(self):
+        # write the mapped pages and the tick count, everything appended so far can be read afterwards
+        for array in self._chunk.values():
+            array.flush()
+        self._write_meta()
+
+    def close(self):
+        self.flush()
+        self._chunk = {}
+
+
+class ReplayLogReader:
+    # Reads a replay log written by ReplayLogWriter. Seeking to a tick only opens the chunk that holds it
+    # and returns read-only views of the mapped files, whatever the length of the log.
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.num_red = meta['num_red']
+        self.num_blue = meta['num_blue']
+        self.chunk_ticks = meta['chunk_ticks']
+        self.num_ticks = meta['num_ticks']
+
+        self._static = {name: np.load(os.path.join(directory, f'{name}.npy')) for name in STATIC_COLUMNS}
+        for array in self._static.values():
+            array.setflags(write=False)
+        self._chunk_index = -1
+        self._chunk: dict[str, np.memmap] = {}
+
+    def __len__(self) -> int:
+        return self.num_ticks
+
+    def _row(self, tick: int) -> int:
+        if tick < 0:
+            tick += self.num_ticks
+        if not 0 <= tick < self.num_ticks:
+            raise IndexError(f'tick {tick} is not in the replay log of {self.num_ticks} ticks')
+
+        chunk = tick // self.chunk_ticks
+        if chunk != self._chunk_index:
+            self._chunk = {name: np.load(_chunk_path(self.directory, chunk, name), mmap_mode='r')
+                           for name in _tick_columns(self.num_red, self.num_blue)}
+            self._chunk_index = chunk
+        return tick % self.chunk_ticks
+
+    def column(self, name: str, tick: int) -> np.ndarray:
+        row = self._row(tick)
+        return self._chunk[name][row]
+
+    def state(self, tick: int) -> WorldState:
+        # read-only WorldState of one tick, it can be handed to the renderers like a live state
+        row = self._row(tick)
+        state = WorldState.__new__(WorldState)
+        for name, array in self._static.items():
+            setattr(state, name, array)
+        for name in ('red_position', 'red_velocity', 'red_alive', 'blue_position', 'blue_velocity', 'blue_alive'):
+            setattr(state, name, self._chunk[name][row])
+        return state
+
+    def action(self, tick: int) -> np.ndarray:
+        return self.column('action', tick)
+
+    def snapshot(self, tick: int) -> Snapshot:
+        state = self.state(tick)
+        done = not state.red_alive.any() or not state.blue_alive.any()
+        return Snapshot(tick, self.column('time', tick).item(), state, done)
@@ -0,0 +1,134 @@
+import json
+import re
+from array import array
+import numpy as np
+from red_object import RedObject
+from blue_object import BlueObject
+from world_state import WorldState
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+
+
+def save_scenario(filepath: str, state: WorldState):
+    # Save the scenario as a columnar, uncompressed .npz file with one array per field. Red objects are saved where
+    # they are shown, which includes the altitude edits, and start from there when the file is loaded.
+    np.savez(filepath,
+             red_position=state.red_position,
+             red_velocity=state.red_velocity,
+             blue_launch_site_position=state.blue_launch_site_position,
+             blue_max_speed=state.blue_max_speed)
+
+
+def load_scenario_arrays(filepath: str) -> dict:
+    # Load the scenario columns of a .npz file, or of a legacy JSON file saved by earlier versions
+    if filepath.endswith('.json'):
+        return _load_legacy_json(filepath)
+
+    with np.load(filepath) as data:
+        return {
+            'red_position': data['red_position'].reshape(-1, 3),
+            'red_velocity': data['red_velocity'].reshape(-1, 3),
+            'blue_launch_site_position': data['blue_launch_site_position'].reshape(-1, 3),
+            'blue_max_speed': data['blue_max_speed'].reshape(-1),
+        }
+
+
+def create_objects(scenario: dict, copy: bool = True) -> tuple[list[RedObject], list[BlueObject]]:
+    # Build all objects of a scenario at once, they share one world state filled straight from the columns.
+    # Without copy the world state takes over the column arrays, for columns nobody else holds.
+    state = WorldState.from_arrays(**scenario, copy=copy)
+    return RedObject.from_state(state), BlueObject.from_state(state)
+
+
+def load_scenario(filepath: str) -> tuple[list[RedObject], list[BlueObject]]:
+    # the loaded columns belong to nobody else, the world state keeps them as they are
+    return create_objects(load_scenario_arrays(filepath), copy=False)
+
+
+class _JsonStream:
+    # Reads JSON values one at a time from a file, holding only a small window of the text in memory
+    def __init__(self, file, chunk_size: int = 1 << 16):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        # the next non whitespace character
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of the scenario file')
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if character not in characters:
+            raise ValueError(f'Expected one of {characters!r} in the scenario file, found {character!r}')
+        self.pos += 1
+        return character
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # the value continues in the next chunk
+                if not self._fill():
+                    raise
+                continue
+
+            # a number that ends the window may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _load_legacy_json(filepath: str) -> dict:
+    # Stream the list of per object dicts straight into flat columns, without building the whole document
+    red_position, red_velocity = array('d'), array('d')
+    blue_position, blue_max_speed = array('d'), array('d')
+
+    with open(filepath, 'r') as file:
+        stream = _JsonStream(file)
+        stream.expect('{')
+        closed = stream.peek() == '}'
+        while not closed:
+            key = stream.value()
+            stream.expect(':')
+            if key not in ('red_objects', 'blue_objects'):
+                stream.value()
+            else:
+                stream.expect('[')
+                ended = stream.peek() == ']'
+                if ended:
+                    stream.expect(']')
+                while not ended:
+                    data = stream.value()
+                    if key == 'red_objects':
+                        red_position.extend(data['position'])
+                        red_velocity.extend(data['velocity'])
+                    else:
+                        blue_position.extend(data['position'])
+                        blue_max_speed.append(data['max_speed'])
+                    ended = stream.expect(',]') == ']'
+            closed = stream.expect(',}') == '}'
+
+    return {
+        'red_position': np.frombuffer(red_position).reshape(-1, 3),
+        'red_velocity': np.frombuffer(red_velocity).reshape(-1, 3),
+        'blue_launch_site_position': np.frombuffer(blue_position).reshape(-1, 3),
+        'blue_max_speed': np.frombuffer(blue_max_speed),
+    }
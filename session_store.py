@@ -0,0 +1,128 @@
+import collections
+import os
+import pickle
+import threading
+import time
+import uuid
+from simulation_manager import SimulationManager
+from simulation_worker import SimulationWorker
+
+
+class Session:
+    # One analyst's simulation together with the background worker that steps it
+    def __init__(self, session_id: str, simulation_manager: SimulationManager, rate_hz: float | None = 2.0):
+        self.session_id = session_id
+        self.simulation_manager = simulation_manager
+        self.worker = SimulationWorker(simulation_manager, rate_hz=rate_hz)
+        self.last_used = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        # approximate memory of the session, the snapshots buffered by the worker plus the live state, which is
+        # as large as the latest snapshot. Snapshots share their static arrays, every array is counted once.
+        snapshots = self.worker.snapshots()
+        arrays = {id(array): array for snapshot in snapshots for array in snapshot.state.arrays().values()}
+        return sum(array.nbytes for array in arrays.values()) + snapshots[-1].state.nbytes
+
+    def is_idle(self, idle_seconds: float) -> bool:
+        return not self.worker.is_running and time.monotonic() - self.last_used >= idle_seconds
+
+    def close(self):
+        self.worker.stop()
+
+
+class SessionStore:
+    # Keeps one Session per browser session. When there are more than max_sessions sessions or they use more than
+    # max_bytes, the least recently used idle sessions are evicted. With a spill_directory an evicted simulation
+    # is pickled to disk and restored the next time its session asks for it, otherwise it starts empty again.
+    # Running or recently used sessions are never evicted, so the limits only bound the idle sessions.
+    def __init__(self,
+                 session_class: type = Session,
+                 max_sessions: int = 16,
+                 max_bytes: int | None = None,
+                 spill_directory: str | None = None,
+                 idle_seconds: float = 60.0,
+                 rate_hz: float | None = 2.0,
+                 dt: float = 1):
+        self.session_class = session_class
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.spill_directory = spill_directory
+        self.idle_seconds = idle_seconds
+        self.rate_hz = rate_hz
+        self.dt = dt  # time step of new simulations
+
+        self._sessions: collections.OrderedDict[str, Session] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if spill_directory:
+            os.makedirs(spill_directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Session:
+        # the session of the id, restored from disk or created when it is not in memory
+        session_id = uuid.UUID(session_id).hex  # only well formed ids, they name the spill files
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self.session_class(session_id, self._restore(session_id), self.rate_hz)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+
+            self._evict()
+            return session
+
+    def nbytes(self) -> int:
+        return sum(session.nbytes for session in list(self._sessions.values()))
+
+    def evict(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._spill(session)
+
+    def close(self):
+        # stop every worker and spill every session, for a clean server shutdown
+        with self._lock:
+            while self._sessions:
+                self._spill(self._sessions.popitem(last=False)[1])
+
+    def _over_limits(self) -> bool:
+        if len(self._sessions) > self.max_sessions:
+            return True
+        return self.max_bytes is not None and self.nbytes() > self.max_bytes
+
+    def _evict(self):
+        # least recently used first, the most recent session is the one being served
+        for session_id in list(self._sessions)[:-1]:
+            if not self._over_limits():
+                return
+            session = self._sessions[session_id]
+            if session.is_idle(self.idle_seconds):
+                del self._sessions[session_id]
+                self._spill(session)
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_directory, f'{session_id}.pkl')
+
+    def _spill(self, session: Session):
+        session.close()
+        if not self.spill_directory:
+            return
+        with session.worker.lock:
+            with open(self._spill_path(session.session_id), 'wb') as f:
+                pickle.dump(session.simulation_manager, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _restore(self, session_id: str) -> SimulationManager:
+        if self.spill_directory and os.path.exists(self._spill_path(session_id)):
+            with open(self._spill_path(session_id), 'rb') as f:
+                simulation_manager = pickle.load(f)
+            os.remove(self._spill_path(session_id))
+            return simulation_manager
+        return SimulationManager([], [], self.dt)
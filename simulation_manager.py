@@ -1,47 +1,173 @@
 from algorithms_env import AlgorithmsEnv
 from blue_object import BlueObject
 from red_object import RedObject
+from collision import find_swept_pairs, first_contact_time
+from world_state import WorldState
 import numpy as np
+import metrics
+
+
+class Snapshot:
+    # Immutable copy of the simulation at one tick, safe to read from any thread
+    def __init__(self, version: int, time: float, state: WorldState, done: bool = False):
+        self.version = version
+        self.time = time
+        self.state = state
+        self.done = done
 
 
 class SimulationManager:
-    def __init__(self, red_object_list: list[RedObject], blue_object_list: [BlueObject]):
-        self.env: AlgorithmsEnv = AlgorithmsEnv(red_object_list, blue_object_list)
-        self.time: int = 0
-
-    def run_simulation(self):
-        for idx in range(1000):
-            action = self.env.action_space.sample()
-            observation, reward, terminated, info, _ = self.env.step(action)
-
-            if terminated:
-                self.env.reset()
-
-            # print the reward
-            if idx % 100 == 0:
-                print(f"Step: {idx}, Reward: {reward}")
-
-    def kill_manager(self):
-        # check if there is blue object that is near red object, if so, kill the both
-        for blue_object in self.env.blue_object_list:
-            for red_object in self.env.red_object_list:
-                if np.linalg.norm(blue_object.position - red_object.position) <= 1:
-                    blue_object.i_am_alive = False
-                    red_object.i_am_alive = False
+    def __init__(self, red_object_list: list[RedObject], blue_object_list: [BlueObject], dt: float = 1):
+        # dt is the simulated time of one step, the kill check is continuous so large steps miss no kills
+        self.env: AlgorithmsEnv = AlgorithmsEnv(red_object_list, blue_object_list, dt)
+        self.time: float = 0
+        self.kill_radius: float = 1
+        self.recorder = None  # optional ReplayLogWriter that step appends every tick to
+
+    def __getstate__(self):
+        # copies and pickles do not share the replay log of the original
+        state = self.__dict__.copy()
+        state['recorder'] = None
+        return state
+
+    @property
+    def state(self) -> WorldState:
+        return self.env.state
+
+    def snapshot(self, version: int = 0, done: bool = False, previous: Snapshot | None = None) -> Snapshot:
+        # with a previous snapshot of the same objects its static arrays are shared instead of copied
+        state = self.env.state
+        if previous is not None and previous.state.num_red == state.num_red and previous.state.num_blue == state.num_blue:
+            return Snapshot(version, self.time, state.copy(read_only=True, shared=previous.state), done)
+        return Snapshot(version, self.time, state.copy(read_only=True), done)
+
+    def start_recording(self, directory: str, chunk_ticks: int = 1024):
+        # record the current tick and every following step to a replay log in the directory
+        from replay_log import ReplayLogWriter
+        self.stop_recording()
+        self.recorder = ReplayLogWriter(directory, self.env.state, chunk_ticks)
+        self.recorder.append(self.time, self.env.state)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    @property
+    def dt(self) -> float:
+        return self.env.dt
+
+    def run_simulation(self, max_steps: int = 1000, event_driven: bool = False) -> dict:
+        # run one headless episode with the intercept policy and return its outcome,
+        # max_steps limits the simulated time (the number of steps at dt=1).
+        # event_driven skips the ticks between kills whenever the engagement is deterministic
+        state = self.env.state
+        kill_time = np.full(state.num_red, -1, dtype=np.result_type(self.dt, np.int64))
+
+        done = False
+        while not done and self.time < max_steps:
+            red_alive = state.red_alive.copy()
+            if event_driven:
+                _, action = self.skip_to_next_event(max_steps)
+            else:
+                action = self.env.take_action()
+            _, _, done, _ = self.step(action)
+
+            # record the time each red object was intercepted
+            kill_time[red_alive & ~state.red_alive] = self.time
+            done = done or not state.red_alive.any()
+
+        return {
+            "steps": int(round(self.time / self.dt)),  # ticks of dt, skipped ticks included
+            "intercepts": int(np.count_nonzero(kill_time >= 0)),
+            "leakers": int(np.count_nonzero(state.red_alive)),
+            "blue_lost": int(np.count_nonzero(~state.blue_alive)),
+            "time_to_kill": kill_time[kill_time >= 0].tolist(),
+        }
+
+    def skip_to_next_event(self, max_time: float = np.inf) -> tuple[int, np.ndarray]:
+        # While every blue object flies a fixed intercept course all objects move in straight lines, so the tick of
+        # the next kill is solved analytically and the quiet ticks before it are skipped in one jump. The tick before
+        # the kill and the kill itself are left to step, its swept kill check stays exact.
+        # return the number of skipped ticks, 0 when the next ticks are not deterministic (a target is unreachable,
+        # the assignment changes during the jump or a replay log records every tick), and the action of the next step
+        if self.recorder is not None:
+            return 0, self.env.take_action()
+
+        with metrics.phase('event_skip'):
+            state = self.env.state
+            dt = self.dt
+            action, blue_indices, red_indices, intercept_time = self.env.plan_action()
+            # unreachable targets are aimed at their closest approach, which moves every tick
+            if len(blue_indices) == 0 or not np.isfinite(intercept_time).all():
+                return 0, action
+
+            # every assigned pair meets at its intercept time, the next kill is not later than the first of them
+            horizon = int(np.ceil(intercept_time.min() / dt)) + 1
+            alive_blue = np.flatnonzero(state.blue_alive)
+            alive_red = np.flatnonzero(state.red_alive)
+            blue_position, blue_velocity = state.blue_position[alive_blue], action[alive_blue] / dt
+            red_position, red_velocity = state.red_position[alive_red], state.red_velocity[alive_red]
+
+            # any blue/red pair can collide before that, the pairs that come within the kill radius
+            # over the whole horizon are solved for their first contact
+            blue_hits, red_hits = find_swept_pairs(blue_position, blue_position + blue_velocity * (horizon * dt),
+                                                   red_position, red_position + red_velocity * (horizon * dt),
+                                                   self.kill_radius)
+            contact_time = first_contact_time(blue_position[blue_hits] - red_position[red_hits],
+                                              blue_velocity[blue_hits] - red_velocity[red_hits], self.kill_radius)
+            kill_tick = min(horizon, np.ceil(contact_time.min() / dt)) if len(contact_time) else horizon
+
+            # the step that reaches max_time is not skipped either
+            ticks = int(min(kill_tick - 2, np.ceil((max_time - self.time) / dt) - 1))
+
+            # the assignment is checked at the end of the jump, the jump is halved until it holds there
+            while ticks > 0:
+                blue_indices_after, red_indices_after = self.env.assigned_pairs(
+                    state.blue_position + action * ticks,
+                    state.red_position + state.red_velocity * (ticks * dt * state.red_alive[:, None]))
+                if np.array_equal(blue_indices_after, blue_indices) and np.array_equal(red_indices_after, red_indices):
+                    break
+                ticks //= 2
+            if ticks <= 0:
+                return 0, action
+
+            self.time += ticks * dt
+            state.step_red(ticks * dt)
+            state.step_blue(action * ticks, ticks * dt)
+
+            # the courses are fixed, after the jump they still have the same action
+            return ticks, action
+
+    def kill_manager(self, blue_start_position: np.ndarray | None = None, red_start_position: np.ndarray | None = None):
+        # check if there is blue object that came near red object during the step, if so, kill the both.
+        # Objects moved in a straight line from their start positions, without them only the current positions count.
+        state = self.env.state
+        if blue_start_position is None:
+            blue_start_position = state.blue_position
+        if red_start_position is None:
+            red_start_position = state.red_position
+
+        state.kill_swept_pairs(blue_start_position, red_start_position, self.kill_radius)
 
         # Check if there blue object alive
-        done = True
-        for blue_object in self.env.blue_object_list:
-            if blue_object.i_am_alive:
-                done = False
-                break
+        done = not state.blue_alive.any()
 
         return done
 
     def step(self, action):
-        self.time += 1
+        state = self.env.state
+        blue_start_position = state.blue_position.copy()
+        red_start_position = state.red_position.copy()
+
+        self.time += self.dt
         obs, reward, done, info, _ = self.env.step(action)
-        done = self.kill_manager()
+        with metrics.phase('kill_manager'):
+            done = self.kill_manager(blue_start_position, red_start_position)
+
+        if self.recorder is not None:
+            with metrics.phase('record'):
+                self.recorder.append(self.time, self.env.state, action)
 
         return obs, reward, done, _
 
@@ -0,0 +1,148 @@
+import collections
+import copy
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from simulation_manager import SimulationManager, Snapshot
+
+
+class SimulationWorker:
+    # Steps a SimulationManager on a background thread at a fixed rate and publishes an immutable snapshot
+    # after every tick into a ring buffer. Readers only ever look at snapshots, so rendering never waits for
+    # the simulation and the simulation rate does not depend on how often anyone renders.
+    # Edits are queued with edit() and applied by the worker between two ticks, never during one.
+    # rate_hz=None runs as fast as possible (faster than real time).
+    def __init__(self, simulation_manager: SimulationManager, rate_hz: float | None = 2.0, buffer_size: int = 64):
+        self.simulation_manager = simulation_manager
+        self.rate_hz = rate_hz
+
+        # held while the simulation is stepped or edited
+        self.lock = threading.RLock()
+
+        self._snapshots: collections.deque[Snapshot] = collections.deque(maxlen=buffer_size)
+        self._version = 0
+        self._edits: queue.SimpleQueue = queue.SimpleQueue()
+        self._edit_queued = threading.Event()
+        self._running = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.publish()
+
+    @property
+    def is_running(self) -> bool:
+        return self._running.is_set()
+
+    def latest(self) -> Snapshot:
+        return self._snapshots[-1]
+
+    def snapshots(self) -> list[Snapshot]:
+        # the buffered snapshots, oldest first
+        return list(self._snapshots)
+
+    def publish(self, done: bool = False, edited: bool = True) -> Snapshot:
+        # publish the current state. A tick only changes the dynamic arrays, so its snapshot shares the static
+        # arrays with the previous one, after an edit everything is copied.
+        with self.lock:
+            self._version += 1
+            previous = self._snapshots[-1] if self._snapshots and not edited else None
+            snapshot = self.simulation_manager.snapshot(self._version, done, previous)
+            self._snapshots.append(snapshot)
+            return snapshot
+
+    def edit(self, function) -> tuple:
+        # run function(simulation_manager) between two ticks and publish the edited state,
+        # returns what the function returned and the snapshot published after it
+        future = Future()
+        self._edits.put((function, future))
+        self._edit_queued.set()
+        while True:
+            # nobody is ticking, apply the queued edits right away
+            if not self.is_running:
+                self._apply_edits()
+            try:
+                return future.result(timeout=0.1)
+            except TimeoutError:
+                continue
+
+    def copy(self) -> SimulationManager:
+        # a deep copy of the simulation taken between two ticks, nothing is published
+        with self.lock:
+            return copy.deepcopy(self.simulation_manager)
+
+    def _apply_edits(self):
+        with self.lock:
+            self._edit_queued.clear()
+            while True:
+                try:
+                    function, future = self._edits.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result = function(self.simulation_manager)
+                except BaseException as exception:
+                    future.set_exception(exception)
+                    continue
+                # an edit can finish the engagement or bring a finished one back
+                future.set_result((result, self.publish(self._done())))
+
+    def resume(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='simulation-worker', daemon=True)
+            self._thread.start()
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set()  # wake the thread so it can exit
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._running.clear()
+
+    def step_once(self) -> Snapshot:
+        with self.lock:
+            self._apply_edits()
+            done = self._step()
+            return self.publish(done, edited=False)
+
+    def _done(self) -> bool:
+        # nothing is left to step when a team has no objects or no alive objects
+        state = self.simulation_manager.state
+        return state.num_red < 1 or state.num_blue < 1 or not state.blue_alive.any() or not state.red_alive.any()
+
+    def _step(self) -> bool:
+        if self._done():
+            return True
+
+        action = self.simulation_manager.env.take_action()
+        self.simulation_manager.step(action)
+        return self._done()
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while True:
+            self._running.wait()
+            if self._stopped.is_set():
+                return
+
+            with self.lock:
+                self._apply_edits()
+                done = self._step()
+                self.publish(done, edited=False)
+            if done:
+                self.pause()
+
+            if self.rate_hz:
+                period = 1 / self.rate_hz
+                # after a pause or a slow tick start counting again instead of catching up
+                next_tick = max(next_tick + period, time.perf_counter())
+
+                # wait for the next tick, applying edits as soon as they are queued
+                while (remaining := next_tick - time.perf_counter()) > 0:
+                    if self._edit_queued.wait(remaining):
+                        self._apply_edits()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules of the project live at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def create_scenario():
+    # scenario columns of num_red red objects around the blue launch sites, reproducible by seed
+    def create(num_red: int, num_blue: int, seed: int = 0) -> dict:
+        rng = np.random.default_rng(seed)
+        return {
+            'red_position': rng.uniform([-100, -100, 0], [100, 100, 100], (num_red, 3)),
+            'red_velocity': rng.uniform(-2, 2, (num_red, 3)),
+            'blue_launch_site_position': rng.uniform([-20, -20, 0], [20, 20, 0], (num_blue, 3)),
+            'blue_max_speed': rng.uniform(1, 4, num_blue),
+        }
+    return create
@@ -0,0 +1,86 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from assignment import assign_targets, gated_greedy_assignment, hungarian, intercept_cost_matrix
+from collision import find_k_nearest
+
+
+def brute_force_cost(cost: np.ndarray) -> float:
+    # smallest total cost over every one to one assignment of the smaller side
+    num_rows, num_cols = cost.shape
+    if num_rows > num_cols:
+        return brute_force_cost(cost.T)
+    return min(cost[np.arange(num_rows), list(columns)].sum()
+               for columns in itertools.permutations(range(num_cols), num_rows))
+
+
+def assigned_cost(cost: np.ndarray, col_of_row: np.ndarray) -> float:
+    rows = np.flatnonzero(col_of_row >= 0)
+    return cost[rows, col_of_row[rows]].sum()
+
+
+def assert_one_to_one(red_of_blue: np.ndarray, num_blue: int, num_red: int):
+    assigned = red_of_blue[red_of_blue >= 0]
+    assert len(assigned) == len(set(assigned.tolist())) == min(num_blue, num_red)
+    assert assigned.max(initial=-1) < num_red
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (3, 3), (4, 6), (6, 4), (7, 7), (2, 7)])
+@pytest.mark.parametrize('seed', range(5))
+def test_hungarian_matches_brute_force(shape, seed):
+    rng = np.random.default_rng(seed)
+    # integer costs have ties, which the augmenting paths have to resolve as well
+    cost = rng.integers(0, 10, shape).astype(np.float64) if seed % 2 else rng.uniform(0, 100, shape)
+
+    col_of_row = hungarian(cost)
+
+    assert_one_to_one(col_of_row, *shape)
+    assert assigned_cost(cost, col_of_row) == pytest.approx(brute_force_cost(cost))
+
+
+@pytest.mark.parametrize('num_blue, num_red', [(0, 5), (5, 0), (40, 60), (60, 40)])
+def test_assign_targets_is_one_to_one_and_optimal(create_scenario, num_blue, num_red):
+    scenario = create_scenario(num_red, num_blue)
+    arguments = (scenario['blue_launch_site_position'], scenario['blue_max_speed'],
+                 scenario['red_position'], scenario['red_velocity'])
+
+    red_of_blue = assign_targets(*arguments)
+
+    assert len(red_of_blue) == num_blue
+    assert_one_to_one(red_of_blue, num_blue, num_red)
+    if num_blue and num_red:
+        cost = intercept_cost_matrix(*arguments)
+        assert assigned_cost(cost, red_of_blue) == pytest.approx(assigned_cost(cost, hungarian(cost)))
+
+
+@pytest.mark.parametrize('clustered', [False, True])
+def test_gated_greedy_assignment_is_one_to_one(create_scenario, clustered):
+    scenario = create_scenario(700, 500, seed=3)
+    if clustered:
+        # every blue object starts at one launch site, so they all share the same nearest red objects
+        scenario['blue_launch_site_position'][:] = 0
+
+    red_of_blue = gated_greedy_assignment(scenario['blue_launch_site_position'], scenario['blue_max_speed'],
+                                          scenario['red_position'], scenario['red_velocity'])
+
+    assert_one_to_one(red_of_blue, 500, 700)
+
+
+@pytest.mark.parametrize('num_queries, num_points, k', [(50, 10, 3), (400, 2000, 5), (300, 3000, 16)])
+def test_k_nearest_match_sorted_distances(num_queries, num_points, k):
+    rng = np.random.default_rng(k)
+    queries = rng.uniform(-100, 100, (num_queries, 3))
+    points = rng.uniform(-100, 100, (num_points, 3))
+    # a dense cluster, its queries fall back to the brute force search
+    points[:num_points // 4] = rng.normal(0, 0.01, (num_points // 4, 3))
+
+    query_idx, point_idx = find_k_nearest(queries, points, k)
+
+    distances = np.linalg.norm(queries[:, None] - points[None], axis=2)
+    expected = np.sort(distances, axis=1)[:, :min(k, num_points)]
+    found = np.zeros_like(expected)
+    for query in range(num_queries):
+        found[query] = np.sort(distances[query, point_idx[query_idx == query]])
+    np.testing.assert_allclose(found, expected)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from collision import closest_approach, find_pairs_within_radius, find_swept_pairs, first_contact_time
+
+
+def dense_pairs(distances: np.ndarray, radius: float) -> set:
+    return set(zip(*map(np.ndarray.tolist, np.nonzero(distances <= radius))))
+
+
+@pytest.mark.parametrize('num_a, num_b, radius', [(20, 30, 5), (300, 400, 3), (500, 50, 0.5)])
+def test_pairs_within_radius_match_dense_distances(num_a, num_b, radius):
+    rng = np.random.default_rng(num_a)
+    positions_a = rng.uniform(-50, 50, (num_a, 3))
+    positions_b = rng.uniform(-50, 50, (num_b, 3))
+
+    expected = dense_pairs(np.linalg.norm(positions_a[:, None] - positions_b[None], axis=2), radius)
+    assert set(zip(*map(np.ndarray.tolist, find_pairs_within_radius(positions_a, positions_b, radius)))) == expected
+
+
+@pytest.mark.parametrize('num_a, num_b, step', [(50, 80, 10), (300, 400, 2), (400, 300, 20)])
+@pytest.mark.parametrize('outlier', [False, True])
+def test_swept_pairs_match_dense_closest_approach(num_a, num_b, step, outlier):
+    rng = np.random.default_rng(num_a + step)
+    start_a = rng.uniform(-40, 40, (num_a, 3))
+    end_a = start_a + rng.normal(0, step, (num_a, 3))
+    start_b = rng.uniform(-40, 40, (num_b, 3))
+    end_b = start_b + rng.normal(0, step, (num_b, 3))
+    if outlier:
+        # one segment across the whole scene, it must not hide the short ones from each other
+        start_a[0], end_a[0] = [-100, -100, -100], [100, 100, 100]
+    radius = 2
+
+    distances = closest_approach(start_a[:, None] - start_b[None], end_a[:, None] - end_b[None])
+    found = set(zip(*map(np.ndarray.tolist, find_swept_pairs(start_a, end_a, start_b, end_b, radius))))
+
+    assert found and found == dense_pairs(distances, radius)
+
+
+def test_swept_pairs_catch_objects_that_pass_through_each_other():
+    # both objects move 100 units and swap sides, they are never within the radius at the end of a tick
+    hits = find_swept_pairs([[-50, 0, 0]], [[50, 0, 0]], [[50, 0.5, 0]], [[-50, 0.5, 0]], 1)
+
+    assert [index.tolist() for index in hits] == [[0], [0]]
+
+
+def test_first_contact_time():
+    offset = np.array([[10.0, 0, 0], [10, 0, 0], [0.5, 0, 0], [10, 5, 0]])
+    relative_velocity = np.array([[-2.0, 0, 0], [2, 0, 0], [1, 0, 0], [-1, 0, 0]])
+
+    times = first_contact_time(offset, relative_velocity, 1)
+
+    # closing in, moving apart, already in contact and passing by outside the radius
+    np.testing.assert_allclose(times, [4.5, np.inf, 0, np.inf])
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from scenario import create_objects
+from simulation_manager import SimulationManager
+
+
+def run(columns: dict, dt: float, event_driven: bool) -> tuple[dict, int]:
+    # outcome of the episode and the number of steps it took
+    simulation_manager = SimulationManager(*create_objects(columns), dt)
+    step = simulation_manager.step
+    steps = []
+
+    def counted_step(action):
+        steps.append(action)
+        return step(action)
+
+    simulation_manager.step = counted_step
+    return simulation_manager.run_simulation(1000, event_driven=event_driven), len(steps)
+
+
+@pytest.mark.parametrize('num_red, num_blue, dt', [(8, 6, 1), (30, 30, 1), (50, 40, 0.5), (5, 8, 2)])
+@pytest.mark.parametrize('seed', range(2))
+def test_event_driven_run_has_the_outcome_of_fixed_ticks(create_scenario, num_red, num_blue, dt, seed):
+    columns = create_scenario(num_red, num_blue, seed)
+
+    fixed, fixed_steps = run(columns, dt, event_driven=False)
+    skipped, skipped_steps = run(columns, dt, event_driven=True)
+
+    assert skipped['steps'] == fixed['steps']
+    assert (skipped['intercepts'], skipped['leakers'], skipped['blue_lost']) == \
+           (fixed['intercepts'], fixed['leakers'], fixed['blue_lost'])
+    assert sorted(skipped['time_to_kill']) == pytest.approx(sorted(fixed['time_to_kill']))
+    assert skipped_steps <= fixed_steps
+
+
+def test_quiet_ticks_are_skipped():
+    # one blue object far from a slow red object, it flies a fixed course until the kill
+    columns = {'red_position': np.array([[600.0, 0, 50]]), 'red_velocity': np.array([[-1.0, 0, 0]]),
+               'blue_launch_site_position': np.zeros((1, 3)), 'blue_max_speed': np.full(1, 3.0)}
+
+    fixed, fixed_steps = run(columns, 1, event_driven=False)
+    skipped, skipped_steps = run(columns, 1, event_driven=True)
+
+    assert skipped == fixed and fixed['intercepts'] == 1
+    assert skipped_steps <= 3 < fixed_steps
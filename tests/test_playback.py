@@ -0,0 +1,42 @@
+import base64
+
+import numpy as np
+
+from playback import encode_recording, record_engagement
+from scenario import create_objects
+from simulation_manager import SimulationManager
+
+
+def test_recording_keeps_every_frame_and_leaves_the_simulation_alone(create_scenario):
+    simulation_manager = SimulationManager(*create_objects(create_scenario(6, 4)))
+    start = simulation_manager.state.red_position.copy()
+
+    recording = record_engagement(simulation_manager, max_steps=25)
+
+    num_frames = len(recording['time'])
+    assert 1 < num_frames <= 26
+    assert recording['red_position'].shape == (num_frames, 6, 3)
+    assert recording['blue_alive'].shape == (num_frames, 4)
+    np.testing.assert_array_equal(recording['red_position'][0], start)
+    np.testing.assert_array_equal(simulation_manager.state.red_position, start)
+    assert simulation_manager.time == 0
+
+
+def test_in_place_recording_runs_the_given_simulation(create_scenario):
+    simulation_manager = SimulationManager(*create_objects(create_scenario(6, 4)))
+
+    recording = record_engagement(simulation_manager, max_steps=5, in_place=True)
+
+    assert simulation_manager.time == recording['time'][-1] > 0
+
+
+def test_encoded_recording_decodes_to_float32_frames(create_scenario):
+    simulation_manager = SimulationManager(*create_objects(create_scenario(3, 2)))
+    recording = record_engagement(simulation_manager, max_steps=3)
+
+    encoded = encode_recording(recording)
+
+    red_position = encoded['red_position']
+    decoded = np.frombuffer(base64.b64decode(red_position['data']), dtype=red_position['dtype'])
+    np.testing.assert_allclose(decoded.reshape(red_position['shape']), recording['red_position'], rtol=1e-6)
+    assert (encoded['num_frames'], encoded['num_red'], encoded['num_blue']) == (len(recording['time']), 3, 2)
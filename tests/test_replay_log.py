@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from replay_log import ReplayLogReader
+from scenario import create_objects
+from simulation_manager import SimulationManager
+
+
+def test_replay_log_round_trip(tmp_path, create_scenario):
+    simulation_manager = SimulationManager(*create_objects(create_scenario(7, 5)), dt=0.5)
+    simulation_manager.start_recording(str(tmp_path), chunk_ticks=4)
+
+    # every tick as it was stepped, across several chunks
+    ticks = [simulation_manager.state.copy()]
+    actions = [np.zeros((5, 3))]
+    for _ in range(10):
+        action = simulation_manager.env.take_action()
+        simulation_manager.step(action)
+        ticks.append(simulation_manager.state.copy())
+        actions.append(action)
+    simulation_manager.stop_recording()
+
+    reader = ReplayLogReader(str(tmp_path))
+    assert len(reader) == len(ticks)
+    # seeking back and forth only opens the chunk of the tick
+    for tick in (10, 0, 5, 9, 3, -1):
+        expected = ticks[tick]
+        state = reader.state(tick)
+        for name, array in expected.arrays().items():
+            np.testing.assert_array_equal(getattr(state, name), array, err_msg=name)
+        np.testing.assert_allclose(reader.action(tick), actions[tick])
+        assert reader.snapshot(tick).time == pytest.approx(0.5 * (tick % len(ticks)))
+        assert not state.red_position.flags.writeable
+
+
+def test_replay_log_reads_what_was_flushed(tmp_path, create_scenario):
+    simulation_manager = SimulationManager(*create_objects(create_scenario(3, 2)))
+    simulation_manager.start_recording(str(tmp_path))
+    simulation_manager.step(simulation_manager.env.take_action())
+    simulation_manager.recorder.flush()
+
+    reader = ReplayLogReader(str(tmp_path))
+
+    assert len(reader) == 2
+    np.testing.assert_array_equal(reader.state(1).blue_position, simulation_manager.state.blue_position)
+    with pytest.raises(IndexError):
+        reader.state(2)
+    simulation_manager.stop_recording()
+
+
+def test_replay_log_refuses_a_changed_number_of_objects(tmp_path, create_scenario):
+    simulation_manager = SimulationManager(*create_objects(create_scenario(3, 2)))
+    simulation_manager.start_recording(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        simulation_manager.recorder.append(1, SimulationManager(*create_objects(create_scenario(4, 2))).state)
+    simulation_manager.stop_recording()
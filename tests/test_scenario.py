@@ -0,0 +1,78 @@
+import functools
+import json
+
+import numpy as np
+import pytest
+
+import scenario
+from scenario import load_scenario, load_scenario_arrays, save_scenario
+from simulation_manager import SimulationManager
+
+
+def write_legacy_json(path, columns: dict):
+    # the per object dicts saved by earlier versions, with fields the loader skips
+    document = {
+        'blue_objects': [{'id': index + 1, 'position': position.tolist(), 'max_speed': float(max_speed),
+                          'launch_site_position': position.tolist(), 'i_am_alive': True}
+                         for index, (position, max_speed) in
+                         enumerate(zip(columns['blue_launch_site_position'], columns['blue_max_speed']))],
+        'red_objects': [{'id': index + 1, 'position': position.tolist(), 'velocity': velocity.tolist(),
+                         'name': 'red "object", {quoted}'}
+                        for index, (position, velocity) in
+                        enumerate(zip(columns['red_position'], columns['red_velocity']))],
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=4)
+
+
+def assert_same_columns(loaded: dict, expected: dict):
+    assert loaded.keys() == expected.keys()
+    for name, array in expected.items():
+        np.testing.assert_array_equal(loaded[name], array, err_msg=name)
+
+
+def test_npz_round_trip(tmp_path, create_scenario):
+    columns = create_scenario(9, 4)
+    simulation_manager = SimulationManager(*scenario.create_objects(columns))
+    path = str(tmp_path / 'scenario.npz')
+
+    save_scenario(path, simulation_manager.state)
+    red_objects, blue_objects = load_scenario(path)
+
+    assert_same_columns(load_scenario_arrays(path), columns)
+    assert len(red_objects) == 9 and len(blue_objects) == 4
+    np.testing.assert_array_equal(red_objects[3].velocity, columns['red_velocity'][3])
+    # the loaded objects can be edited, their columns are owned by their world state
+    red_objects[3].velocity = [1, 2, 3]
+    np.testing.assert_array_equal(red_objects[3].velocity, [1, 2, 3])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 16])
+def test_legacy_json_loads_across_chunk_boundaries(tmp_path, monkeypatch, create_scenario, chunk_size):
+    columns = create_scenario(5, 3)
+    columns['red_velocity'][0] = [1e-300, -2.5e10, 0]
+    path = str(tmp_path / 'scenario.json')
+    write_legacy_json(path, columns)
+
+    # numbers, strings and lists are cut at every possible position by small chunks
+    monkeypatch.setattr(scenario, '_JsonStream', functools.partial(scenario._JsonStream, chunk_size=chunk_size))
+
+    assert_same_columns(load_scenario_arrays(path), columns)
+
+
+def test_legacy_json_without_objects(tmp_path):
+    path = tmp_path / 'scenario.json'
+    path.write_text('{"blue_objects": [], "red_objects": [ ]}')
+
+    loaded = load_scenario_arrays(str(path))
+
+    assert loaded['red_position'].shape == (0, 3) and loaded['blue_max_speed'].shape == (0,)
+
+
+def test_truncated_legacy_json_is_an_error(tmp_path, create_scenario):
+    path = tmp_path / 'scenario.json'
+    write_legacy_json(str(path), create_scenario(3, 2))
+    path.write_text(path.read_text()[:-40])
+
+    with pytest.raises(ValueError):
+        load_scenario_arrays(str(path))
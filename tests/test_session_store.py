@@ -0,0 +1,75 @@
+import uuid
+
+import numpy as np
+
+from scenario import create_objects
+from session_store import SessionStore
+from simulation_manager import SimulationManager
+
+
+def session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def load_objects(columns: dict):
+    # edit that replaces the objects of a session's simulation
+    def load(simulation_manager: SimulationManager):
+        simulation_manager.env.red_object_list, simulation_manager.env.blue_object_list = create_objects(columns)
+    return load
+
+
+def test_spilled_session_is_restored(tmp_path, create_scenario):
+    store = SessionStore(spill_directory=str(tmp_path), rate_hz=None, dt=0.5)
+    first = session_id()
+    session = store.get(first)
+    session.worker.edit(load_objects(create_scenario(4, 3)))
+    session.worker.step_once()
+    state = session.simulation_manager.state.copy()
+
+    store.evict(first)
+    assert first not in store and list(tmp_path.iterdir())
+
+    restored = store.get(first)
+    assert restored is not session
+    assert restored.simulation_manager.time == 0.5 and restored.simulation_manager.dt == 0.5
+    for name, array in state.arrays().items():
+        np.testing.assert_array_equal(getattr(restored.simulation_manager.state, name), array, err_msg=name)
+    # the spill file is used once
+    assert not list(tmp_path.iterdir())
+    store.close()
+
+
+def test_least_recently_used_idle_session_is_evicted(tmp_path):
+    store = SessionStore(max_sessions=2, spill_directory=str(tmp_path), idle_seconds=0, rate_hz=None)
+    first, second, third = session_id(), session_id(), session_id()
+    store.get(first)
+    store.get(second)
+    store.get(first)
+
+    store.get(third)
+
+    assert first in store and third in store and second not in store
+    assert [path.name for path in tmp_path.iterdir()] == [f'{second}.pkl']
+    store.close()
+
+
+def test_running_sessions_are_not_evicted(create_scenario):
+    store = SessionStore(max_sessions=1, idle_seconds=0, rate_hz=1)
+    first = session_id()
+    session = store.get(first)
+    session.worker.edit(load_objects(create_scenario(4, 3)))
+    session.worker.resume()
+
+    store.get(session_id())
+
+    assert first in store and len(store) == 2
+    store.close()
+
+
+def test_session_without_spill_directory_starts_empty():
+    store = SessionStore(rate_hz=None, dt=2)
+    session = store.get(session_id())
+
+    assert isinstance(session.simulation_manager, SimulationManager)
+    assert session.simulation_manager.state.num_red == 0 and session.simulation_manager.dt == 2
+    store.close()
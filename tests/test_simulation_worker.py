@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+
+from scenario import create_objects
+from simulation_manager import SimulationManager
+from simulation_worker import SimulationWorker
+
+
+def single_pair_worker() -> SimulationWorker:
+    # one red object three units from one blue object, intercepted in the first tick
+    scenario = {'red_position': np.array([[3.0, 0, 0]]), 'red_velocity': np.zeros((1, 3)),
+                'blue_launch_site_position': np.zeros((1, 3)), 'blue_max_speed': np.full(1, 3.0)}
+    return SimulationWorker(SimulationManager(*create_objects(scenario)), rate_hz=None)
+
+
+def test_step_once_publishes_a_read_only_snapshot():
+    worker = single_pair_worker()
+    first = worker.latest()
+
+    snapshot = worker.step_once()
+
+    assert snapshot.version == first.version + 1 and snapshot.time == 1
+    assert snapshot.done
+    assert not snapshot.state.red_position.flags.writeable
+    # a tick shares the static arrays of the previous snapshot
+    assert snapshot.state.red_velocity is first.state.red_velocity
+
+
+def test_edits_publish_whether_the_engagement_is_done():
+    worker = single_pair_worker()
+    worker.step_once()
+
+    def revive(simulation_manager):
+        simulation_manager.state.red_alive[:] = True
+        simulation_manager.state.blue_alive[:] = True
+        return 'revived'
+
+    _, snapshot = worker.edit(lambda simulation_manager: None)
+    assert snapshot.done
+    result, snapshot = worker.edit(revive)
+    assert result == 'revived' and not snapshot.done
+
+
+def test_running_worker_stops_when_done(create_scenario):
+    scenario = create_scenario(20, 20)
+    # blue objects faster than any red object catch all of them
+    scenario['blue_max_speed'][:] = 10
+    worker = SimulationWorker(SimulationManager(*create_objects(scenario)), rate_hz=None)
+
+    worker.resume()
+    deadline = time.monotonic() + 30
+    while worker.is_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert not worker.is_running and worker.latest().done
+    assert worker.snapshots()[-1] is worker.latest()
+    worker.stop()
+
+
+def test_copy_publishes_nothing():
+    worker = single_pair_worker()
+    version = worker.latest().version
+
+    simulation_manager = worker.copy()
+    simulation_manager.step(simulation_manager.env.take_action())
+
+    assert worker.latest().version == version
+    assert worker.simulation_manager.time == 0
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from scenario import create_objects
+from simulation_manager import SimulationManager
+from tracking import MODELS, IMMTracker
+
+
+def turning_track(num_ticks: int, turn_rate: float) -> np.ndarray:
+    # (num_ticks, 3) positions of an object flying a horizontal circle at 5 units per tick
+    angle = turn_rate * np.arange(num_ticks)
+    radius = 5 / turn_rate
+    return np.stack([radius * np.sin(angle), radius * (1 - np.cos(angle)), np.full(num_ticks, 50.0)], axis=1)
+
+
+def test_kalman_filter_estimates_a_constant_velocity():
+    rng = np.random.default_rng(0)
+    velocity = np.array([[3.0, -1, 0.5], [0, 2, 0]])
+    # the targets do not maneuver, little process noise lets the filter average the measurements
+    tracker = IMMTracker(np.zeros((2, 3)), models=('CV',), measurement_noise=0.5, acceleration_noise=1e-4)
+
+    for tick in range(1, 60):
+        tracker.step(velocity * tick + rng.normal(0, 0.5, (2, 3)))
+
+    np.testing.assert_allclose(tracker.velocity, velocity, atol=0.1)
+    np.testing.assert_allclose(tracker.predict_trajectory(steps=10)[:, 9], tracker.position + 9 * tracker.velocity,
+                               atol=1e-9)
+
+
+def test_imm_switches_to_the_turn_model_on_a_turning_target():
+    # a sharp turn, gentle ones are followed about as well by the CA model
+    positions = turning_track(80, 0.3)
+    tracker = IMMTracker(positions[:1], measurement_noise=0.1)
+
+    for position in positions[1:]:
+        tracker.step(position[None])
+
+    assert MODELS[np.argmax(tracker.model_probability[0])] == 'CT'
+    np.testing.assert_allclose(tracker.predict_trajectory(steps=5)[0, 4], turning_track(84, 0.3)[-1], atol=1)
+
+
+def test_unmeasured_tracks_are_only_predicted():
+    tracker = IMMTracker(np.zeros((2, 3)), np.array([[1.0, 0, 0], [1, 0, 0]]), models=('CV',))
+
+    tracker.step(np.array([[5.0, 0, 0], [5, 0, 0]]), measured=np.array([True, False]))
+
+    assert tracker.position[0, 0] > 1
+    assert tracker.position[1, 0] == pytest.approx(1)
+
+
+def test_env_predicts_its_alive_red_objects_from_the_tracks_with_their_ids(create_scenario):
+    env = SimulationManager(*create_objects(create_scenario(6, 2)), dt=2).env
+    state = env.state
+    state.red_alive[1] = False
+    # tracks of some red objects in another order, one of them faster than its object
+    rows = np.array([4, 0, 2, 1])
+    velocity = state.red_velocity[rows].copy()
+    velocity[0] += 1
+    tracker = IMMTracker(state.red_position[rows], velocity, models=('CV',), dt=0.5, ids=state.red_id[rows])
+
+    expected = env.predict_red_trajectories(steps=5)
+    predicted = env.predict_red_trajectories(steps=5, tracker=tracker)
+
+    # the tracker predicts in steps of the env's dt, only the alive row with a different track differs
+    np.testing.assert_allclose(np.delete(predicted, 4, axis=0), np.delete(expected, 4, axis=0))
+    np.testing.assert_allclose(predicted[4, 1] - predicted[4, 0], (state.red_velocity[4] + 1) * 2)
+    with pytest.raises(ValueError):
+        env.predict_red_trajectories(tracker=IMMTracker(state.red_position))
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import trajectoy_pradiction as tp
+
+
+def test_intercept_point_is_reached_at_full_speed():
+    rng = np.random.default_rng(0)
+    blue_position = rng.uniform(-10, 10, (50, 3))
+    blue_max_speed = rng.uniform(1, 4, 50)
+    red_position = rng.uniform(-100, 100, (50, 3))
+    red_velocity = rng.uniform(-2, 2, (50, 3))
+
+    aim_point, time, reachable = tp.intercept_prediction(blue_position, blue_max_speed, red_position, red_velocity)
+
+    # the red object is at the aim point at the intercept time, the blue object gets there flying at max speed
+    time, aim_point = time[reachable], aim_point[reachable]
+    np.testing.assert_allclose(aim_point, red_position[reachable] + red_velocity[reachable] * time[:, None])
+    np.testing.assert_allclose(np.linalg.norm(aim_point - blue_position[reachable], axis=1),
+                               blue_max_speed[reachable] * time)
+
+
+def test_intercept_of_a_faster_target_flying_away_is_unreachable():
+    _, time, reachable = tp.intercept_prediction(np.zeros(3), 1.0, np.array([10.0, 0, 0]), np.array([2.0, 0, 0]))
+
+    assert not reachable and time == np.inf
+
+
+def test_intercepts_broadcast_to_every_pair():
+    blue_position = np.zeros((4, 1, 3))
+    red_position = np.arange(15, dtype=np.float64).reshape(1, 5, 3) + 1
+
+    _, time, _ = tp.intercept_prediction(blue_position, np.ones((4, 1)), red_position, np.zeros((1, 5, 3)))
+
+    assert time.shape == (4, 5)
+    np.testing.assert_allclose(time[2], np.linalg.norm(red_position[0], axis=1))
+
+
+@pytest.mark.parametrize('red_type', tp.RED_TYPES)
+def test_batched_trajectories_match_one_object_at_a_time(red_type):
+    rng = np.random.default_rng(1)
+    position, velocity = rng.normal(0, 10, (6, 3)), rng.normal(0, 1, (6, 3))
+    acceleration, turn_rate = rng.normal(0, 0.1, (6, 3)), rng.normal(0, 0.1, 6)
+    out = np.empty((6, 12, 3))
+
+    trajectories = tp.trajectory_prediction(position, velocity, red_type, 12, out, acceleration, turn_rate)
+
+    assert trajectories is out
+    np.testing.assert_array_equal(trajectories[:, 0], position)
+    for index in range(6):
+        single = tp.trajectory_prediction(position[index], velocity[index], red_type, 12, None,
+                                          acceleration[index], turn_rate[index])
+        np.testing.assert_allclose(trajectories[index], single)
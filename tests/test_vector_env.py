@@ -0,0 +1,41 @@
+import numpy as np
+
+from scenario import create_objects
+from simulation_manager import SimulationManager
+from vector_env import VectorAlgorithmsEnv
+
+
+def test_every_env_steps_like_the_simulation_manager(create_scenario):
+    scenario = create_scenario(12, 8, seed=1)
+    simulation_manager = SimulationManager(*create_objects(scenario), dt=2.0)
+    env = VectorAlgorithmsEnv(scenario['red_position'], scenario['red_velocity'],
+                              scenario['blue_launch_site_position'], scenario['blue_max_speed'], num_envs=3, dt=2.0)
+    env.reset(seed=0)
+
+    state = simulation_manager.state
+    for _ in range(8):
+        action = simulation_manager.env.take_action()
+        red_alive = state.red_alive.copy()
+        simulation_manager.step(action)
+
+        actions = env.intercept_actions()
+        np.testing.assert_allclose(actions, np.broadcast_to(action, actions.shape))
+        _, rewards, terminated, _, _ = env.step(actions)
+        if terminated.any():
+            break
+
+        np.testing.assert_allclose(env.blue_position, np.broadcast_to(state.blue_position, env.blue_position.shape))
+        np.testing.assert_array_equal(env.red_alive, np.broadcast_to(state.red_alive, env.red_alive.shape))
+        np.testing.assert_array_equal(rewards, (red_alive & ~state.red_alive).sum())
+
+
+def test_envs_without_red_objects_finish_at_once():
+    env = VectorAlgorithmsEnv(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((2, 3)), np.ones(2), num_envs=2)
+    env.reset()
+
+    actions = env.intercept_actions()
+    _, rewards, terminated, _, infos = env.step(actions)
+
+    np.testing.assert_array_equal(actions, 0)
+    np.testing.assert_array_equal(rewards, 0)
+    assert terminated.all() and infos['_final_observation'].all()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from algorithms_env import AlgorithmsEnv
+from blue_object import BlueObject
+from red_object import RedObject
+from world_state import ObjectList, WorldState
+
+
+def test_from_arrays_copies_unless_asked_not_to(create_scenario):
+    scenario = create_scenario(5, 3)
+    copied = WorldState.from_arrays(**scenario)
+    adopted = WorldState.from_arrays(**scenario, copy=False)
+
+    assert not np.shares_memory(copied.red_velocity, scenario['red_velocity'])
+    assert np.shares_memory(adopted.red_velocity, scenario['red_velocity'])
+    assert np.shares_memory(adopted.blue_max_speed, scenario['blue_max_speed'])
+    for state in (copied, adopted):
+        np.testing.assert_array_equal(state.red_position, scenario['red_position'])
+        np.testing.assert_array_equal(state.blue_position, scenario['blue_launch_site_position'])
+        assert state.red_alive.all() and state.blue_alive.all()
+
+
+def test_step_moves_alive_objects_at_most_max_speed():
+    state = WorldState(num_red=2, num_blue=3)
+    state.red_velocity[:] = [[1, 0, 0], [0, 2, 0]]
+    state.red_alive[1] = False
+    state.blue_max_speed[:] = 2
+    state.blue_alive[2] = False
+
+    state.step([[10, 0, 0], [0, 0.5, 0], [1, 0, 0]], dt=0.5)
+
+    np.testing.assert_allclose(state.red_position, [[0.5, 0, 0], [0, 0, 0]])
+    np.testing.assert_allclose(state.blue_position, [[1, 0, 0], [0, 0.5, 0], [0, 0, 0]])
+    np.testing.assert_allclose(state.blue_velocity[:2], [[2, 0, 0], [0, 1, 0]])
+
+
+def test_append_and_remove_rows_keep_the_other_rows():
+    state = WorldState(num_red=3)
+    state.red_id[:] = [1, 2, 3]
+    source = WorldState(num_red=1)
+    source.red_id[0] = 4
+    for _ in range(10):
+        state.append_row('red', source, 0)
+    assert state.num_red == 13
+
+    removed = state.remove_row('red', 0)
+    assert removed.red_id.tolist() == [1]
+    assert state.red_id.tolist()[:3] == [4, 2, 3]
+    assert state.num_red == 12
+
+
+def test_object_list_gives_unique_ids_and_removes_by_id():
+    objects = ObjectList([RedObject(), RedObject(), RedObject()])
+    assert sorted(red_object.id for red_object in objects) == [1, 2, 3]
+
+    added = RedObject()
+    objects.append(added)
+    assert added.id == 4 and objects.get(4) is added and added in objects
+
+    removed = objects.remove_id(2)
+    assert removed.id == 2 and objects.get(2) is None
+    assert [red_object.id for red_object in objects] == [1, 4, 3]
+    assert all(objects.get(red_object.id) is red_object for red_object in objects)
+
+
+def test_env_state_follows_the_object_lists():
+    env = AlgorithmsEnv([RedObject(np.array([1, 2, 3]), np.array([1, 0, 0]))], [BlueObject()])
+    assert env.state.num_red == 1
+
+    red_object = RedObject(np.array([4, 5, 6]), np.array([0, 1, 0]))
+    env.red_object_list.append(red_object)
+    np.testing.assert_array_equal(env.state.red_position[1], [4, 5, 6])
+
+    # the objects are views of their rows, stepping the state moves them
+    env.step(np.zeros((1, 3)))
+    np.testing.assert_array_equal(red_object.position, [4, 6, 6])
+
+    env.red_object_list.remove_id(env.red_object_list[0].id)
+    assert env.state.num_red == 1
+    np.testing.assert_array_equal(env.state.red_position[0], [4, 6, 6])
@@ -0,0 +1,301 @@
+import numpy as np
+import trajectoy_pradiction as tp
+
+# Motion models of the trackers, see trajectoy_pradiction.RED_TYPES
+MODELS = ('CV', 'CA', 'CT')
+
+# Every model uses the same state layout, so the IMM can mix them:
+# position (3), velocity (3), acceleration (3) and the horizontal turn rate. Models without
+# acceleration or turn rate keep those at zero.
+STATE_SIZE = 10
+POSITION, VELOCITY, ACCELERATION, TURN_RATE = slice(0, 3), slice(3, 6), slice(6, 9), 9
+
+# Model probabilities never drop below this, so a model can always come back and the mixing never underflows
+MIN_MODEL_PROBABILITY = 1e-6
+
+
+def propagate(model: str, state: np.ndarray, dt: float) -> np.ndarray:
+    # (..., STATE_SIZE) states after dt under the model
+    position, velocity = state[..., POSITION], state[..., VELOCITY]
+    propagated = np.zeros_like(state)
+
+    if model == 'CV':
+        propagated[..., POSITION] = position + velocity * dt
+        propagated[..., VELOCITY] = velocity
+    elif model == 'CA':
+        acceleration = state[..., ACCELERATION]
+        propagated[..., POSITION] = position + velocity * dt + acceleration * (0.5 * dt ** 2)
+        propagated[..., VELOCITY] = velocity + acceleration * dt
+        propagated[..., ACCELERATION] = acceleration
+    elif model == 'CT':
+        turn_rate = state[..., TURN_RATE]
+        sin_term, cos_term = tp.turn_terms(turn_rate, dt)
+        sin_angle, cos_angle = np.sin(turn_rate * dt), np.cos(turn_rate * dt)
+        velocity_x, velocity_y = velocity[..., 0], velocity[..., 1]
+        propagated[..., 0] = position[..., 0] + velocity_x * sin_term - velocity_y * cos_term
+        propagated[..., 1] = position[..., 1] + velocity_x * cos_term + velocity_y * sin_term
+        propagated[..., 2] = position[..., 2] + velocity[..., 2] * dt
+        propagated[..., 3] = velocity_x * cos_angle - velocity_y * sin_angle
+        propagated[..., 4] = velocity_x * sin_angle + velocity_y * cos_angle
+        propagated[..., 5] = velocity[..., 2]
+        propagated[..., TURN_RATE] = turn_rate
+    else:
+        raise ValueError(f"Invalid motion model {model!r}, expected one of {MODELS}")
+
+    return propagated
+
+
+def transition_jacobian(model: str, state: np.ndarray, dt: float) -> np.ndarray:
+    # (..., STATE_SIZE, STATE_SIZE) jacobian of propagate, linear models do not depend on the state
+    jacobian = np.zeros(state.shape[:-1] + (STATE_SIZE, STATE_SIZE), dtype=np.float64)
+    axes = np.arange(3)
+
+    if model in ('CV', 'CA'):
+        jacobian[..., axes, axes] = 1
+        jacobian[..., axes, axes + 3] = dt
+        jacobian[..., axes + 3, axes + 3] = 1
+        if model == 'CA':
+            jacobian[..., axes, axes + 6] = 0.5 * dt ** 2
+            jacobian[..., axes + 3, axes + 6] = dt
+            jacobian[..., axes + 6, axes + 6] = 1
+        return jacobian
+
+    # coordinated turn, extended Kalman filter linearization around the state
+    turn_rate = state[..., TURN_RATE]
+    velocity_x, velocity_y = state[..., 3], state[..., 4]
+    sin_term, cos_term = tp.turn_terms(turn_rate, dt)
+    angle = turn_rate * dt
+    sin_angle, cos_angle = np.sin(angle), np.cos(angle)
+
+    # derivatives of the turn terms by the turn rate, with their series close to a zero turn rate
+    straight = np.abs(angle) < 1e-6
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_sin_term = np.where(straight, -turn_rate * dt ** 3 / 3, (dt * cos_angle - sin_term) / turn_rate)
+        d_cos_term = np.where(straight, dt ** 2 / 2, (dt * sin_angle - cos_term) / turn_rate)
+
+    jacobian[..., axes, axes] = 1
+    jacobian[..., 0, 3], jacobian[..., 0, 4] = sin_term, -cos_term
+    jacobian[..., 1, 3], jacobian[..., 1, 4] = cos_term, sin_term
+    jacobian[..., 0, TURN_RATE] = velocity_x * d_sin_term - velocity_y * d_cos_term
+    jacobian[..., 1, TURN_RATE] = velocity_x * d_cos_term + velocity_y * d_sin_term
+    jacobian[..., 2, 5] = dt
+    jacobian[..., 3, 3], jacobian[..., 3, 4] = cos_angle, -sin_angle
+    jacobian[..., 4, 3], jacobian[..., 4, 4] = sin_angle, cos_angle
+    jacobian[..., 3, TURN_RATE] = -dt * (velocity_x * sin_angle + velocity_y * cos_angle)
+    jacobian[..., 4, TURN_RATE] = dt * (velocity_x * cos_angle - velocity_y * sin_angle)
+    jacobian[..., 5, 5] = 1
+    jacobian[..., TURN_RATE, TURN_RATE] = 1
+    return jacobian
+
+
+def process_noise(model: str, dt: float, acceleration_noise: float, jerk_noise: float, turn_rate_noise: float) -> np.ndarray:
+    # (STATE_SIZE, STATE_SIZE) covariance of the continuous white noise driving the model, integrated over dt.
+    # The noises are spectral densities, of the acceleration for CV and CT, of the jerk for CA.
+    noise = np.zeros((STATE_SIZE, STATE_SIZE), dtype=np.float64)
+    axes = np.arange(3)
+
+    if model == 'CA':
+        block = jerk_noise * np.array([[dt ** 5 / 20, dt ** 4 / 8, dt ** 3 / 6],
+                                       [dt ** 4 / 8, dt ** 3 / 3, dt ** 2 / 2],
+                                       [dt ** 3 / 6, dt ** 2 / 2, dt]])
+    else:
+        block = acceleration_noise * np.array([[dt ** 3 / 3, dt ** 2 / 2],
+                                               [dt ** 2 / 2, dt]])
+
+    # the same block for every axis, on the position, velocity (and acceleration) entries of the axis
+    for row, column in np.ndindex(block.shape):
+        noise[axes + 3 * row, axes + 3 * column] = block[row, column]
+
+    if model == 'CT':
+        noise[TURN_RATE, TURN_RATE] = turn_rate_noise * dt
+    return noise
+
+
+class IMMTracker:
+    # Interacting multiple model filter of many tracks at once, one track per red object. Each model runs a
+    # (extended) Kalman filter of all tracks as batched array operations and the model probabilities of every
+    # track follow how well each model predicted its last position measurements, so maneuvering targets switch
+    # to the CA or CT model and back. models=('CV',) is a plain Kalman filter.
+    def __init__(self,
+                 position: np.ndarray,
+                 velocity: np.ndarray | None = None,
+                 models: tuple[str, ...] = MODELS,
+                 dt: float = 1,
+                 measurement_noise: float = 1.0,
+                 acceleration_noise: float = 0.1,
+                 jerk_noise: float = 0.01,
+                 turn_rate_noise: float = 1e-4,
+                 switch_probability: float = 0.05,
+                 initial_velocity_std: float = 10.0,
+                 initial_acceleration_std: float = 1.0,
+                 initial_turn_rate_std: float = 0.1,
+                 ids: np.ndarray | None = None):
+        # tracks start at (N, 3) measured positions, with a velocity when one is known.
+        # ids are the object ids of the tracks, needed to match them with the objects of an environment.
+        for model in models:
+            if model not in MODELS:
+                raise ValueError(f"Invalid motion model {model!r}, expected one of {MODELS}")
+        position = np.asarray(position, dtype=np.float64).reshape(-1, 3)
+        num_tracks, num_models = len(position), len(models)
+
+        self.models = tuple(models)
+        self.dt = dt
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int64).reshape(num_tracks)
+        self.measurement_noise = measurement_noise
+
+        # Markov chain of the model switches, stay in the model or switch to any other one
+        if num_models > 1:
+            self.transition = np.full((num_models, num_models), switch_probability / (num_models - 1))
+            np.fill_diagonal(self.transition, 1 - switch_probability)
+        else:
+            self.transition = np.ones((1, 1))
+        self.process_noise = np.stack([process_noise(model, dt, acceleration_noise, jerk_noise, turn_rate_noise)
+                                       for model in models])
+
+        # (N, M, STATE_SIZE) states and (N, M, STATE_SIZE, STATE_SIZE) covariances of every track under every model
+        self.state = np.zeros((num_tracks, num_models, STATE_SIZE), dtype=np.float64)
+        self.state[..., POSITION] = position[:, None, :]
+        covariance = np.zeros(STATE_SIZE, dtype=np.float64)
+        covariance[POSITION] = measurement_noise ** 2
+        if velocity is None:
+            covariance[VELOCITY] = initial_velocity_std ** 2
+        else:
+            self.state[..., VELOCITY] = np.asarray(velocity, dtype=np.float64).reshape(-1, 1, 3)
+            covariance[VELOCITY] = measurement_noise ** 2
+        covariance[ACCELERATION] = initial_acceleration_std ** 2 if 'CA' in models else 0
+        covariance[TURN_RATE] = initial_turn_rate_std ** 2 if 'CT' in models else 0
+        self.covariance = np.zeros((num_tracks, num_models, STATE_SIZE, STATE_SIZE), dtype=np.float64)
+        self.covariance[...] = np.diag(covariance)
+
+        # (N, M) probability of every model for every track
+        self.model_probability = np.full((num_tracks, num_models), 1 / num_models)
+
+    @property
+    def num_tracks(self) -> int:
+        return len(self.state)
+
+    @property
+    def combined_state(self) -> np.ndarray:
+        # (N, STATE_SIZE) estimate of every track, the states of the models weighted by their probability
+        return np.einsum('nm,nmk->nk', self.model_probability, self.state)
+
+    @property
+    def position(self) -> np.ndarray:
+        return self.combined_state[:, POSITION]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self.combined_state[:, VELOCITY]
+
+    def _mix(self):
+        # every model starts the step from a mix of all model estimates, weighted by the chance of each switch
+        mixing = self.transition[None, :, :] * self.model_probability[:, :, None]  # (N, from, to)
+        predicted_probability = mixing.sum(axis=1)
+        mixing /= np.maximum(predicted_probability, 1e-300)[:, None, :]
+        mixing = mixing.transpose(0, 2, 1)  # (N, to, from)
+
+        state = mixing @ self.state
+        covariance = (mixing @ self.covariance.reshape(mixing.shape[:2] + (STATE_SIZE ** 2,))).reshape(self.covariance.shape)
+        spread = self.state[:, None, :, :] - state[:, :, None, :]  # (N, to, from, STATE_SIZE)
+        covariance += np.swapaxes(spread * mixing[..., None], -1, -2) @ spread
+
+        self.state = state
+        self.covariance = covariance
+        self._predicted_probability = predicted_probability
+
+    def predict(self):
+        # advance every track by dt under each model
+        if len(self.models) > 1:
+            self._mix()
+        else:
+            self._predicted_probability = self.model_probability
+
+        for index, model in enumerate(self.models):
+            state = self.state[:, index]
+            # the linear models have one jacobian for every track
+            shared = model != 'CT'
+            jacobian = transition_jacobian(model, np.zeros(STATE_SIZE) if shared else state, self.dt)
+            self.state[:, index] = propagate(model, state, self.dt)
+            self.covariance[:, index] = _transform(self.covariance[:, index], jacobian, shared) + self.process_noise[index]
+
+    def update(self, measurement: np.ndarray, measured: np.ndarray | None = None):
+        # correct the tracks with (N, 3) position measurements, only where the measured mask is set
+        measurement = np.asarray(measurement, dtype=np.float64).reshape(-1, 3)
+        tracks = slice(None) if measured is None else np.flatnonzero(measured)
+        state, covariance = self.state[tracks], self.covariance[tracks]
+
+        # the measurement is the position, the first three entries of the state
+        innovation = measurement[tracks][:, None, :] - state[..., POSITION]
+        innovation_covariance = covariance[..., POSITION, POSITION] + self.measurement_noise ** 2 * np.eye(3)
+        inverse, determinant = _inverse_3x3(innovation_covariance)
+        gain = covariance[..., :, POSITION] @ inverse  # (n, M, STATE_SIZE, 3)
+
+        self.state[tracks] = state + (gain @ innovation[..., None])[..., 0]
+        updated = covariance - gain @ covariance[..., POSITION, :]
+        self.covariance[tracks] = 0.5 * (updated + np.swapaxes(updated, -1, -2))
+
+        # model probabilities follow the likelihood of the innovation under each model
+        if len(self.models) > 1:
+            distance = np.einsum('nmi,nmi->nm', innovation, (inverse @ innovation[..., None])[..., 0])
+            log_likelihood = -0.5 * (distance + np.log(determinant))
+            probability = self._predicted_probability[tracks] * np.exp(log_likelihood - log_likelihood.max(axis=1, keepdims=True))
+            probability = np.maximum(probability / probability.sum(axis=1, keepdims=True), MIN_MODEL_PROBABILITY)
+            self.model_probability[tracks] = probability / probability.sum(axis=1, keepdims=True)
+        if measured is not None:
+            # tracks without a measurement keep the predicted probabilities
+            unmeasured = ~np.asarray(measured, dtype=bool)
+            self.model_probability[unmeasured] = self._predicted_probability[unmeasured]
+
+    def step(self, measurement: np.ndarray, measured: np.ndarray | None = None):
+        self.predict()
+        self.update(measurement, measured)
+
+    def predict_trajectory(self, steps: int = 30, out: np.ndarray | None = None, tracks: np.ndarray | None = None,
+                           dt: float | None = None) -> np.ndarray:
+        # (N, steps, 3) predicted trajectories like trajectoy_pradiction.trajectory_prediction, the trajectory of
+        # every model weighted by its probability. Index k along the steps axis is the position k steps of dt ahead,
+        # the tracker's own dt by default. tracks selects the tracks to predict, all of them by default.
+        dt = self.dt if dt is None else dt
+        state = self.state if tracks is None else self.state[tracks]
+        model_probability = self.model_probability if tracks is None else self.model_probability[tracks]
+        if out is None:
+            out = np.zeros((len(state), steps, 3), dtype=np.float64)
+        else:
+            out[...] = 0
+
+        buffer = np.empty_like(out)
+        for index, model in enumerate(self.models):
+            model_state = state[:, index]
+            # the trajectories are predicted in steps, so the rates are converted to per step
+            tp.trajectory_prediction(model_state[:, POSITION], model_state[:, VELOCITY] * dt, model, steps, buffer,
+                                     red_object_accelerations=model_state[:, ACCELERATION] * dt ** 2,
+                                     red_object_turn_rates=model_state[:, TURN_RATE] * dt)
+            out += buffer * model_probability[:, index, None, None]
+        return out
+
+
+def _transform(covariance: np.ndarray, jacobian: np.ndarray, shared: bool = False) -> np.ndarray:
+    # jacobian @ covariance @ jacobian.T of (N, S, S) symmetric covariances and (N, S, S) jacobians. A shared (S, S)
+    # jacobian of every track is applied as two matrix products over all the stacked rows, which is much faster
+    # than N small ones.
+    if not shared:
+        return jacobian @ covariance @ np.swapaxes(jacobian, -1, -2)
+
+    transposed = jacobian.T
+    size = covariance.shape[-1]
+    half = (covariance.reshape(-1, size) @ transposed).reshape(covariance.shape)
+    return (np.swapaxes(half, -1, -2).reshape(-1, size) @ transposed).reshape(covariance.shape)
+
+
+def _inverse_3x3(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # inverses and determinants of (..., 3, 3) matrices from their cofactors
+    a, b, c = matrix[..., 0, 0], matrix[..., 0, 1], matrix[..., 0, 2]
+    d, e, f = matrix[..., 1, 0], matrix[..., 1, 1], matrix[..., 1, 2]
+    g, h, i = matrix[..., 2, 0], matrix[..., 2, 1], matrix[..., 2, 2]
+
+    adjugate = np.empty_like(matrix)
+    adjugate[..., 0, 0], adjugate[..., 0, 1], adjugate[..., 0, 2] = e * i - f * h, c * h - b * i, b * f - c * e
+    adjugate[..., 1, 0], adjugate[..., 1, 1], adjugate[..., 1, 2] = f * g - d * i, a * i - c * g, c * d - a * f
+    adjugate[..., 2, 0], adjugate[..., 2, 1], adjugate[..., 2, 2] = d * h - e * g, b * g - a * h, a * e - b * d
+    determinant = a * adjugate[..., 0, 0] + b * adjugate[..., 1, 0] + c * adjugate[..., 2, 0]
+    return adjugate / determinant[..., None, None], determinant
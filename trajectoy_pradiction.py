@@ -1,22 +1,119 @@
+import functools
 import numpy as np
 
 
-def trajectory_prediction_position_velocity(red_object_position, red_object_velocity, red_type: str = 'CM', steps: int = 30) -> tuple[list[int], list[int]]:
-    if red_type == 'CM': # preform linear prediction
-        trajectory = []
-        current_position = red_object_position.copy()
-        velocity = red_object_velocity.copy()
-        trajectory.append(current_position.copy())
-        for i in range(steps-1):
-            trajectory.append((current_position + velocity).copy())
-            current_position += velocity
-        return trajectory, list(range(steps))
-    else:
+# Motion models of the red objects: constant velocity ('CM' is the older name of 'CV'), constant acceleration
+# and coordinated turn, a constant rate turn in the horizontal plane at constant speed
+RED_TYPES = ('CM', 'CV', 'CA', 'CT')
+
+
+def trajectory_prediction(red_object_positions, red_object_velocities, red_type: str = 'CM', steps: int = 30, out: np.ndarray | None = None,
+                          red_object_accelerations=None, red_object_turn_rates=None) -> np.ndarray:
+    # Batched prediction of (..., 3) positions and velocities into a (..., steps, 3) trajectory array,
+    # where index k along the steps axis is the position k ticks ahead.
+    # 'CA' also takes (..., 3) accelerations and 'CT' (...) turn rates in radians per tick, missing ones are zero.
+    # A preallocated out buffer of that shape is filled in place so repeated calls do not allocate.
+    if red_type not in RED_TYPES:
         raise ValueError("Invalid Red Type")
 
+    red_object_positions = np.asarray(red_object_positions, dtype=np.float64)
+    red_object_velocities = np.asarray(red_object_velocities, dtype=np.float64)
+    shape = np.broadcast_shapes(red_object_positions.shape, red_object_velocities.shape)[:-1] + (steps, 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.float64)
+    elif out.shape != shape:
+        raise ValueError(f"Output buffer shape {out.shape} does not match {shape}")
+
+    times = _prediction_times(steps)
+    if red_type == 'CT' and red_object_turn_rates is not None:
+        # the horizontal velocity rotates by turn_rate * t, integrated in closed form
+        sin_term, cos_term = turn_terms(np.asarray(red_object_turn_rates, dtype=np.float64)[..., None], times[:, 0])
+        velocity_x, velocity_y = red_object_velocities[..., 0, None], red_object_velocities[..., 1, None]
+        out[..., 0] = velocity_x * sin_term - velocity_y * cos_term
+        out[..., 1] = velocity_x * cos_term + velocity_y * sin_term
+        out[..., 2] = red_object_velocities[..., 2, None] * times[:, 0]
+    else: # preform linear prediction
+        np.multiply(red_object_velocities[..., None, :], times, out=out)
+
+    if red_type == 'CA' and red_object_accelerations is not None:
+        out += np.asarray(red_object_accelerations, dtype=np.float64)[..., None, :] * (0.5 * times ** 2)
+
+    out += red_object_positions[..., None, :]
+    return out
+
+
+def turn_terms(turn_rate: np.ndarray, time) -> tuple[np.ndarray, np.ndarray]:
+    # sin(w t) / w and (1 - cos(w t)) / w, the displacement of a turn along and across the initial velocity.
+    # Close to w = 0 their series are used, they tend to t and w t^2 / 2.
+    angle = turn_rate * time
+    straight = np.abs(angle) < 1e-6
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sin_term = np.where(straight, time * (1 - angle ** 2 / 6), np.sin(angle) / turn_rate)
+        cos_term = np.where(straight, angle * time / 2, (1 - np.cos(angle)) / turn_rate)
+    return sin_term, cos_term
+
+
+@functools.lru_cache(maxsize=16)
+def _prediction_times(steps: int) -> np.ndarray:
+    # (steps, 1) read only column of tick offsets, shared between calls
+    times = np.arange(steps, dtype=np.float64)[:, None]
+    times.setflags(write=False)
+    return times
+
+
+def trajectory_prediction_position_velocity(red_object_position, red_object_velocity, red_type: str = 'CM', steps: int = 30) -> tuple[list[int], list[int]]:
+    # single object version of trajectory_prediction, returns the trajectory points and their times as lists
+    trajectory = trajectory_prediction(red_object_position, red_object_velocity, red_type, steps)
+    return list(trajectory), list(range(steps))
+
 
 def trajectory_prediction_to_target(blue_object_position, blue_object_max_speed, target_position):
     # return in what time the blue object will reach the target
     distance = np.linalg.norm(target_position - blue_object_position)
     return distance / blue_object_max_speed
 
+
+def intercept_prediction(blue_object_position, blue_object_max_speed, red_object_position, red_object_velocity) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Closed form intercept of a constant velocity red object, the earliest t >= 0 that solves
+    # |red_position + red_velocity * t - blue_position| = blue_max_speed * t.
+    # Positions and velocities have shape (..., 3) and speeds shape (...), they broadcast against each other,
+    # e.g. (B, 1, 3) blue positions and (1, R, 3) red positions give the (B, R) intercepts of all pairs.
+    # return aim points (..., 3), intercept times (..., ) that are inf for unreachable targets and the reachable mask
+    blue_object_position = np.asarray(blue_object_position, dtype=np.float64)
+    blue_object_max_speed = np.asarray(blue_object_max_speed, dtype=np.float64)
+    red_object_position = np.asarray(red_object_position, dtype=np.float64)
+    red_object_velocity = np.asarray(red_object_velocity, dtype=np.float64)
+
+    relative_position = red_object_position - blue_object_position
+    red_speed_squared = np.einsum('...i,...i->...', red_object_velocity, red_object_velocity)
+    a = red_speed_squared - blue_object_max_speed ** 2
+    b = 2 * np.einsum('...i,...i->...', relative_position, red_object_velocity)
+    c = np.einsum('...i,...i->...', relative_position, relative_position)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # numerically stable roots of a * t^2 + b * t + c = 0
+        discriminant = b * b - 4 * a * c
+        q = -0.5 * (b + np.copysign(np.sqrt(np.maximum(discriminant, 0)), b))
+        first_root = _future_root(q / a)
+        second_root = _future_root(c / q)
+        intercept_time = np.where(discriminant < 0, np.inf, np.minimum(first_root, second_root))
+
+        # red speed equals blue speed, the equation degenerates to b * t + c = 0
+        linear = np.isclose(a, 0)
+        intercept_time = np.where(linear, _future_root(-c / b), intercept_time)
+
+        # unreachable targets are aimed at their closest approach to the blue object
+        closest_approach_time = np.where(red_speed_squared > 0, -0.5 * b / red_speed_squared, 0.0)
+
+    intercept_time = np.where(c == 0, 0.0, intercept_time)
+    reachable = np.isfinite(intercept_time)
+    aim_time = np.where(reachable, intercept_time, np.maximum(closest_approach_time, 0))
+
+    aim_point = red_object_position + red_object_velocity * aim_time[..., None]
+
+    return aim_point, intercept_time, reachable
+
+
+def _future_root(root: np.ndarray) -> np.ndarray:
+    # roots in the past or undefined ones are replaced by inf
+    return np.where(np.isfinite(root) & (root >= 0), root, np.inf)
@@ -0,0 +1,164 @@
+import gymnasium as gym
+import numpy as np
+import trajectoy_pradiction as tp
+from red_object import RedObject
+from blue_object import BlueObject
+from assignment import assign_targets
+from world_state import WorldState, TEAM_ARRAYS
+
+
+class VectorAlgorithmsEnv(gym.vector.VectorEnv):
+    # Steps num_envs independent engagements of the same size at once. Every quantity is a batched array,
+    # (num_envs, num_red, 3) for red objects and (num_envs, num_blue, 3) for blue objects.
+    # Environments that finish are reset automatically, their last observation is returned in
+    # infos['final_observation'] with infos['_final_observation'] marking which environments finished.
+    def __init__(self,
+                 red_initial_position: np.ndarray,
+                 red_velocity: np.ndarray,
+                 blue_launch_site_position: np.ndarray,
+                 blue_max_speed: np.ndarray,
+                 num_envs: int = 1,
+                 kill_radius: float = 1,
+                 max_steps: int | None = None,
+                 position_noise: float = 0.0,
+                 dt: float = 1):
+        # scenario arrays without the batch axis are shared by every environment
+        self._red_initial_position = np.broadcast_to(np.asarray(red_initial_position, dtype=np.float64), (num_envs,) + np.shape(red_initial_position)[-2:]).copy()
+        self._red_initial_velocity = np.broadcast_to(np.asarray(red_velocity, dtype=np.float64), self._red_initial_position.shape).copy()
+        self._blue_launch_site_position = np.broadcast_to(np.asarray(blue_launch_site_position, dtype=np.float64), (num_envs,) + np.shape(blue_launch_site_position)[-2:]).copy()
+        self.blue_max_speed = np.broadcast_to(np.asarray(blue_max_speed, dtype=np.float64), self._blue_launch_site_position.shape[:2]).copy()
+
+        self.num_envs = num_envs
+        self.num_red = self._red_initial_position.shape[1]
+        self.num_blue = self._blue_launch_site_position.shape[1]
+        self.kill_radius = kill_radius
+        self.max_steps = max_steps
+        self.dt = dt
+        self.position_noise = position_noise
+
+        self.single_observation_space = gym.spaces.Box(-np.inf, np.inf, shape=(3 * (self.num_blue + self.num_red),), dtype=np.float64)
+        self.single_action_space = gym.spaces.Box(-np.inf, np.inf, shape=(self.num_blue, 3), dtype=np.float64)
+        self.observation_space = gym.vector.utils.batch_space(self.single_observation_space, num_envs)
+        self.action_space = gym.vector.utils.batch_space(self.single_action_space, num_envs)
+        self.closed = False
+        self.is_vector_env = True
+
+        # per environment state
+        self.red_initial_position = self._red_initial_position.copy()
+        self.red_position = self._red_initial_position.copy()
+        self.red_velocity = self._red_initial_velocity.copy()
+        self.red_alive = np.ones((num_envs, self.num_red), dtype=bool)
+
+        self.blue_launch_site_position = self._blue_launch_site_position.copy()
+        self.blue_position = self._blue_launch_site_position.copy()
+        self.blue_velocity = np.zeros_like(self.blue_position)
+        self.blue_alive = np.ones((num_envs, self.num_blue), dtype=bool)
+
+        self.red_id = np.tile(np.arange(self.num_red, dtype=np.int64), (num_envs, 1))
+        self.blue_id = np.tile(np.arange(self.num_blue, dtype=np.int64), (num_envs, 1))
+
+        # one world state per environment, its arrays are views of the environment's row of the batched arrays
+        self.states = [self._state_view(env) for env in range(num_envs)]
+
+        self.time = np.zeros(num_envs, dtype=np.int64)
+        self._rng = np.random.default_rng()
+
+    @classmethod
+    def from_objects(cls, red_object_list: list[RedObject], blue_object_list: list[BlueObject], num_envs: int, **kwargs) -> 'VectorAlgorithmsEnv':
+        return cls(np.array([red_object.initial_position for red_object in red_object_list], dtype=np.float64).reshape(-1, 3),
+                   np.array([red_object.velocity for red_object in red_object_list], dtype=np.float64).reshape(-1, 3),
+                   np.array([blue_object.launch_site_position for blue_object in blue_object_list], dtype=np.float64).reshape(-1, 3),
+                   np.array([blue_object.max_speed for blue_object in blue_object_list], dtype=np.float64),
+                   num_envs=num_envs,
+                   **kwargs)
+
+    def reset(self, seed: int | None = None, options: dict | None = None):
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._get_obs(), {}
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.float64).reshape(self.num_envs, self.num_blue, 3)
+        self.time += 1
+        blue_start_position = self.blue_position.copy()
+        red_start_position = self.red_position.copy()
+        red_alive = self.red_alive.copy()
+
+        # every environment moves and kills like a single engagement
+        for env, state in enumerate(self.states):
+            state.step(actions[env], self.dt)
+            state.kill_swept_pairs(blue_start_position[env], red_start_position[env], self.kill_radius)
+
+        # one point for every red object intercepted in this step
+        rewards = np.count_nonzero(red_alive & ~self.red_alive, axis=1).astype(np.float64)
+
+        terminated = ~self.blue_alive.any(axis=1) | ~self.red_alive.any(axis=1)
+        truncated = np.zeros(self.num_envs, dtype=bool) if self.max_steps is None else (self.time >= self.max_steps) & ~terminated
+
+        obs = self._get_obs()
+        infos = {}
+        done = terminated | truncated
+        if done.any():
+            infos['final_observation'] = np.where(done[:, None], obs, np.nan)
+            infos['_final_observation'] = done
+            self._reset_envs(done)
+            obs = self._get_obs()
+
+        return obs, rewards, terminated, truncated, infos
+
+    def intercept_actions(self) -> np.ndarray:
+        # (num_envs, num_blue, 3) actions that send the alive blue objects of every environment to the intercept
+        # points of the alive red objects assigned to them one to one, blue objects left without a target stay put
+        actions = np.zeros((self.num_envs, self.num_blue, 3), dtype=np.float64)
+        for env, state in enumerate(self.states):
+            alive_blue = np.flatnonzero(state.blue_alive)
+            alive_red = np.flatnonzero(state.red_alive)
+            red_of_blue = assign_targets(state.blue_position[alive_blue], state.blue_max_speed[alive_blue],
+                                         state.red_position[alive_red], state.red_velocity[alive_red])
+            assigned = red_of_blue >= 0
+            blue_indices, red_indices = alive_blue[assigned], alive_red[red_of_blue[assigned]]
+
+            blue_position = state.blue_position[blue_indices]
+            aim_point, _, _ = tp.intercept_prediction(blue_position, state.blue_max_speed[blue_indices],
+                                                      state.red_position[red_indices], state.red_velocity[red_indices])
+            # at full speed, a target reached within the step is flown through at its intercept time
+            direction = aim_point - blue_position
+            distance = np.linalg.norm(direction, axis=1)
+            speed = np.divide(state.blue_max_speed[blue_indices] * self.dt, distance, out=np.zeros_like(distance), where=distance > 0)
+            actions[env, blue_indices] = direction * speed[:, None]
+        return actions
+
+    def close_extras(self, **kwargs):
+        pass
+
+    def _reset_envs(self, mask: np.ndarray):
+        red_initial_position = self._red_initial_position[mask]
+        blue_launch_site_position = self._blue_launch_site_position[mask]
+        if self.position_noise > 0:
+            red_initial_position = red_initial_position + self._rng.normal(0, self.position_noise, red_initial_position.shape)
+            blue_launch_site_position = blue_launch_site_position + self._rng.normal(0, self.position_noise, blue_launch_site_position.shape)
+
+        self.red_initial_position[mask] = red_initial_position
+        self.red_position[mask] = red_initial_position
+        self.red_velocity[mask] = self._red_initial_velocity[mask]
+        self.red_alive[mask] = True
+
+        self.blue_launch_site_position[mask] = blue_launch_site_position
+        self.blue_position[mask] = blue_launch_site_position
+        self.blue_velocity[mask] = 0
+        self.blue_alive[mask] = True
+
+        self.time[mask] = 0
+
+    def _state_view(self, env: int) -> WorldState:
+        state = WorldState.__new__(WorldState)
+        for names in TEAM_ARRAYS.values():
+            for name in names:
+                setattr(state, name, getattr(self, name)[env])
+        return state
+
+    def _get_obs(self) -> np.ndarray:
+        return np.concatenate((self.blue_position.reshape(self.num_envs, -1),
+                               self.red_position.reshape(self.num_envs, -1)), axis=1)
@@ -2,22 +2,101 @@
 from dash import Dash, html, dcc, _dash_renderer, no_update, callback_context, ALL
 _dash_renderer._set_react_version("18.2.0")
 from dash import callback, Input, Output, State
-import json
-import easygui
+import functools
+import concurrent.futures
+import os
+import uuid
 import dash_mantine_components as dmc
 import numpy as np
 import dash_leaflet as dl
+from flask import Response, abort
 
 # local imports
-from simulation_manager import SimulationManager
-from visualization.dash_utils import create_graph, create_leaflet_map, calc_velocity_from_angle, calc_velocity_from_speed
+import metrics
+from session_store import Session, SessionStore
+from playback import record_engagement, encode_recording
+from visualization.icons import PLANE_TEAMS, plane_icon_png
+from visualization.dash_utils import GraphUpdater, MapUpdater, calc_velocity_from_angle, calc_velocity_from_speed
 from red_object import RedObject
 from blue_object import BlueObject
+from scenario import save_scenario as save_scenario_file, load_scenario as load_scenario_file
 
 # Initialize the Dash app
 app = Dash(external_stylesheets=dmc.styles.ALL)
 
-simulation_manager = SimulationManager([], [])
+
+# Prometheus style timing histograms, enabled with GMOP_METRICS=1
+@app.server.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+# One plane icon per team, generated on the first request and cached by the server and the browser
+@app.server.route('/icons/plane_<team>.png')
+def plane_icon_endpoint(team):
+    if team not in PLANE_TEAMS:
+        abort(404)
+    response = Response(plane_icon_png(team), mimetype='image/png')
+    response.cache_control.public = True
+    response.cache_control.max_age = 24 * 60 * 60
+    return response
+
+
+# Simulation steps per second of the background worker, 0 runs as fast as possible
+SIMULATION_RATE_HZ = float(os.environ.get('GMOP_SIMULATION_RATE', 2))
+
+# Simulated time of one step
+SIMULATION_DT = float(os.environ.get('GMOP_SIMULATION_DT', 1))
+
+# Limits of the idle sessions kept in memory, evicted sessions are spilled to GMOP_SESSION_SPILL_DIR when it is set
+MAX_SESSIONS = int(os.environ.get('GMOP_MAX_SESSIONS', 16))
+MAX_SESSION_MEMORY_MB = float(os.environ.get('GMOP_MAX_SESSION_MEMORY_MB', 0))
+SESSION_SPILL_DIR = os.environ.get('GMOP_SESSION_SPILL_DIR') or None
+
+
+class DashSession(Session):
+    # A session together with what its browser tab was last sent
+    def __init__(self, session_id: str, simulation_manager, rate_hz: float | None):
+        super().__init__(session_id, simulation_manager, rate_hz)
+        self.graph_updater = GraphUpdater()
+        self.map_updater = MapUpdater()
+        self.rendered_version = 0
+        self.edit_mode = None
+
+
+sessions = SessionStore(DashSession,
+                        max_sessions=MAX_SESSIONS,
+                        max_bytes=int(MAX_SESSION_MEMORY_MB * 2 ** 20) or None,
+                        spill_directory=SESSION_SPILL_DIR,
+                        rate_hz=SIMULATION_RATE_HZ or None,
+                        dt=SIMULATION_DT)
+
+# engagement reviews run headless here, off the simulation workers
+recorder = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='review-engagement')
+
+
+def with_session(function):
+    # the last callback argument is the session id of the browser tab, the callback gets its session instead
+    @functools.wraps(function)
+    def wrapper(*args):
+        return function(*args[:-1], sessions.get(args[-1]))
+    return wrapper
+
+
+def render_edit(session: DashSession, edit):
+    # apply edit(simulation_manager) between two ticks and send the full graph and map of the edited simulation,
+    # an edit that returns False changed nothing
+    edited, snapshot = session.worker.edit(edit)
+    if edited is False:
+        return no_update, no_update
+    return render(session, snapshot, full=True)
+
+
+def render(session: DashSession, snapshot, full: bool = False):
+    session.rendered_version = snapshot.version
+    if full:
+        return session.graph_updater.full_figure(snapshot), session.map_updater.full_map(snapshot)
+    return session.graph_updater.update(snapshot), session.map_updater.update(snapshot)
 
 # Reference point (center of the map in Leaflet)
 center_lat, center_lng = 32.0, 35.0
@@ -30,85 +109,107 @@ longitude_bound = [-100 / 93000, 100 / 93000]  # ~[-0.00108, 0.00108]
 southwest_bound = [center_lat + latitude_bound[0], center_lng + longitude_bound[0]]
 northeast_bound = [center_lat + latitude_bound[1], center_lng + longitude_bound[1]]
 
-app.layout = dmc.MantineProvider(
-    forceColorScheme="dark",
-    children=[
-        html.Div([
-            dmc.Grid([
-                dmc.GridCol(children=[
-                    dmc.Stack(children=[
-                        dmc.Group([
-                            dmc.Text('Inputs:\n'),
-                            dmc.Button("Load Input", id="load-input-button", color='blue', n_clicks=0, fullWidth=True),
-                            dmc.Button("Save Input", id="save-input-button", color='blue', n_clicks=0, fullWidth=True),
-                        ]),
-                        dmc.Group([
-                            dmc.Text('Simulation Control:\n'),
-                            dmc.Button('Run Simulation', id='run-simulation-button', n_clicks=0, fullWidth=True, size='l'),
-                            dmc.Button('One Step', id='one-step-button', n_clicks=0, fullWidth=True),
-                            dmc.Button('Pause / Resume Simulation', id='pause-simulation-button', n_clicks=0, color='red', fullWidth=True),
-                            dmc.Button('Reset Simulation', id='reset-simulation-button', n_clicks=0, color='red', fullWidth=True),
-                        ]),
+def serve_layout():
+    # every page load gets a new session id, it is kept for the lifetime of the browser tab
+    return dmc.MantineProvider(
+        forceColorScheme="dark",
+        children=[
+            dcc.Store(id='session-id', storage_type='session', data=uuid.uuid4().hex),
+            html.Div([
+                dmc.Grid([
+                    dmc.GridCol(children=[
+                        dmc.Stack(children=[
+                            dmc.Group([
+                                dmc.Text('Inputs:\n'),
+                                dmc.Button("Load Input", id="load-input-button", color='blue', n_clicks=0, fullWidth=True),
+                                dmc.Button("Save Input", id="save-input-button", color='blue', n_clicks=0, fullWidth=True),
+                            ]),
+                            dmc.Group([
+                                dmc.Text('Simulation Control:\n'),
+                                dmc.Button('Run Simulation', id='run-simulation-button', n_clicks=0, fullWidth=True, size='l'),
+                                dmc.Button('One Step', id='one-step-button', n_clicks=0, fullWidth=True),
+                                dmc.Button('Pause / Resume Simulation', id='pause-simulation-button', n_clicks=0, color='red', fullWidth=True),
+                                dmc.Button('Reset Simulation', id='reset-simulation-button', n_clicks=0, color='red', fullWidth=True),
+                            ]),
+                            dmc.Group([
+                                dmc.Text('Objects:\n'),
+                                dmc.Button('Add Blue Object', id='add-blue-button', n_clicks=0, color='green', fullWidth=True),
+                                dmc.Button('Add Red Object', id='add-red-button', n_clicks=0, color='red', fullWidth=True),
+                                dmc.Button('Clear Objects', id='clear-objects-button', n_clicks=0, fullWidth=True),
+                            ]),
+                            dmc.Group([
+                                dmc.Text('Review:\n'),
+                                dmc.Button('Review Engagement', id='review-engagement-button', n_clicks=0, color='grape', fullWidth=True),
+                            ]),
+                        ],
+                            gap='s',
+                            align='center',
+                        )
+                    ],
+                        style={'padding-top': '30px'},
+                        span=2
+                    ),
+
+                    dmc.GridCol(children=[
+                        dl.Map(id="leaflet-map", style={'height': '95vh', 'backgroundColor': 'white'},
+                               center=[center_lat, center_lng],
+                               bounds=[southwest_bound, northeast_bound],
+                               zoom=2,
+                               crs="Simple",
+                               children=[
+                                   dl.LayerGroup(id="object-markers"),
+
+                                   dl.FeatureGroup(
+                                       [dl.EditControl(id="edit_control", position="topleft",
+                                                       draw=dict(
+                                                           marker=True,
+                                                           circle=False,
+                                                           circlemarker=False,
+                                                           polygon=False,
+                                                           polyline=False,
+                                                           rectangle=False
+                                                       )
+                                                       )]),
+                               ]),
+                    ],
+                        style={'padding-top': '30px'},
+                        span=5
+                    ),
+
+                    dmc.GridCol(children=[
+                        dcc.Graph(id='live-update-graph', style={'height': '88vh'}),
+                        dcc.Interval(
+                            id='interval-component',
+                            interval=500,  # Update every 500 milliseconds
+                            n_intervals=0,
+                            disabled=True
+                        ),
+
+                        # Playback of a recorded engagement, animated in the browser
                         dmc.Group([
-                            dmc.Text('Objects:\n'),
-                            dmc.Button('Add Blue Object', id='add-blue-button', n_clicks=0, color='green', fullWidth=True),
-                            dmc.Button('Add Red Object', id='add-red-button', n_clicks=0, color='red', fullWidth=True),
-                            dmc.Button('Clear Objects', id='clear-objects-button', n_clicks=0, fullWidth=True),
+                            dmc.Button('Play / Pause', id='playback-play-button', n_clicks=0, disabled=True),
+                            html.Div(dcc.Slider(id='playback-frame', min=0, max=0, step=1, value=0, marks=None,
+                                                tooltip={'placement': 'top'}, updatemode='drag'),
+                                     style={'flex': 1}),
+                            dcc.Dropdown(id='playback-speed', value=1, clearable=False, style={'width': '90px', 'color': 'black'},
+                                         options=[{'label': f'{speed}x', 'value': speed} for speed in (0.5, 1, 2, 4, 8, 16)]),
                         ]),
+                        dcc.Store(id='playback-data'),
+                        dcc.Interval(id='playback-interval', interval=500, n_intervals=0, disabled=True),
                     ],
-                        gap='s',
-                        align='center',
-                    )
-                ],
-                    style={'padding-top': '30px'},
-                    span=2
-                ),
-
-                dmc.GridCol(children=[
-                    dl.Map(id="leaflet-map", style={'height': '95vh', 'backgroundColor': 'white'},
-                           center=[center_lat, center_lng],
-                           bounds=[southwest_bound, northeast_bound],
-                           zoom=2,
-                           crs="Simple",
-                           children=[
-                               dl.LayerGroup(id="object-markers"),
-
-                               dl.FeatureGroup(
-                                   [dl.EditControl(id="edit_control", position="topleft",
-                                                   draw=dict(
-                                                       marker=True,
-                                                       circle=False,
-                                                       circlemarker=False,
-                                                       polygon=False,
-                                                       polyline=False,
-                                                       rectangle=False
-                                                   )
-                                                   )]),
-                           ]),
-                ],
-                    style={'padding-top': '30px'},
-                    span=5
-                ),
-
-                dmc.GridCol(children=[
-                    dcc.Graph(id='live-update-graph', style={'height': '95vh'}),
-                    dcc.Interval(
-                        id='interval-component',
-                        interval=500,  # Update every 500 milliseconds
-                        n_intervals=0,
-                        disabled=True
+                        style={'padding-top': '30px'},
+                        span=5
                     ),
                 ],
-                    style={'padding-top': '30px'},
-                    span=5
-                ),
-            ],
-                style={'padding-left': '10px', 'padding-right': '10px'},),
-            html.Div(id='trigger'),
-            html.Div(id='red_object_alt_callback'),
-        ]),
-    ]
-)
+                    style={'padding-left': '10px', 'padding-right': '10px'},),
+                html.Div(id='trigger'),
+                html.Div(id='red_object_alt_callback'),
+            ]),
+        ]
+    )
+
+
+app.layout = serve_layout
 
 
 # Callback to clear all objects
@@ -116,37 +217,42 @@ app.layout = dmc.MantineProvider(
     Output('live-update-graph', 'figure', allow_duplicate=True),
     Output('object-markers', 'children', allow_duplicate=True),
     Input('clear-objects-button', 'n_clicks'),
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def clear_objects(n_clicks):
+@metrics.timed_callback
+@with_session
+def clear_objects(n_clicks, session: DashSession):
     if n_clicks is None or n_clicks == 0:
         return no_update, no_update
 
-    simulation_manager.env.red_object_list = []
-    simulation_manager.env.blue_object_list = []
-    simulation_manager.time = 0
+    def clear(simulation_manager):
+        simulation_manager.env.red_object_list = []
+        simulation_manager.env.blue_object_list = []
+        simulation_manager.time = 0
 
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+    return render_edit(session, clear)
 
 
 @callback(
     Output('trigger', 'children', allow_duplicate=True),
     Input('save-input-button', 'n_clicks'),
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def save_scenario(save_clicks):
+@metrics.timed_callback
+@with_session
+def save_scenario(save_clicks, session: DashSession):
     if save_clicks is None or save_clicks == 0:
         return no_update
 
-    # Save the current state of red and blue objects to a file
-    save_data = {
-        "blue_objects": [blue_object.to_dict() for blue_object in simulation_manager.env.blue_object_list],
-        "red_objects": [red_object.to_dict() for red_object in simulation_manager.env.red_object_list]
-    }
-    filepath = easygui.filesavebox('save scenario file', default='./', filetypes=['*.json'])
-    filepath = filepath.split('.')[0] + '.json' if not filepath.split('.')[0].endswith('.json') else filepath.split('.')[0]
-    with open(filepath, "w") as f:
-        json.dump(save_data, f, indent=4)
+    import easygui  # opens a desktop dialog, only loaded when it is used
+    filepath = easygui.filesavebox('save scenario file', default='./', filetypes=['*.npz'])
+    if filepath is None:
+        return no_update
+    filepath = os.path.splitext(filepath)[0] + '.npz'
+    # the latest snapshot is consistent and immutable, saving it does not hold up the simulation
+    save_scenario_file(filepath, session.worker.latest().state)
 
     return no_update
 
@@ -155,36 +261,42 @@ def save_scenario(save_clicks):
     Output('live-update-graph', 'figure', allow_duplicate=True),
     Output('object-markers', 'children', allow_duplicate=True),
     Input('load-input-button', 'n_clicks'),
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def load_scenario(load_clicks):
+@metrics.timed_callback
+@with_session
+def load_scenario(load_clicks, session: DashSession):
     if load_clicks is None or load_clicks == 0:
         return no_update
 
     # Load the saved object data from the file
-    filepath = easygui.fileopenbox('select scenario file', default='./', filetypes=['*.json'])
-    with open(filepath, "r") as file:
-        load_data = json.load(file)  # Load the JSON data
+    import easygui
+    filepath = easygui.fileopenbox('select scenario file', default='./', filetypes=['*.npz', '*.json'])
+    if filepath is None:
+        return no_update
 
     # Update simulation manager's environment with loaded data
-    simulation_manager.env.blue_object_list = [BlueObject(np.array(data['position'], dtype=np.float64), float(data['max_speed'])) for data in
-                                               load_data['blue_objects']]
-    simulation_manager.env.red_object_list = [RedObject(np.array(data['position'], dtype=np.float64), np.array(data['velocity'], dtype=np.float64)) for data in
-                                              load_data['red_objects']]
+    red_object_list, blue_object_list = load_scenario_file(filepath)
 
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+    def load(simulation_manager):
+        simulation_manager.env.blue_object_list = blue_object_list
+        simulation_manager.env.red_object_list = red_object_list
+
+    return render_edit(session, load)
 
 
 # Callback to add blue object
-edit_mode = None
 @app.callback(
     Output("edit_control", "drawToolbar", allow_duplicate=True),
     [Input('add-blue-button', 'n_clicks'),
      Input('add-red-button', 'n_clicks')],
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def add_marker(_, __):
-    global edit_mode
+@metrics.timed_callback
+@with_session
+def add_marker(_, __, session: DashSession):
     ctx = callback_context
 
     if not ctx.triggered:
@@ -193,9 +305,9 @@ def add_marker(_, __):
     # Determine which button was clicked
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
     if triggered_id == 'add-blue-button':
-        edit_mode = 'blue'
+        session.edit_mode = 'blue'
     elif triggered_id == 'add-red-button':
-        edit_mode = 'red'
+        session.edit_mode = 'red'
 
     return dict(mode="marker")
 
@@ -205,29 +317,43 @@ def add_marker(_, __):
     Output('object-markers', 'children', allow_duplicate=True),
     Output("edit_control", "editToolbar"),
     Input('edit_control', 'geojson'),
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def add_objects(geojson):
-    global edit_mode
-    if geojson:
-
-        features = geojson['features']
-        if features:
-            # Get the coordinates of the last added marker
-            coordinates = features[-1]['geometry']['coordinates']
-            if edit_mode == 'blue':
-                position = np.array([coordinates[1], coordinates[0], 0])  # Note: Leaflet uses [lng, lat]
-                max_speed = float(3)
-                new_blue = BlueObject(position, max_speed)
-                simulation_manager.env.blue_object_list.append(new_blue)
-
-            elif edit_mode == 'red':
-                position = np.array([coordinates[1], coordinates[0], 0])
-                velocity = np.array([1, 0, 0])
-                new_red = RedObject(position, velocity)
-                simulation_manager.env.red_object_list.append(new_red)
-
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager), dict(mode="remove", action="clear all")
+@metrics.timed_callback
+@with_session
+def add_objects(geojson, session: DashSession):
+    edit_mode = session.edit_mode
+
+    def add(simulation_manager):
+        if geojson:
+
+            features = geojson['features']
+            if features:
+                # Get the coordinates of the last added marker
+                coordinates = features[-1]['geometry']['coordinates']
+                if edit_mode == 'blue':
+                    position = np.array([coordinates[1], coordinates[0], 0])  # Note: Leaflet uses [lng, lat]
+                    max_speed = float(3)
+                    new_blue = BlueObject(position, max_speed)
+                    simulation_manager.env.blue_object_list.append(new_blue)
+
+                elif edit_mode == 'red':
+                    position = np.array([coordinates[1], coordinates[0], 0])
+                    velocity = np.array([1, 0, 0])
+                    new_red = RedObject(position, velocity)
+                    simulation_manager.env.red_object_list.append(new_red)
+
+    _, snapshot = session.worker.edit(add)
+    return *render(session, snapshot, full=True), dict(mode="remove", action="clear all")
+
+
+def triggered_position(ctx) -> int | None:
+    # position of the triggered object in the values of the pattern matching inputs
+    for position, item in enumerate(ctx.inputs_list[0]):
+        if item['id']['index'] == ctx.triggered_id['index']:
+            return position
+    return None
 
 
 def is_valid_number(value):
@@ -246,53 +372,54 @@ def is_valid_number(value):
     Input({"type": "red_object_angle", "index": ALL}, "value"),
     Input({"type": "red_object_speed", "index": ALL}, "value"),
     Input({"type": "red_object_delete", "index": ALL}, "n_clicks"),
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def update_red_object(new_alt, new_vel, new_angle, new_speed, new_delete):
-    # Check if there are no red objects, return early
-    if len(simulation_manager.env.red_object_list) == 0:
-        return no_update, no_update
-
+@metrics.timed_callback
+@with_session
+def update_red_object(new_alt, new_vel, new_angle, new_speed, new_delete, session: DashSession):
     ctx = callback_context
 
     if not ctx.triggered:
-        return no_update
-    alive_red_objects = []
-    for red_object in simulation_manager.env.red_object_list:
-        if red_object.i_am_alive:
-            alive_red_objects.append(red_object)
+        return no_update, no_update
+    triggered_id = ctx.triggered_id
+
+    # the popups of every object list their inputs in the same order, find the one that was used
+    i = triggered_position(ctx)
 
-    for i, red_object in enumerate(alive_red_objects):
-        # Check if this is the triggered input and if n_clicks is 0
-        if ctx.triggered_id['index'] == red_object.id:
-            if new_vel[i] is None or new_alt[i] is None:
-                return no_update  # Do nothing if button hasn't been clicked
+    def update(simulation_manager):
+        red_object = simulation_manager.env.red_object_list.get(triggered_id['index'])
+        if red_object is None or i is None:
+            return False
 
-            red_object.position[2] = new_alt[i]  # Update the altitude
-            if ctx.triggered_id['type'] == 'red_object_velocity':
-                splitted_velocity = new_vel[i].split(',')
-                # check the all the 3 values is valid numbers
+        if new_vel[i] is None or new_alt[i] is None:
+            return False  # Do nothing if button hasn't been clicked
 
-                if new_vel[i] is None or len(splitted_velocity) != 3 or not all(is_valid_number(v) for v in splitted_velocity):
-                    return no_update
+        if triggered_id['type'] == 'red_object_delete':
+            # remove the red object
+            simulation_manager.env.red_object_list.remove_id(red_object.id)
+            return
 
-                red_object.velocity = np.array(new_vel[i].split(','), dtype=np.float64)
-            elif ctx.triggered_id['type'] == 'red_object_angle':
-                if new_angle[i] is None:
-                    return no_update
-                red_object.velocity = calc_velocity_from_angle(red_object.velocity, new_angle[i])
+        red_object.position[2] = new_alt[i]  # Update the altitude
+        if triggered_id['type'] == 'red_object_velocity':
+            splitted_velocity = new_vel[i].split(',')
+            # check the all the 3 values is valid numbers
 
-            elif ctx.triggered_id['type'] == 'red_object_speed':
-                if new_speed[i] is None:
-                    return no_update
-                red_object.velocity = calc_velocity_from_speed(red_object.velocity, new_speed[i])
+            if new_vel[i] is None or len(splitted_velocity) != 3 or not all(is_valid_number(v) for v in splitted_velocity):
+                return False
 
-            elif ctx.triggered_id['type'] == 'red_object_delete':
-                # remove the red object
-                simulation_manager.env.red_object_list.pop(i)
-            break
+            red_object.velocity = np.array(new_vel[i].split(','), dtype=np.float64)
+        elif triggered_id['type'] == 'red_object_angle':
+            if new_angle[i] is None:
+                return False
+            red_object.velocity = calc_velocity_from_angle(red_object.velocity, new_angle[i])
 
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+        elif triggered_id['type'] == 'red_object_speed':
+            if new_speed[i] is None:
+                return False
+            red_object.velocity = calc_velocity_from_speed(red_object.velocity, new_speed[i])
+
+    return render_edit(session, update)
 
 
 # Callback to update the max speed of the blue object
@@ -301,54 +428,68 @@ def update_red_object(new_alt, new_vel, new_angle, new_speed, new_delete):
     Output('object-markers', 'children', allow_duplicate=True),
     Input({"type": "blue_object_speed", "index": ALL}, "value"),
     Input({"type": "blue_object_delete", "index": ALL}, "n_clicks"),
+    State('session-id', 'data'),
     prevent_initial_call=True
 )
-def update_blue_object(new_speed, new_delete):
-    # Check if there are no blue objects, return early
-    if len(simulation_manager.env.blue_object_list) == 0:
-        return no_update, no_update
-
+@metrics.timed_callback
+@with_session
+def update_blue_object(new_speed, new_delete, session: DashSession):
     ctx = callback_context
 
     if not ctx.triggered:
-        return no_update
+        return no_update, no_update
+    triggered_id = ctx.triggered_id
+
+    i = triggered_position(ctx)
 
-    for i, blue_object in enumerate(simulation_manager.env.blue_object_list):
-        # Check if this is the triggered input and if n_clicks is 0
-        if ctx.triggered_id['index'] == blue_object.id:
-            if ctx.triggered_id['type'] == 'blue_object_speed':
-                if new_speed[i] == 0 or new_speed[i] is None:
-                    return no_update
+    def update(simulation_manager):
+        blue_object = simulation_manager.env.blue_object_list.get(triggered_id['index'])
+        if blue_object is None or i is None:
+            return False
 
-                try:
-                    blue_object.max_speed = float(new_speed[i])  # Update the max speed
-                except ValueError:
-                    return no_update
-                break
+        if triggered_id['type'] == 'blue_object_speed':
+            if new_speed[i] == 0 or new_speed[i] is None:
+                return False
 
-            elif ctx.triggered_id['type'] == 'blue_object_delete':
-                simulation_manager.env.blue_object_list.pop(i)
+            try:
+                blue_object.max_speed = float(new_speed[i])  # Update the max speed
+            except ValueError:
+                return False
 
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+        elif triggered_id['type'] == 'blue_object_delete':
+            simulation_manager.env.blue_object_list.remove_id(blue_object.id)
+
+    return render_edit(session, update)
 
 
 # Callback for the initial graph
 @app.callback(Output('live-update-graph', 'figure'),
               Output('object-markers', 'children'),
               Input('interval-component', 'n_intervals'),
+              State('session-id', 'data'),
               )
-def initial_graph(_):
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+@metrics.timed_callback
+@with_session
+def initial_graph(n_intervals, session: DashSession):
+    # only on page load, the simulation ticks are handled by update_graph
+    if n_intervals:
+        return no_update, no_update
+    return render(session, session.worker.latest(), full=True)
 
 
 # Callback to run the simulation
 @app.callback(Output('interval-component', 'disabled', allow_duplicate=True),
               Input('run-simulation-button', 'n_clicks'),
+              State('session-id', 'data'),
               prevent_initial_call=True)
-def run_simulation(n_clicks):
-    if len(simulation_manager.env.red_object_list) < 1 or len(simulation_manager.env.blue_object_list) < 1:
+@metrics.timed_callback
+@with_session
+def run_simulation(n_clicks, session: DashSession):
+    state = session.worker.latest().state
+    if state.num_red < 1 or state.num_blue < 1:
         return no_update
 
+    session.worker.resume()
     return not n_clicks > 0
 
 # Callback to pause / resume the simulation
@@ -356,11 +497,19 @@ def run_simulation(n_clicks):
 
                 Output('pause-simulation-button', 'color'),
                 Input('pause-simulation-button', 'n_clicks'),
+                State('session-id', 'data'),
                 prevent_initial_call=True)
-def pause_simulation(n_clicks):
-    if len(simulation_manager.env.red_object_list) < 1 or len(simulation_manager.env.blue_object_list) < 1:
+@metrics.timed_callback
+@with_session
+def pause_simulation(n_clicks, session: DashSession):
+    state = session.worker.latest().state
+    if state.num_red < 1 or state.num_blue < 1:
         return no_update
 
+    if n_clicks % 2 == 0:
+        session.worker.resume()
+    else:
+        session.worker.pause()
     return not n_clicks % 2 == 0, 'red' if n_clicks % 2 == 0 else 'green'
 
 
@@ -368,26 +517,29 @@ def pause_simulation(n_clicks):
 @app.callback(Output('live-update-graph', 'figure', allow_duplicate=True),
               Output('object-markers', 'children', allow_duplicate=True),
               Input('reset-simulation-button', 'n_clicks'),
+              State('session-id', 'data'),
               prevent_initial_call=True)
-def reset_simulation(_):
-    simulation_manager.reset()
+@metrics.timed_callback
+@with_session
+def reset_simulation(_, session: DashSession):
     # create obs of the reset environment
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+    return render_edit(session, lambda simulation_manager: simulation_manager.reset())
 
 
 # take one step
 @app.callback(Output('live-update-graph', 'figure', allow_duplicate=True),
               Output('object-markers', 'children', allow_duplicate=True),
                 Input('one-step-button', 'n_clicks'),
+                State('session-id', 'data'),
                 prevent_initial_call=True)
-def one_step(_):
-    if len(simulation_manager.env.red_object_list) < 1 or len(simulation_manager.env.blue_object_list) < 1:
+@metrics.timed_callback
+@with_session
+def one_step(_, session: DashSession):
+    state = session.worker.latest().state
+    if state.num_red < 1 or state.num_blue < 1:
         return no_update
 
-    action = simulation_manager.env.take_action()
-    obs, reward, done, _ = simulation_manager.step(action)
-
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager)
+    return render(session, session.worker.step_once())
 
 
 @app.callback(
@@ -395,14 +547,154 @@ def one_step(_):
     Output('object-markers', 'children', allow_duplicate=True),
     Output('interval-component', 'disabled'),
     Input('interval-component', 'n_intervals'),
+    State('session-id', 'data'),
+    prevent_initial_call=True
+)
+@metrics.timed_callback
+@with_session
+def update_graph(_, session: DashSession):
+    # only render, the simulation is stepped by the background worker
+    snapshot = session.worker.latest()
+    done = snapshot.done and not session.worker.is_running
+    if snapshot.version == session.rendered_version:
+        return no_update, no_update, done
+
+    return *render(session, snapshot), done
+
+
+# Record the scenario headless to completion and ship every frame to the browser for review
+@app.callback(Output('playback-data', 'data'),
+              Output('playback-frame', 'max'),
+              Output('playback-frame', 'value'),
+              Output('playback-play-button', 'disabled'),
+              Output('interval-component', 'disabled', allow_duplicate=True),
+              Input('review-engagement-button', 'n_clicks'),
+              State('session-id', 'data'),
+              prevent_initial_call=True)
+@metrics.timed_callback
+@with_session
+def review_engagement(_, session: DashSession):
+    session.worker.pause()
+    # copy between two ticks and record outside the worker, so its lock is not held for the whole run
+    # and no snapshot is published for a state that did not change
+    simulation_manager = session.worker.copy()
+    recording = recorder.submit(record_engagement, simulation_manager, in_place=True).result()
+
+    # playback redraws the graph in the browser, the next live render has to send the full figure again
+    session.graph_updater = GraphUpdater()
+    return encode_recording(recording), len(recording['red_position']) - 1, 0, False, True
+
+
+# Play / pause the recorded engagement
+app.clientside_callback(
+    """
+    function(n_clicks, disabled) {
+        return !disabled;
+    }
+    """,
+    Output('playback-interval', 'disabled'),
+    Input('playback-play-button', 'n_clicks'),
+    State('playback-interval', 'disabled'),
     prevent_initial_call=True
 )
-def update_graph(_):
 
-    action = simulation_manager.env.take_action()
-    obs, reward, done, _ = simulation_manager.step(action)
+# Real time is 500 milliseconds per frame
+app.clientside_callback(
+    """
+    function(speed) {
+        return 500 / speed;
+    }
+    """,
+    Output('playback-interval', 'interval'),
+    Input('playback-speed', 'value'),
+)
 
-    return create_graph(simulation_manager), create_leaflet_map(simulation_manager), done
+# Advance one frame per playback tick and stop at the last frame
+app.clientside_callback(
+    """
+    function(n_intervals, frame, max_frame) {
+        if (frame >= max_frame) {
+            return [max_frame, true];
+        }
+        return [frame + 1, false];
+    }
+    """,
+    Output('playback-frame', 'value', allow_duplicate=True),
+    Output('playback-interval', 'disabled', allow_duplicate=True),
+    Input('playback-interval', 'n_intervals'),
+    State('playback-frame', 'value'),
+    State('playback-frame', 'max'),
+    prevent_initial_call=True
+)
+
+# Draw a frame of the recording into the traces built by create_graph_traces
+app.clientside_callback(
+    """
+    function(frame, data, figure) {
+        if (!data || !figure) {
+            return window.dash_clientside.no_update;
+        }
+
+        // decode each recording once
+        if (!window.gmopPlayback || window.gmopPlayback.key !== data.key) {
+            const decode = (array) => {
+                const bytes = Uint8Array.from(atob(array.data), c => c.charCodeAt(0));
+                return array.dtype === 'float32' ? new Float32Array(bytes.buffer) : bytes;
+            };
+            window.gmopPlayback = {key: data.key};
+            for (const name of ['time', 'red_id', 'red_velocity', 'red_position', 'red_alive', 'blue_id', 'blue_max_speed', 'blue_position', 'blue_alive']) {
+                window.gmopPlayback[name] = decode(data[name]);
+            }
+        }
+        const rec = window.gmopPlayback;
+        const R = data.num_red, B = data.num_blue;
+
+        const trace = () => ({x: [], y: [], z: [], customdata: []});
+        const red = trace(), deadRed = trace(), redText = trace(), arrows = trace(), blue = trace(), blueText = trace();
+        const cones = {x: [], y: [], z: [], u: [], v: [], w: []};
+
+        for (let i = 0; i < R; i++) {
+            const p = (frame * R + i) * 3, v = i * 3;
+            const x = rec.red_position[p], y = rec.red_position[p + 1], z = rec.red_position[p + 2];
+            const vx = rec.red_velocity[v], vy = rec.red_velocity[v + 1], vz = rec.red_velocity[v + 2];
+            const target = rec.red_alive[frame * R + i] ? red : deadRed;
+            target.x.push(x); target.y.push(y); target.z.push(z);
+            target.customdata.push([rec.red_id[i], vx, vy, vz]);
+            if (!rec.red_alive[frame * R + i]) {
+                continue;
+            }
+            redText.x.push(x); redText.y.push(y); redText.z.push(z + 2);
+            const ex = x + 20 * vx, ey = y + 20 * vy, ez = z + 20 * vz;
+            arrows.x.push(x, ex, NaN); arrows.y.push(y, ey, NaN); arrows.z.push(z, ez, NaN);
+            cones.x.push(ex); cones.y.push(ey); cones.z.push(ez);
+            cones.u.push(vx); cones.v.push(vy); cones.w.push(vz);
+        }
+        for (let i = 0; i < B; i++) {
+            if (!rec.blue_alive[frame * B + i]) {
+                continue;
+            }
+            const p = (frame * B + i) * 3;
+            const x = rec.blue_position[p], y = rec.blue_position[p + 1], z = rec.blue_position[p + 2];
+            blue.x.push(x); blue.y.push(y); blue.z.push(z);
+            blue.customdata.push([rec.blue_id[i], rec.blue_max_speed[i]]);
+            blueText.x.push(x); blueText.y.push(y); blueText.z.push(z);
+        }
+
+        const updates = [red, deadRed, redText, arrows, cones, blue, blueText];
+        const newData = figure.data.map((t, i) => i < updates.length ? Object.assign({}, t, updates[i]) : t);
+        const annotations = (figure.layout.annotations || []).map(a => Object.assign({}, a));
+        if (annotations.length) {
+            annotations[0].text = 'Time: ' + parseFloat(rec.time[frame].toFixed(3));
+        }
+        return Object.assign({}, figure, {data: newData, layout: Object.assign({}, figure.layout, {annotations: annotations})});
+    }
+    """,
+    Output('live-update-graph', 'figure', allow_duplicate=True),
+    Input('playback-frame', 'value'),
+    State('playback-data', 'data'),
+    State('live-update-graph', 'figure'),
+    prevent_initial_call=True
+)
 
 
 if __name__ == '__main__':
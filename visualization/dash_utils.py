@@ -1,27 +1,17 @@
 import math
 import numpy as np
 import plotly.graph_objs as go
-from simulation_manager import SimulationManager
-from dash import html
+from simulation_manager import SimulationManager, Snapshot
+import metrics
+from dash import html, Patch
 from dash import dcc
 import dash_mantine_components as dmc
 
 
-def create_graph(simulation_manager: SimulationManager):
+@metrics.timed('create_graph')
+def create_graph(simulation_manager: SimulationManager | Snapshot, traces: list | None = None):
     # Create a subplot with 1 row and 2 columns
-    fig = go.Figure()
-
-    # Add red objects to 3D map
-    for red_object in simulation_manager.env.red_object_list:
-        fig.add_traces(red_object.plot_object_3d())
-
-    # Add blue objects to 3D map
-    for blue_object in simulation_manager.env.blue_object_list:
-        fig.add_traces(blue_object.plot_object_3d())
-
-    # Add launch sites to 3D map
-    for blue_object in simulation_manager.env.blue_object_list:
-        fig.add_trace(blue_object.plot_launch_site_3d())
+    fig = go.Figure(data=traces if traces is not None else create_graph_traces(simulation_manager))
 
     # Set layout for 3D map
     fig.update_layout(
@@ -44,7 +34,7 @@ def create_graph(simulation_manager: SimulationManager):
         x=0.5,
         y=-0.1,
         showarrow=False,
-        text=f"Time: {simulation_manager.time}",
+        text=graph_time_text(simulation_manager),
         xref="paper",
         yref="paper",
         font=dict(size=18),
@@ -53,6 +43,144 @@ def create_graph(simulation_manager: SimulationManager):
     return fig
 
 
+def create_graph_traces(simulation_manager: SimulationManager | Snapshot) -> list:
+    # One trace per category, built straight from the world state arrays. The trace structure never changes,
+    # so live updates only patch coordinates.
+    state = simulation_manager.state
+    red_alive, blue_alive = state.red_alive, state.blue_alive
+    red_position, red_velocity = state.red_position[red_alive], state.red_velocity[red_alive]
+    dead_red_position, dead_red_velocity = state.red_position[~red_alive], state.red_velocity[~red_alive]
+    blue_position = state.blue_position[blue_alive]
+
+    red_hover = ('Object:<br> id: %{customdata[0]} <br> position: [%{x:.2f}, %{y:.2f}, %{z:.2f}] <br> '
+                 'velocity: [%{customdata[1]:.2f}, %{customdata[2]:.2f}, %{customdata[3]:.2f}]<extra></extra>')
+    blue_hover = ('Blue Object:<br> id: %{customdata[0]} <br> position: [%{x:.2f}, %{y:.2f}, %{z:.2f}] <br> '
+                  'max_speed: %{customdata[1]}<extra></extra>')
+
+    # Alive and dead red objects
+    red_marker_trace = go.Scatter3d(
+        x=red_position[:, 0], y=red_position[:, 1], z=red_position[:, 2],
+        mode='markers',
+        marker=dict(size=10, symbol='circle', color='red'),
+        customdata=np.column_stack((state.red_id[red_alive], red_velocity)),
+        hovertemplate=red_hover,
+        showlegend=False
+    )
+    dead_red_marker_trace = go.Scatter3d(
+        x=dead_red_position[:, 0], y=dead_red_position[:, 1], z=dead_red_position[:, 2],
+        mode='markers',
+        marker=dict(size=5, symbol='x', color='red'),
+        customdata=np.column_stack((state.red_id[~red_alive], dead_red_velocity)),
+        hovertemplate=red_hover,
+        showlegend=False
+    )
+
+    # Plane symbols positioned above the red markers
+    red_text_trace = go.Scatter3d(
+        x=red_position[:, 0], y=red_position[:, 1], z=red_position[:, 2] + 2,
+        mode='text',
+        text='✈',
+        textfont=dict(size=18, color='red'),
+        hoverinfo='skip',
+        showlegend=False,
+    )
+
+    # Velocity arrows of all red objects as one line trace, the segments are separated by NaN points
+    end_position = red_position + 20 * red_velocity
+    segments = np.stack((red_position, end_position, np.full_like(red_position, np.nan)), axis=1).reshape(-1, 3)
+    arrow_trace = go.Scatter3d(
+        x=segments[:, 0], y=segments[:, 1], z=segments[:, 2],
+        mode='lines',
+        line=dict(color='red', width=5),
+        hoverinfo='skip',
+        showlegend=False
+    )
+    cone_trace = go.Cone(
+        x=end_position[:, 0], y=end_position[:, 1], z=end_position[:, 2],
+        u=red_velocity[:, 0], v=red_velocity[:, 1], w=red_velocity[:, 2],
+        colorscale='Reds',
+        sizemode='absolute',
+        sizeref=5,
+        showscale=False,
+        anchor='tail',
+        hoverinfo='skip',
+        showlegend=False
+    )
+
+    # Alive blue objects and their plane symbols
+    blue_marker_trace = go.Scatter3d(
+        x=blue_position[:, 0], y=blue_position[:, 1], z=blue_position[:, 2],
+        mode='markers',
+        marker=dict(size=10, color='blue'),
+        customdata=np.column_stack((state.blue_id[blue_alive], state.blue_max_speed[blue_alive])),
+        hovertemplate=blue_hover,
+        showlegend=False,
+    )
+    blue_text_trace = go.Scatter3d(
+        x=blue_position[:, 0], y=blue_position[:, 1], z=blue_position[:, 2],
+        mode='text',
+        text='✈',
+        textfont=dict(size=18, color='blue'),
+        hoverinfo='skip',
+        showlegend=False,
+    )
+
+    # green squares for the launch sites
+    launch_site_trace = go.Scatter3d(
+        x=state.blue_launch_site_position[:, 0], y=state.blue_launch_site_position[:, 1], z=state.blue_launch_site_position[:, 2],
+        mode='markers',
+        marker=dict(size=10, color='green', symbol='square'),
+        customdata=state.blue_id,
+        hovertemplate='Launch Site: id: %{customdata} position: [%{x:.2f}, %{y:.2f}, %{z:.2f}]<extra></extra>',
+        showlegend=False
+    )
+
+    return [red_marker_trace, dead_red_marker_trace, red_text_trace, arrow_trace, cone_trace,
+            blue_marker_trace, blue_text_trace, launch_site_trace]
+
+
+def graph_time_text(simulation_manager: SimulationManager | Snapshot) -> str:
+    # whole times without a trailing .0, fractional times of small steps with up to 3 decimals
+    return f"Time: {round(simulation_manager.time, 3):g}"
+
+
+class GraphUpdater:
+    # Sends the full figure once and afterwards only the trace properties that changed since the last update.
+    # Every callback that outputs the graph must go through the same updater so it knows what the browser holds.
+    def __init__(self):
+        self._sent_traces: list[dict] | None = None
+
+    def full_figure(self, simulation_manager: SimulationManager | Snapshot):
+        traces = create_graph_traces(simulation_manager)
+        self._sent_traces = [trace.to_plotly_json() for trace in traces]
+        return create_graph(simulation_manager, traces)
+
+    @metrics.timed('update_graph_patch')
+    def update(self, simulation_manager: SimulationManager | Snapshot):
+        traces = [trace.to_plotly_json() for trace in create_graph_traces(simulation_manager)]
+
+        # nothing was sent yet or the trace structure changed, resend everything
+        if self._sent_traces is None or [trace['type'] for trace in traces] != [trace['type'] for trace in self._sent_traces]:
+            return self.full_figure(simulation_manager)
+
+        patch = Patch()
+        for index, (trace, sent_trace) in enumerate(zip(traces, self._sent_traces)):
+            for key in trace.keys() | sent_trace.keys():
+                if _changed(trace.get(key), sent_trace.get(key)):
+                    patch['data'][index][key] = trace.get(key)
+        patch['layout']['annotations'][0]['text'] = graph_time_text(simulation_manager)
+
+        self._sent_traces = traces
+        return patch
+
+
+def _changed(value, sent_value) -> bool:
+    if isinstance(value, np.ndarray) or isinstance(sent_value, np.ndarray):
+        return not (isinstance(value, np.ndarray) and isinstance(sent_value, np.ndarray) and value.shape == sent_value.shape
+                    and np.array_equal(value, sent_value, equal_nan=value.dtype.kind == 'f'))
+    return value != sent_value
+
+
 def velocity_to_degrees(vx, vy):
     # Calculate the angle in radians
     angle_rad = math.atan2(vy, vx)
@@ -68,152 +196,254 @@ def velocity_to_degrees(vx, vy):
     return angle_deg
 
 
-def create_leaflet_map(simulation_manager: SimulationManager):
+def degrees_from_velocity(velocity: np.ndarray) -> np.ndarray:
+    # vectorized velocity_to_degrees of (N, 3) velocities, truncated to whole degrees in [0, 360]
+    return np.mod(np.degrees(np.arctan2(velocity[:, 1], velocity[:, 0])), 360).astype(np.int64)
+
+
+def plane_icon(team: str, angle: int) -> dict:
+    # DivIcon options of a plane marker, all planes of a team share one cached image that the browser rotates
+    return {
+        "html": f'<img src="icons/plane_{team}.png" width="20" height="20" style="transform: rotate({angle}deg)">',
+        "className": "plane-icon",
+        "iconSize": [20, 20],
+        "iconAnchor": [20, 20],
+    }
+
+
+LAUNCH_SITE_ICON = {
+    "iconUrl": 'assets/launch_site.png',
+    "iconSize": [20, 20],
+    "iconAnchor": [20, 20],
+}
+
+
+@metrics.timed('create_leaflet_map')
+def create_leaflet_map(simulation_manager: SimulationManager | Snapshot) -> list:
+    # The map is made of two layers with one marker per object and a fixed order, so live updates can patch
+    # single marker properties:
+    #   0. controls: launch sites of blue objects and red objects, with their popup controls
+    #   1. positions: blue objects in flight, no popups
+    # Hidden markers (dead objects, blue objects still at their launch site) are fully transparent.
     import dash_leaflet as dl
 
-    markers = []
-
-    # Iterate over blue objects and create markers
-    for blue_object in simulation_manager.env.blue_object_list:
-        if blue_object.i_am_alive:
-            position = blue_object.position[:2]  # Assuming 2D position (x, y)
-            # plot blue object only if its not in the launch site
-            if np.linalg.norm(blue_object.position - blue_object.launch_site_position) > 1:
-                markers.append(
-                    dl.Marker(
-                        position=position.tolist(),
-                        icon={
-                            "iconUrl": f'assets/plane_blue/{int(velocity_to_degrees(blue_object.current_velocity[0], blue_object.current_velocity[1]))}.png',
-                            "iconSize": [20, 20],
-                            "iconAnchor": [20, 20],
-                        },
-                    )
-                )
+    state = simulation_manager.state
+    blue_visible = blue_in_flight(state)
+    blue_angle = degrees_from_velocity(state.blue_velocity)
+    red_angle = degrees_from_velocity(state.red_velocity)
 
-            markers.append(
-                dl.Marker(
-                    position=blue_object.launch_site_position[:2].tolist(),
-                    icon={
-                        "iconUrl": 'assets/launch_site.png',
-                        "iconSize": [20, 20],
-                        "iconAnchor": [20, 20],
-                    },
-                    children=[
-                        dl.Popup(
-                            children=[
-                                html.Div([
-                                    html.Label("Speed:"),
-                                    dcc.Input(
-                                        id={"type": "blue_object_speed", "index": blue_object.id},
-                                        type='number',
-                                        placeholder=f'{blue_object.max_speed}',
-                                        style = {"marginBottom": "10px", "borderRadius": "5px"},
-                                    ),
-                                    html.Br(),
-                                    dmc.Button(
-                                        children="Delete",
-                                        color="red",
-                                        size="sm",
-                                        fullWidth=True,
-                                        id={"type": "blue_object_delete", "index": blue_object.id},
-                                    )
-                                ], style={"padding": "10px", "borderRadius": "5px", "backgroundColor": "#e0e0e0"})
-                            ]
-                        )
-                    ]
-                )
+    controls = []
+    for slot in range(state.num_blue):
+        alive = bool(state.blue_alive[slot])
+        controls.append(
+            dl.Marker(
+                position=state.blue_launch_site_position[slot, :2].tolist(),
+                icon=LAUNCH_SITE_ICON,
+                opacity=1 if alive else 0,
+                children=[create_blue_popup(state, slot)] if alive else [],
             )
+        )
 
-    # Iterate over red objects and create markers
-    for red_object in simulation_manager.env.red_object_list:
-        if red_object.i_am_alive:
-            position = red_object.position[:2]  # Assuming 2D position (x, y)
-            markers.append(
-                dl.Marker(
-                    position=position.tolist(),
-                    icon={
-                        "iconUrl": f'assets/plane_red/{int(velocity_to_degrees(red_object.velocity[0], red_object.velocity[1]))}.png',
-                        "iconSize": [20, 20],
-                        "iconAnchor": [20, 20],
-                    },
-                    children=[
-                        dl.Popup(
-                            children=[
-                                html.Div([
-                                    dmc.Grid([
-                                        dmc.GridCol([
-                                            html.Label("Altitude:"),
-                                        ], span=4),
-                                        dmc.GridCol([
-                                            dcc.Input(
-                                                id={"type": "red_object_alt", "index": red_object.id},
-                                                type='number',
-                                                value=red_object.position[2],
-                                                step=1,
-                                                style={"borderRadius": "5px"}
-
-                                            ),
-                                        ], span=8),
-                                    ]),
-                                    html.Br(),
-                                    dmc.Grid([
-                                        dmc.GridCol([
-                                            html.Label("Velocity:"),
-                                        ], span=4),
-                                        dmc.GridCol([
-                                            dcc.Input(
-                                                id={"type": "red_object_velocity", "index": red_object.id},
-                                                type='text',
-                                                value=f'{red_object.velocity[0]: .1f}, {red_object.velocity[1]: .1f}, {red_object.velocity[2]: .1f}',
-                                                style={"borderRadius": "5px"}
-                                            ),
-                                        ], span=8),
-                                    ]),
-                                    html.Br(),
-                                    dmc.Grid([
-                                        dmc.GridCol([
-                                            html.Label("Angle:"),
-                                        ], span=4),
-                                        dmc.GridCol([
-                                            dcc.Input(
-                                                id={"type": "red_object_angle", "index": red_object.id},
-                                                type='number',
-                                                value=f'{velocity_to_degrees(red_object.velocity[0], red_object.velocity[1]): .1f}',
-                                                style={"borderRadius": "5px"}
-                                            ),
-                                        ], span=8),
-                                    ]),
-                                    html.Br(),
-                                    dmc.Grid([
-                                        dmc.GridCol([
-                                            html.Label("Speed:"),
-                                        ], span=4),
-                                        dmc.GridCol([
-                                            dcc.Input(
-                                                id={"type": "red_object_speed", "index": red_object.id},
-                                                type='number',
-                                                value=f'{np.linalg.norm(red_object.velocity[:2]): .1f}',
-                                                style={"borderRadius": "5px"}
-                                            ),
-                                        ], span=8),
-                                    ]),
-                                    html.Br(),
-                                    dmc.Button(
-                                        children="Delete",
-                                        color="red",
-                                        size="sm",
-                                        fullWidth=True,
-                                        id={"type": "red_object_delete", "index": red_object.id},
-                                    )
-                                ], style={"padding": "10px", "borderRadius": "5px", "backgroundColor": "#e0e0e0", "width": "300px"})
-                            ]
-                        )
-                    ]
-                )
+    for slot in range(state.num_red):
+        alive = bool(state.red_alive[slot])
+        controls.append(
+            dl.DivMarker(
+                position=state.red_position[slot, :2].tolist(),  # Assuming 2D position (x, y)
+                iconOptions=plane_icon('red', int(red_angle[slot])),
+                opacity=1 if alive else 0,
+                children=[create_red_popup(state, slot)] if alive else [],
             )
+        )
+
+    positions = [
+        dl.DivMarker(
+            position=state.blue_position[slot, :2].tolist(),
+            iconOptions=plane_icon('blue', int(blue_angle[slot])),
+            opacity=1 if blue_visible[slot] else 0,
+            interactive=False,  # never cover the launch site popup below
+        )
+        for slot in range(state.num_blue)
+    ]
+
+    return [dl.LayerGroup(children=controls, id="object-controls"),
+            dl.LayerGroup(children=positions, id="object-positions")]
+
+
+def blue_in_flight(state) -> np.ndarray:
+    # plot blue object only if its not in the launch site
+    return state.blue_alive & (np.linalg.norm(state.blue_position - state.blue_launch_site_position, axis=1) > 1)
+
+
+def create_blue_popup(state, slot: int):
+    import dash_leaflet as dl
+
+    blue_id, max_speed = int(state.blue_id[slot]), float(state.blue_max_speed[slot])
+
+    return dl.Popup(
+        children=[
+            html.Div([
+                html.Label("Speed:"),
+                dcc.Input(
+                    id={"type": "blue_object_speed", "index": blue_id},
+                    type='number',
+                    placeholder=f'{max_speed}',
+                    style = {"marginBottom": "10px", "borderRadius": "5px"},
+                ),
+                html.Br(),
+                dmc.Button(
+                    children="Delete",
+                    color="red",
+                    size="sm",
+                    fullWidth=True,
+                    id={"type": "blue_object_delete", "index": blue_id},
+                )
+            ], style={"padding": "10px", "borderRadius": "5px", "backgroundColor": "#e0e0e0"})
+        ]
+    )
+
+
+def create_red_popup(state, slot: int):
+    import dash_leaflet as dl
+
+    red_id, position, velocity = int(state.red_id[slot]), state.red_position[slot], state.red_velocity[slot]
+
+    return dl.Popup(
+        children=[
+            html.Div([
+                dmc.Grid([
+                    dmc.GridCol([
+                        html.Label("Altitude:"),
+                    ], span=4),
+                    dmc.GridCol([
+                        dcc.Input(
+                            id={"type": "red_object_alt", "index": red_id},
+                            type='number',
+                            value=float(position[2]),
+                            step=1,
+                            style={"borderRadius": "5px"}
+
+                        ),
+                    ], span=8),
+                ]),
+                html.Br(),
+                dmc.Grid([
+                    dmc.GridCol([
+                        html.Label("Velocity:"),
+                    ], span=4),
+                    dmc.GridCol([
+                        dcc.Input(
+                            id={"type": "red_object_velocity", "index": red_id},
+                            type='text',
+                            value=f'{velocity[0]: .1f}, {velocity[1]: .1f}, {velocity[2]: .1f}',
+                            style={"borderRadius": "5px"}
+                        ),
+                    ], span=8),
+                ]),
+                html.Br(),
+                dmc.Grid([
+                    dmc.GridCol([
+                        html.Label("Angle:"),
+                    ], span=4),
+                    dmc.GridCol([
+                        dcc.Input(
+                            id={"type": "red_object_angle", "index": red_id},
+                            type='number',
+                            value=f'{velocity_to_degrees(velocity[0], velocity[1]): .1f}',
+                            style={"borderRadius": "5px"}
+                        ),
+                    ], span=8),
+                ]),
+                html.Br(),
+                dmc.Grid([
+                    dmc.GridCol([
+                        html.Label("Speed:"),
+                    ], span=4),
+                    dmc.GridCol([
+                        dcc.Input(
+                            id={"type": "red_object_speed", "index": red_id},
+                            type='number',
+                            value=f'{np.linalg.norm(velocity[:2]): .1f}',
+                            style={"borderRadius": "5px"}
+                        ),
+                    ], span=8),
+                ]),
+                html.Br(),
+                dmc.Button(
+                    children="Delete",
+                    color="red",
+                    size="sm",
+                    fullWidth=True,
+                    id={"type": "red_object_delete", "index": red_id},
+                )
+            ], style={"padding": "10px", "borderRadius": "5px", "backgroundColor": "#e0e0e0", "width": "300px"})
+        ]
+    )
+
+
+class MapUpdater:
+    # Builds the map markers and popups once and afterwards only patches the markers that moved, turned or died.
+    # Every callback that outputs the map must go through the same updater so it knows what the browser holds.
+    def __init__(self):
+        self._sent: dict | None = None
+
+    def full_map(self, simulation_manager: SimulationManager | Snapshot) -> list:
+        self._sent = self._marker_state(simulation_manager)
+        return create_leaflet_map(simulation_manager)
+
+    @metrics.timed('update_map_patch')
+    def update(self, simulation_manager: SimulationManager | Snapshot):
+        current = self._marker_state(simulation_manager)
+        sent = self._sent
+
+        # objects were added or removed, or dead objects came back and need their popups
+        if (sent is None or not np.array_equal(current['red_id'], sent['red_id']) or not np.array_equal(current['blue_id'], sent['blue_id'])
+                or (current['red_alive'] & ~sent['red_alive']).any() or (current['blue_alive'] & ~sent['blue_alive']).any()):
+            return self.full_map(simulation_manager)
+
+        patch = Patch()
+        controls = patch[0]['props']['children']
+        positions = patch[1]['props']['children']
+        num_blue = len(current['blue_id'])
+
+        # launch sites of blue objects that died
+        for slot in np.flatnonzero(sent['blue_alive'] & ~current['blue_alive']):
+            controls[int(slot)]['props']['opacity'] = 0
+            controls[int(slot)]['props']['children'] = []
+
+        # red objects that moved, turned or died
+        for slot in np.flatnonzero((current['red_position'] != sent['red_position']).any(axis=1) & current['red_alive']):
+            controls[num_blue + int(slot)]['props']['position'] = current['red_position'][slot].tolist()
+        for slot in np.flatnonzero(current['red_angle'] != sent['red_angle']):
+            controls[num_blue + int(slot)]['props']['iconOptions'] = plane_icon('red', int(current['red_angle'][slot]))
+        for slot in np.flatnonzero(sent['red_alive'] & ~current['red_alive']):
+            controls[num_blue + int(slot)]['props']['opacity'] = 0
+            controls[num_blue + int(slot)]['props']['children'] = []
+
+        # blue objects in flight
+        for slot in np.flatnonzero((current['blue_position'] != sent['blue_position']).any(axis=1)):
+            positions[int(slot)]['props']['position'] = current['blue_position'][slot].tolist()
+        for slot in np.flatnonzero(current['blue_angle'] != sent['blue_angle']):
+            positions[int(slot)]['props']['iconOptions'] = plane_icon('blue', int(current['blue_angle'][slot]))
+        for slot in np.flatnonzero(current['blue_visible'] != sent['blue_visible']):
+            positions[int(slot)]['props']['opacity'] = 1 if current['blue_visible'][slot] else 0
+
+        self._sent = current
+        return patch
 
-    # Combine markers and return them as map children
-    return dl.LayerGroup(children=markers, id="blue-object-markers")
+    @staticmethod
+    def _marker_state(simulation_manager: SimulationManager | Snapshot) -> dict:
+        state = simulation_manager.state
+        return {
+            'red_id': state.red_id.copy(),
+            'red_alive': state.red_alive.copy(),
+            'red_position': state.red_position[:, :2].copy(),
+            'red_angle': degrees_from_velocity(state.red_velocity),
+            'blue_id': state.blue_id.copy(),
+            'blue_alive': state.blue_alive.copy(),
+            'blue_position': state.blue_position[:, :2].copy(),
+            'blue_angle': degrees_from_velocity(state.blue_velocity),
+            'blue_visible': blue_in_flight(state),
+        }
 
 
 def calc_velocity_from_angle(current_velocity, new_angle) -> np.ndarray:
@@ -0,0 +1,30 @@
+import functools
+import io
+import os
+from PIL import Image
+
+ASSETS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+PLANE_TEAMS = ('red', 'blue')
+
+# The icons are drawn at 20 pixels, 64 keeps them sharp on high density screens
+ICON_PIXELS = 64
+
+
+@functools.lru_cache(maxsize=None)
+def plane_icon_png(team: str) -> bytes:
+    # The plane of a team pointing north, scaled down once into a square PNG. Every marker of the team shows
+    # this one image and the browser rotates it to the heading, so no rotated copies are generated.
+    if team not in PLANE_TEAMS:
+        raise ValueError(f'Unknown team {team!r}')
+
+    with Image.open(os.path.join(ASSETS_DIRECTORY, f'plane_{team}.png')) as image:
+        image = image.convert('RGBA')
+    image.thumbnail((ICON_PIXELS, ICON_PIXELS), Image.LANCZOS)
+
+    # center on a square canvas so the rotation is around the middle of the plane
+    icon = Image.new('RGBA', (ICON_PIXELS, ICON_PIXELS))
+    icon.paste(image, ((ICON_PIXELS - image.width) // 2, (ICON_PIXELS - image.height) // 2))
+
+    buffer = io.BytesIO()
+    icon.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,139 @@
+import plotly.graph_objs as go
+
+# Plotly traces of single red and blue objects. The objects import this module only when they are plotted,
+# so the simulation core does not load plotly.
+
+
+def red_object_traces_3d(red_object):
+    marker_symbol = 'circle' if red_object.i_am_alive else 'x'
+    marker_size = 10 if red_object.i_am_alive else 5
+    marker_trace = go.Scatter3d(
+        x=[red_object.position[0]],
+        y=[red_object.position[1]],
+        z=[red_object.position[2]],
+        mode='markers',
+        marker=dict(size=marker_size, symbol=marker_symbol, color='red'),
+        text=f'Object:\n id: {red_object.id} \n position: {red_object.position} \n velocity: {red_object.velocity}',
+        showlegend=False
+    )
+    if not red_object.i_am_alive:
+        return [marker_trace]
+
+    # Text trace for the plane symbol positioned above the marker
+    text_trace = go.Scatter3d(
+        x=[red_object.position[0]],
+        y=[red_object.position[1]],
+        z=[red_object.position[2] + 2],  # Offset text above the marker
+        mode='text',
+        text='✈',  # Plane symbol
+        textfont=dict(size=18, color='red'),
+        showlegend=False,
+    )
+
+    # Arrow trace for velocity direction
+    # Calculate the end point of the arrow based on the velocity vector
+    end_position = [
+        red_object.position[0] + 20 * red_object.velocity[0],
+        red_object.position[1] + 20 * red_object.velocity[1],
+        red_object.position[2] + 20 * red_object.velocity[2],
+    ]
+
+    arrow_trace = go.Scatter3d(
+        x=[red_object.position[0], end_position[0]],
+        y=[red_object.position[1], end_position[1]],
+        z=[red_object.position[2], end_position[2]],
+        mode='lines',
+        line=dict(color='red', width=5),
+        marker=dict(size=12, color='red'),  # Small marker at the arrow tip
+        showlegend=False
+    )
+
+    # add cone to the arrow
+    cone_trace = go.Cone(
+        x=[end_position[0]],
+        y=[end_position[1]],
+        z=[end_position[2]],
+        u=[red_object.velocity[0]],
+        v=[red_object.velocity[1]],
+        w=[red_object.velocity[2]],
+        colorscale='Reds',
+        sizemode='scaled',
+        sizeref=20,
+        showscale=False,
+        anchor='tail',
+        showlegend=False
+    )
+
+    return [marker_trace, text_trace, arrow_trace, cone_trace]
+
+
+def red_object_trace_2d(red_object):
+    marker_symbol = 'circle' if red_object.i_am_alive else 'x'
+    return go.Scatter(
+        x=[red_object.position[0]],
+        y=[red_object.position[1]],
+        mode='markers',
+        marker=dict(size=10, symbol=marker_symbol, color='red'),
+        text=f'Object:\n id: {red_object.id} \n position: {red_object.position} \n velocity: {red_object.velocity}',
+        showlegend=False
+    )
+
+
+def blue_object_traces_3d(blue_object):
+    if not blue_object.i_am_alive:
+        return go.Scatter3d()
+    marker_trace = go.Scatter3d(x=[blue_object.position[0]], y=[blue_object.position[1]], z=[blue_object.position[2]],
+                                mode='markers',
+                                marker=dict(size=10, color='blue'),
+                                text=f'Blue Object:\n id: {blue_object.id} \n position: {blue_object.position} \n max_speed: {blue_object.max_speed}',
+                                showlegend=False,
+                                )
+
+    # Text trace for the plane symbol positioned above the marker
+    text_trace = go.Scatter3d(
+        x=[blue_object.position[0]],
+        y=[blue_object.position[1]],
+        z=[blue_object.position[2]],  # Offset text above the marker
+        mode='text',
+        text='✈',  # Plane symbol
+        textfont=dict(size=18, color='blue'),
+        showlegend=False,
+    )
+
+    # Return both traces in a list
+    return [marker_trace, text_trace]
+
+
+def blue_object_trace_2d(blue_object):
+    if not blue_object.i_am_alive:
+        return go.Scatter()
+    return go.Scatter(x=[blue_object.position[0]], y=[blue_object.position[1]],
+                      mode='markers',
+                      marker=dict(size=10, color='blue'),
+                      text=f'Blue Object:\n id: {blue_object.id} \n position: {blue_object.position} \n max_speed: {blue_object.max_speed}',
+                      showlegend=False)
+
+
+def launch_site_trace_3d(blue_object):
+    # make green square for the launch site
+    return go.Scatter3d(
+        x=[blue_object.launch_site_position[0]],
+        y=[blue_object.launch_site_position[1]],
+        z=[blue_object.launch_site_position[2]],
+        mode='markers',
+        marker=dict(size=10, color='green', symbol='square'),  # Use square markers
+        text=f'Launch Site: id: {blue_object.id} position: {blue_object.launch_site_position}',
+        showlegend=False
+    )
+
+
+def launch_site_trace_2d(blue_object):
+    # make green square for the launch site
+    return go.Scatter(
+        x=[blue_object.launch_site_position[0]],
+        y=[blue_object.launch_site_position[1]],
+        mode='markers',
+        marker=dict(size=10, color='green', symbol='square'),  # Use square markers
+        text=f'Launch Site: id: {blue_object.id} position: {blue_object.launch_site_position}',
+        showlegend=False
+    )
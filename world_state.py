@@ -0,0 +1,313 @@
+import numpy as np
+import kernels
+from collision import find_swept_pairs
+
+# Arrays that stepping the world never writes, only edits of the objects change them
+STATIC_ARRAYS = ('red_id', 'red_initial_position', 'red_velocity', 'blue_id', 'blue_launch_site_position', 'blue_max_speed')
+
+# The arrays of each team, one row per object
+TEAM_ARRAYS = {
+    'red': ('red_id', 'red_initial_position', 'red_position', 'red_velocity', 'red_alive'),
+    'blue': ('blue_id', 'blue_launch_site_position', 'blue_position', 'blue_velocity', 'blue_max_speed', 'blue_alive'),
+}
+
+
+class WorldState:
+    # Struct-of-arrays storage for every object in a scenario. Red and blue objects are thin views onto
+    # one row of these arrays, so the environment can step the whole world with a few vectorized operations.
+    def __init__(self, num_red: int = 0, num_blue: int = 0):
+        # red objects
+        self.red_id = np.zeros(num_red, dtype=np.int64)
+        self.red_initial_position = np.zeros((num_red, 3), dtype=np.float64)
+        self.red_position = np.zeros((num_red, 3), dtype=np.float64)
+        self.red_velocity = np.zeros((num_red, 3), dtype=np.float64)
+        self.red_alive = np.ones(num_red, dtype=bool)
+
+        # blue objects
+        self.blue_id = np.zeros(num_blue, dtype=np.int64)
+        self.blue_launch_site_position = np.zeros((num_blue, 3), dtype=np.float64)
+        self.blue_position = np.zeros((num_blue, 3), dtype=np.float64)
+        self.blue_velocity = np.zeros((num_blue, 3), dtype=np.float64)
+        self.blue_max_speed = np.zeros(num_blue, dtype=np.float64)
+        self.blue_alive = np.ones(num_blue, dtype=bool)
+
+    @property
+    def num_red(self) -> int:
+        return len(self.red_position)
+
+    @property
+    def num_blue(self) -> int:
+        return len(self.blue_position)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {name: getattr(self, name) for names in TEAM_ARRAYS.values() for name in names}
+
+    @classmethod
+    def from_arrays(cls, red_position, red_velocity, blue_launch_site_position, blue_max_speed, copy: bool = True) -> 'WorldState':
+        # world state of a scenario at its start, ids are left to the objects created from it.
+        # Without copy, writable contiguous float64 arrays are adopted as the static arrays instead of copied.
+        state = cls(len(red_position), len(blue_launch_site_position))
+        if copy:
+            state.red_initial_position[:] = red_position
+            state.red_velocity[:] = red_velocity
+            state.blue_launch_site_position[:] = blue_launch_site_position
+            state.blue_max_speed[:] = blue_max_speed
+        else:
+            state.red_initial_position = np.require(red_position, np.float64, ('C', 'W')).reshape(-1, 3)
+            state.red_velocity = np.require(red_velocity, np.float64, ('C', 'W')).reshape(-1, 3)
+            state.blue_launch_site_position = np.require(blue_launch_site_position, np.float64, ('C', 'W')).reshape(-1, 3)
+            state.blue_max_speed = np.require(blue_max_speed, np.float64, ('C', 'W')).reshape(-1)
+        state.reset()
+        return state
+
+    @classmethod
+    def from_objects(cls, red_object_list: list, blue_object_list: list) -> 'WorldState':
+        # objects created together from one state are still bound to it in list order, it is used as is
+        shared = _shared_state(red_object_list, blue_object_list)
+        if shared is not None:
+            return shared
+
+        state = cls(len(red_object_list), len(blue_object_list))
+
+        # gather the current values of every object into the contiguous arrays
+        for slot, red_object in enumerate(red_object_list):
+            state.red_id[slot] = red_object.id
+            state.red_initial_position[slot] = red_object.initial_position
+            state.red_position[slot] = red_object.position
+            state.red_velocity[slot] = red_object.velocity
+            state.red_alive[slot] = red_object.i_am_alive
+
+        for slot, blue_object in enumerate(blue_object_list):
+            state.blue_id[slot] = blue_object.id
+            state.blue_launch_site_position[slot] = blue_object.launch_site_position
+            state.blue_position[slot] = blue_object.position
+            state.blue_velocity[slot] = blue_object.current_velocity
+            state.blue_max_speed[slot] = blue_object.max_speed
+            state.blue_alive[slot] = blue_object.i_am_alive
+
+        # rebind the objects so they read and write their row of the new arrays
+        for slot, red_object in enumerate(red_object_list):
+            red_object.bind(state, slot)
+        for slot, blue_object in enumerate(blue_object_list):
+            blue_object.bind(state, slot)
+
+        return state
+
+    def copy(self, read_only: bool = False, shared: 'WorldState | None' = None) -> 'WorldState':
+        # independent copy of all arrays, optionally frozen so readers can share it safely.
+        # The static arrays of a read-only copy can be taken from the shared state instead of copied again.
+        state = WorldState.__new__(WorldState)
+        for name, array in self.arrays().items():
+            if read_only and shared is not None and name in STATIC_ARRAYS:
+                setattr(state, name, getattr(shared, name))
+                continue
+            array = array.copy()
+            if read_only:
+                array.setflags(write=False)
+            setattr(state, name, array)
+        return state
+
+    def append_row(self, team: str, source: 'WorldState', source_slot: int) -> int:
+        # copy one row of another state to the end of the team's arrays and return its slot. The arrays grow into
+        # spare rows kept behind them, so appending one object at a time is amortized O(1).
+        slot = len(getattr(self, f'{team}_position'))
+        for name in TEAM_ARRAYS[team]:
+            array = _resized(getattr(self, name), slot + 1)
+            array[slot] = getattr(source, name)[source_slot]
+            setattr(self, name, array)
+        return slot
+
+    def remove_row(self, team: str, slot: int) -> 'WorldState':
+        # remove one row in O(1), the last row takes its place. The removed row is returned as a single row state.
+        removed = WorldState()
+        last = len(getattr(self, f'{team}_position')) - 1
+        for name in TEAM_ARRAYS[team]:
+            array = getattr(self, name)
+            setattr(removed, name, array[slot:slot + 1].copy())
+            array[slot] = array[last]
+            setattr(self, name, array[:last])
+        return removed
+
+    def step_red(self, dt: float = 1):
+        # every alive red object moves by its velocity for dt
+        self.red_position += self.red_velocity * (dt * self.red_alive[:, None])
+
+    def step_blue(self, action, dt: float = 1):
+        action = np.asarray(action, dtype=np.float64).reshape(self.num_blue, 3)
+        if kernels.enabled():
+            kernels.step_blue(self.blue_position, self.blue_velocity, self.blue_alive, self.blue_max_speed, action, dt)
+            return
+
+        # scale each action to move at most max_speed * dt units, dead or idle objects do not move.
+        # The rows are selected with where= instead of boolean indexing, which copies them several times.
+        distance = np.linalg.norm(action, axis=1)
+        moving = self.blue_alive & (distance > 0)
+        scale = np.divide(np.minimum(self.blue_max_speed * dt, distance), distance,
+                          out=np.zeros_like(distance), where=moving)
+        action = action * scale[:, None]
+
+        np.add(self.blue_position, action, out=self.blue_position, where=moving[:, None])
+        np.divide(action, dt, out=self.blue_velocity, where=moving[:, None])
+
+    def kill_swept_pairs(self, blue_start_position: np.ndarray, red_start_position: np.ndarray, kill_radius: float):
+        # kill every alive blue/red pair that came within kill_radius while moving in a straight line from the start
+        # positions to the current ones
+        alive_blue = np.flatnonzero(self.blue_alive)
+        alive_red = np.flatnonzero(self.red_alive)
+        blue_hits, red_hits = find_swept_pairs(blue_start_position[alive_blue], self.blue_position[alive_blue],
+                                               red_start_position[alive_red], self.red_position[alive_red],
+                                               kill_radius)
+        self.blue_alive[alive_blue[blue_hits]] = False
+        self.red_alive[alive_red[red_hits]] = False
+
+    def step(self, action, dt: float = 1):
+        self.step_red(dt)
+        self.step_blue(action, dt)
+
+    def reset(self):
+        self.red_position[:] = self.red_initial_position
+        self.red_alive[:] = True
+
+        self.blue_position[:] = self.blue_launch_site_position
+        self.blue_alive[:] = True
+
+
+def _resized(array: np.ndarray, length: int) -> np.ndarray:
+    # view of the first length rows of the buffer behind the array, a full buffer is replaced by one twice as large
+    buffer = array.base
+    if not (isinstance(buffer, np.ndarray) and buffer.dtype == array.dtype and buffer.shape[1:] == array.shape[1:]
+            and length <= len(buffer) and buffer.__array_interface__['data'][0] == array.__array_interface__['data'][0]):
+        buffer = np.zeros((max(2 * len(array), length, 4),) + array.shape[1:], dtype=array.dtype)
+        buffer[:len(array)] = array
+    return buffer[:length]
+
+
+def _shared_state(red_object_list: list, blue_object_list: list) -> WorldState | None:
+    first_object = red_object_list[0] if red_object_list else blue_object_list[0] if blue_object_list else None
+    if first_object is None:
+        return None
+
+    state = first_object._state
+    if state.num_red != len(red_object_list) or state.num_blue != len(blue_object_list):
+        return None
+    for object_list in (red_object_list, blue_object_list):
+        for slot, obj in enumerate(object_list):
+            if obj._state is not state or obj._slot != slot:
+                return None
+    return state
+
+
+class ObjectList(list):
+    # List of objects that reports every structural change, so the owner can keep its WorldState in step.
+    # It is also the registry of the objects: every object gets an id unique in the list, and a map from the ids
+    # to the list positions makes lookups and removals by id O(1). on_change(object_list) is called after a
+    # change, with added=object after an append, with removed=object and index=position after remove_id.
+    def __init__(self, iterable=(), on_change=None):
+        super().__init__(iterable)
+        self._on_change = on_change
+        self._reindex()
+
+    def __reduce__(self):
+        # rebuilt through __init__, the id map is restored with the other attributes
+        return self.__class__, (list(self),), vars(self)
+
+    def _reindex(self):
+        # objects without an id or with the id of an earlier object get a new one
+        self._index: dict[int, int] = {}
+        self._next_id = max((item.id for item in self), default=0) + 1
+        for index, item in enumerate(self):
+            if item.id < 1 or item.id in self._index:
+                item.id = self._new_id()
+            self._index[item.id] = index
+
+    def _new_id(self) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _changed(self, **change):
+        if self._on_change is not None:
+            self._on_change(self, **change)
+
+    def get(self, object_id: int, default=None):
+        index = self._index.get(object_id)
+        return default if index is None else self[index]
+
+    def __contains__(self, item) -> bool:
+        index = self._index.get(getattr(item, 'id', None))
+        return index is not None and self[index] is item
+
+    def remove_id(self, object_id: int):
+        # remove the object with the id in O(1), the last object takes its place in the list
+        index = self._index.pop(object_id)
+        item = super().pop()
+        if index < len(self):
+            item, last = self[index], item
+            super().__setitem__(index, last)
+            self._index[last.id] = index
+        self._changed(removed=item, index=index)
+        return item
+
+    def append(self, item):
+        if item.id < 1 or item.id in self._index:
+            item.id = self._new_id()
+        self._next_id = max(self._next_id, item.id + 1)
+        self._index[item.id] = len(self)
+        super().append(item)
+        self._changed(added=item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    # Any other change moves objects around, the id map and the state are rebuilt
+
+    def _rebuilt(self):
+        self._reindex()
+        self._changed()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._rebuilt()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._rebuilt()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._rebuilt()
+
+    def clear(self):
+        super().clear()
+        self._rebuilt()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._rebuilt()
+
+    def reverse(self):
+        super().reverse()
+        self._rebuilt()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._rebuilt()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._rebuilt()
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._rebuilt()
+        return self